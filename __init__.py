@@ -65,6 +65,7 @@ from .operators import (
 from .utils import (
     file_utils,
     file_watcher,
+    live_link,
     preferences
 )
 
@@ -118,6 +119,11 @@ def register():
             type=keyframe_operators.KeyframeItem
         )
         bpy.types.Scene.btc_keyframe_index = bpy.props.IntProperty(name="Keyframe Index")
+        bpy.types.Scene.btc_filter_selected_bones = bpy.props.BoolProperty(
+            name="Selected Bones Only",
+            description="Only list the frames keyed or marked on the selected bones",
+            default=False
+        )
         
         # Register armature properties
         bpy.types.Scene.btc_armature = bpy.props.PointerProperty(
@@ -126,6 +132,64 @@ def register():
             description="Selected armature for export",
             poll=lambda self, obj: obj.type == 'ARMATURE'
         )
+        
+        # Import options for scenes coming from Cascadeur
+        bpy.types.Scene.btc_import_mode = bpy.props.EnumProperty(
+            name="Import Mode",
+            items=[
+                ('FULL', "Full Scene", "Import the whole FBX (objects, meshes, materials and animation)"),
+                ('ANIMATION', "Animation Only", "Apply the incoming animation to the selected armature as a new action"),
+                ('CURVES', "Animation Only (Direct)", "Read the bone curves straight from the binary FBX, without Blender's FBX importer. No axis conversion: the FBX must use Blender's axes and Y bone axis")
+            ],
+            default='FULL',
+            description="How scenes coming from Cascadeur are imported"
+        )
+        bpy.types.Scene.btc_import_per_collection = bpy.props.BoolProperty(
+            name="Import to Collections",
+            description="Import each Cascadeur scene into its own collection",
+            default=False
+        )
+        bpy.types.Scene.btc_import_share_meshes = bpy.props.BoolProperty(
+            name="Share Meshes",
+            description="Link imported objects with identical geometry to one shared mesh",
+            default=True
+        )
+        bpy.types.Scene.btc_keep_generations = bpy.props.IntProperty(
+            name="Keep Imports",
+            description="Number of imports to keep per Cascadeur scene when old imports are purged (0 keeps all)",
+            default=0,
+            min=0,
+            max=100
+        )
+        bpy.types.Scene.btc_auto_purge_imports = bpy.props.BoolProperty(
+            name="Purge On Import",
+            description="Remove imports older than Keep Imports after each import from Cascadeur",
+            default=False
+        )
+        bpy.types.Scene.btc_export_frames = bpy.props.EnumProperty(
+            name="Export Frames",
+            description="Part of the animation written to the exported FBX",
+            items=[
+                ('ALL', "Whole Timeline", "Bake the animation over the whole scene frame range"),
+                ('RANGE', "Marked Range", "Bake only from the first to the last marked keyframe"),
+            ],
+            default='ALL'
+        )
+        bpy.types.Scene.btc_reuse_sent_mesh = bpy.props.BoolProperty(
+            name="Skip Unchanged Mesh",
+            description="Send only the skeleton and animation when the rig and meshes did not change since the last export",
+            default=True
+        )
+        bpy.types.Scene.btc_background_export = bpy.props.BoolProperty(
+            name="Export in Background",
+            description="Export the FBX in a background Blender process so the interface stays responsive",
+            default=False
+        )
+        bpy.types.Scene.btc_progressive_export = bpy.props.BoolProperty(
+            name="Progressive Export",
+            description="Send a quick preview (every 4th frame of the main bones) first, then replace it with the full animation exported in background",
+            default=False
+        )
     except Exception as e:
         print(f"Error registering properties: {e}")
     
@@ -143,6 +207,12 @@ def unregister():
     except Exception as e:
         print(f"Error removing handlers: {e}")
     
+    # Dừng live link nếu đang chạy
+    try:
+        live_link.stop_live_link()
+    except Exception as e:
+        print(f"Error stopping live link: {e}")
+    
     # Stop file watcher if running
     try:
         if hasattr(bpy.types, "WindowManager") and hasattr(bpy.types.WindowManager, "btc_file_watcher"):
@@ -155,7 +225,17 @@ def unregister():
     
     # Unregister scene properties
     try:
+        del bpy.types.Scene.btc_progressive_export
+        del bpy.types.Scene.btc_background_export
+        del bpy.types.Scene.btc_export_frames
+        del bpy.types.Scene.btc_reuse_sent_mesh
+        del bpy.types.Scene.btc_keep_generations
+        del bpy.types.Scene.btc_auto_purge_imports
+        del bpy.types.Scene.btc_import_share_meshes
+        del bpy.types.Scene.btc_import_per_collection
+        del bpy.types.Scene.btc_import_mode
         del bpy.types.Scene.btc_armature
+        del bpy.types.Scene.btc_filter_selected_bones
         del bpy.types.Scene.btc_keyframe_index
         del bpy.types.Scene.btc_keyframes
     except Exception as e:
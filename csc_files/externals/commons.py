@@ -1,6 +1,24 @@
 import csc
 import tempfile
 import os
+import json
+import time
+import struct
+import socket
+import itertools
+import threading
+import configparser
+
+from . import live_link_protocol
+
+
+# Tên file cấu hình (file cài đặt được ghi đè bởi Blender khi install add-on)
+CONFIG_FILE_NAMES = ("settings.cfg", "setting.cfg")
+CONFIG_SECTION = "Addon Settings"
+
+# Cache cấu hình theo mtime và layout thư mục theo exchange folder
+_config_cache = {"path": None, "mtime": None, "config": None}
+_paths_cache = {}
 
 
 def set_export_settings(preferences=None):
@@ -58,4 +76,980 @@ def ensure_dir_exists(directory):
     """
     if directory and not os.path.exists(directory):
         os.makedirs(directory)
-    return directory
\ No newline at end of file
+    return directory
+
+
+def get_config_path():
+    """
+    Path of the add-on settings file next to this module.
+
+    Returns:
+        Path of the first existing settings file, or the default one
+    """
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    for file_name in CONFIG_FILE_NAMES:
+        config_path = os.path.join(base_dir, file_name)
+        if os.path.exists(config_path):
+            return config_path
+    return os.path.join(base_dir, CONFIG_FILE_NAMES[0])
+
+
+def get_config():
+    """
+    Parsed add-on settings, cached until the file mtime changes.
+
+    Returns:
+        ConfigParser object (empty if the file is missing or invalid)
+    """
+    config_path = get_config_path()
+    try:
+        mtime = os.path.getmtime(config_path)
+    except OSError:
+        mtime = None
+
+    if (_config_cache["config"] is not None
+            and _config_cache["path"] == config_path
+            and _config_cache["mtime"] == mtime):
+        return _config_cache["config"]
+
+    config = configparser.ConfigParser()
+    if mtime is not None:
+        try:
+            config.read(config_path)
+        except configparser.Error:
+            config = configparser.ConfigParser()
+
+    _config_cache["path"] = config_path
+    _config_cache["mtime"] = mtime
+    _config_cache["config"] = config
+    return config
+
+
+def get_port():
+    """
+    Live link port from the settings file.
+
+    Returns:
+        Port number
+    """
+    return get_config().getint(CONFIG_SECTION, "port", fallback=48152)
+
+
+def get_exchange_folder():
+    """
+    Exchange folder from the settings file, falling back to the temp folder.
+
+    Returns:
+        Exchange folder path
+    """
+    config = get_config()
+    exchange_folder = config.get(CONFIG_SECTION, "exchange_folder", fallback="")
+    return exchange_folder or tempfile.gettempdir()
+
+
+class ExchangePaths:
+    """Folder layout of an exchange folder, resolved once per process."""
+
+    def __init__(self, exchange_folder):
+        self.exchange_folder = ensure_dir_exists(exchange_folder)
+        self.blender_trigger_folder = ensure_dir_exists(os.path.join(exchange_folder, "blender_triggers"))
+        self.cascadeur_trigger_folder = ensure_dir_exists(os.path.join(exchange_folder, "cascadeur_triggers"))
+        self.fbx_folder = ensure_dir_exists(os.path.join(exchange_folder, "fbx"))
+        self.json_folder = ensure_dir_exists(os.path.join(exchange_folder, "json"))
+        self._fbx_scene_loader_tool = None
+
+    @property
+    def fbx_scene_loader_tool(self):
+        """FbxSceneLoader tool handle, looked up on first use."""
+        if self._fbx_scene_loader_tool is None:
+            tools_manager = csc.app.get_application().get_tools_manager()
+            self._fbx_scene_loader_tool = tools_manager.get_tool("FbxSceneLoader")
+        return self._fbx_scene_loader_tool
+
+    def fbx_loader(self, scene):
+        """FBX loader bound to a Cascadeur scene."""
+        return self.fbx_scene_loader_tool.get_fbx_loader(scene)
+
+
+def get_paths():
+    """
+    Cached folder layout for the configured exchange folder.
+
+    Returns:
+        ExchangePaths object
+    """
+    exchange_folder = get_exchange_folder()
+    paths = _paths_cache.get(exchange_folder)
+    if paths is None:
+        paths = ExchangePaths(exchange_folder)
+        _paths_cache[exchange_folder] = paths
+    return paths
+
+
+def find_newest_trigger(folder, prefix="trigger_"):
+    """
+    Newest unprocessed trigger file in a folder.
+
+    Args:
+        folder: Trigger folder
+        prefix: File name prefix to match
+
+    Returns:
+        Trigger file path or None
+    """
+    newest_trigger = None
+    newest_time = 0
+
+    for entry in os.scandir(folder):
+        if entry.name.startswith(prefix) and entry.name.endswith(".json"):
+            mtime = entry.stat().st_mtime
+            if mtime > newest_time:
+                newest_time = mtime
+                newest_trigger = entry.path
+
+    return newest_trigger
+
+
+def consume_trigger(trigger_path):
+    """
+    Read a trigger file and mark it as processed.
+
+    Args:
+        trigger_path: Trigger file path
+
+    Returns:
+        Trigger data dictionary
+    """
+    with open(trigger_path, 'r') as f:
+        trigger_data = json.load(f)
+
+    os.rename(trigger_path, trigger_path + ".processed")
+
+    # Blender gửi một số trigger với data lồng {"action": ..., "data": {...}}
+    data = trigger_data.get("data")
+    if isinstance(data, dict) and data.get("action") == trigger_data.get("action") and isinstance(data.get("data"), dict):
+        trigger_data["data"] = data["data"]
+    return trigger_data
+
+
+# Số thứ tự trigger gửi Blender: nhiều trigger cùng stamp không trùng tên file
+_trigger_sequence = itertools.count(1)
+
+
+def write_blender_trigger(paths, action, data, stamp):
+    """
+    Write a trigger file for Blender.
+
+    Args:
+        paths: ExchangePaths object
+        action: Action name for Blender
+        data: Action data
+        stamp: Time stamp used in the file name
+
+    Returns:
+        Trigger file path
+    """
+    sequence = next(_trigger_sequence)
+    trigger_data = {
+        "action": action,
+        "sequence": sequence,
+        "data": data
+    }
+
+    trigger_path = os.path.join(paths.blender_trigger_folder, f"trigger_{action}_{stamp}_{sequence:06d}.json")
+
+    # Ghi vào file tạm rồi đổi tên: Blender không bao giờ đọc file ghi dở
+    temp_path = trigger_path + ".tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(trigger_data, f, indent=2)
+    os.replace(temp_path, trigger_path)
+    return trigger_path
+
+
+# Các node FBX thay đổi ở mỗi lần export dù nội dung scene không đổi
+FBX_VOLATILE_NODES = {b"FBXHeaderExtension", b"FileId", b"CreationTime", b"Creator"}
+# Các node có UniqueID được đánh lại mỗi lần export
+FBX_ID_NODES = {b"Objects", b"Documents"}
+FBX_BINARY_MAGIC = b"Kaydara FBX Binary  \x00"
+FBX_SCALAR_FORMATS = {b"Y": "<h", b"C": "<?", b"I": "<i", b"F": "<f", b"D": "<d", b"L": "<q"}
+SCENE_STATE_FILE = "cascadeur_scene_state.json"
+
+# Trạng thái export của các scene, được nạp từ file một lần mỗi process
+_scene_state_cache = {}
+
+
+def _hash_bytes(f, digest, remaining, chunk_size):
+    """Feed the next `remaining` bytes of a file to a digest, chunk by chunk."""
+    while remaining > 0:
+        chunk = f.read(min(chunk_size, remaining))
+        if not chunk:
+            break
+        digest.update(chunk)
+        remaining -= len(chunk)
+
+
+def _read_fbx_properties(data, count):
+    """
+    Decode the scalar and string properties of a small FBX record.
+
+    Returns:
+        List of (type code, value), None for array properties
+    """
+    props = []
+    offset = 0
+    for _ in range(count):
+        code = data[offset:offset + 1]
+        offset += 1
+        if code in (b"S", b"R"):
+            length = struct.unpack_from("<I", data, offset)[0]
+            props.append((code, data[offset + 4:offset + 4 + length]))
+            offset += 4 + length
+        elif code in FBX_SCALAR_FORMATS:
+            fmt = FBX_SCALAR_FORMATS[code]
+            props.append((code, struct.unpack_from(fmt, data, offset)[0]))
+            offset += struct.calcsize(fmt)
+        else:
+            return None
+    return props
+
+
+
+def fbx_content_hash(fbx_path, chunk_size=1 << 20):
+    """
+    Hash of an FBX file that ignores creation time stamps and file ids.
+
+    The UniqueIDs of the objects and of their connections are replaced by
+    their order of appearance, so that two exports of the same scene give
+    the same hash even if the exporter numbers the objects differently.
+
+    Args:
+        fbx_path: FBX file path
+        chunk_size: Read size in bytes
+
+    Returns:
+        Hex digest string
+    """
+    import hashlib
+
+    digest = hashlib.blake2b(digest_size=16)
+    # UniqueID 0 là root của scene
+    ordinals = {0: 0}
+
+    def ordinal(unique_id):
+        return struct.pack("<q", ordinals.setdefault(unique_id, len(ordinals)))
+
+    with open(fbx_path, 'rb') as f:
+        header = f.read(27)
+        if not header.startswith(FBX_BINARY_MAGIC):
+            # ASCII FBX: hash the whole file
+            digest.update(header)
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+            return digest.hexdigest()
+
+        version = struct.unpack("<I", header[23:27])[0]
+        record_format = "<QQQB" if version >= 7500 else "<IIIB"
+        record_size = struct.calcsize(record_format)
+
+        def read_record():
+            record = f.read(record_size)
+            if len(record) < record_size:
+                return None
+            end_offset, num_props, props_len, name_len = struct.unpack(record_format, record)
+            if end_offset == 0:
+                return None
+            return end_offset, num_props, props_len, f.read(name_len)
+
+        # Chỉ duyệt các node cấp cao nhất, bỏ qua node có time stamp
+        while True:
+            top = read_record()
+            if top is None:
+                break
+            end_offset, _, props_len, name = top
+            if name in FBX_VOLATILE_NODES:
+                f.seek(end_offset)
+                continue
+
+            digest.update(name)
+            if name not in FBX_ID_NODES and name != b"Connections":
+                _hash_bytes(f, digest, end_offset - f.tell(), chunk_size)
+                continue
+
+            # Node con: UniqueID đầu tiên (object) hoặc mọi UniqueID (connection) được đánh lại
+            _hash_bytes(f, digest, props_len, chunk_size)
+            while f.tell() < end_offset:
+                child = read_record()
+                if child is None:
+                    break
+                child_end, num_props, child_props_len, child_name = child
+                digest.update(child_name)
+                if name == b"Connections":
+                    props = _read_fbx_properties(f.read(child_props_len), num_props)
+                    for code, value in props or ():
+                        digest.update(code)
+                        digest.update(ordinal(value) if code == b"L" else repr(value).encode())
+                else:
+                    code = f.read(1)
+                    digest.update(code)
+                    if code == b"L":
+                        digest.update(ordinal(struct.unpack("<q", f.read(8))[0]))
+                _hash_bytes(f, digest, child_end - f.tell(), chunk_size)
+            f.seek(end_offset)
+
+    return digest.hexdigest()
+
+
+def scene_signature(scene):
+    """
+    Cheap change signature of a Cascadeur scene, read without exporting it.
+
+    Covers the objects with their names and the layers with their length
+    and key frames.
+
+    Args:
+        scene: Cascadeur domain scene
+
+    Returns:
+        Hex digest string, or None if the scene cannot be read
+    """
+    import hashlib
+
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        mv = scene.model_viewer()
+        for object_id in mv.get_objects():
+            digest.update(f"o{object_id}:{mv.get_object_name(object_id)}\n".encode())
+
+        lv = scene.layers_viewer()
+        for layer_id in lv.all_layer_ids():
+            digest.update(f"l{layer_id}:{lv.frames_count([layer_id])}".encode())
+            try:
+                frames = sorted(int(frame) for frame in lv.layer(layer_id).key_frame_indices())
+            except Exception:
+                # Folder layer không có key
+                frames = []
+            digest.update(f":{frames}\n".encode())
+    except Exception:
+        return None
+    return digest.hexdigest()
+
+
+def scene_key(scene, index):
+    """
+    Stable key for a Cascadeur scene, used to track it between runs.
+
+    Args:
+        scene: Cascadeur scene
+        index: Index of the scene in the scene manager
+
+    Returns:
+        Scene key string
+    """
+    for getter in (lambda: scene.name(), lambda: scene.domain_scene().name()):
+        try:
+            name = getter()
+            if name:
+                return str(name)
+        except Exception:
+            pass
+    return f"scene{index}"
+
+
+def load_scene_state(paths):
+    """
+    Export state of the scenes (content hash and FBX path per scene key).
+
+    Args:
+        paths: ExchangePaths object
+
+    Returns:
+        Dictionary keyed by scene key
+    """
+    state = _scene_state_cache.get(paths.exchange_folder)
+    if state is not None:
+        return state
+
+    state = {}
+    state_path = os.path.join(paths.exchange_folder, SCENE_STATE_FILE)
+    if os.path.exists(state_path):
+        try:
+            with open(state_path, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+
+    _scene_state_cache[paths.exchange_folder] = state
+    return state
+
+
+def save_scene_state(paths, state):
+    """
+    Persist the export state of the scenes.
+
+    Args:
+        paths: ExchangePaths object
+        state: Dictionary keyed by scene key
+    """
+    _scene_state_cache[paths.exchange_folder] = state
+    state_path = os.path.join(paths.exchange_folder, SCENE_STATE_FILE)
+    with open(state_path, 'w') as f:
+        json.dump(state, f, indent=2)
+
+
+def export_scenes_incremental(paths, scenes, stamp, force=False, log=None):
+    """
+    Export the changed scenes to FBX.
+
+    A scene whose signature (objects, layers and key frames) did not change
+    since the last run is not exported again. Otherwise it is exported and
+    its FBX is kept only if the content hash changed. Edits that only move
+    the value of an existing key keep the signature: `force` exports every
+    scene again.
+
+    Args:
+        paths: ExchangePaths object
+        scenes: List of Cascadeur scenes
+        stamp: Time stamp used in the file names
+        force: Treat every scene as changed
+        log: Optional callable receiving progress messages
+
+    Returns:
+        Manifest dictionary for the import_all_scenes trigger
+    """
+    state = load_scene_state(paths)
+    fbx_paths = []
+    scene_entries = []
+
+    for i, s in enumerate(scenes):
+        key = scene_key(s, i)
+        try:
+            signature = scene_signature(s.domain_scene())
+        except Exception:
+            signature = None
+
+        previous = state.get(key, {})
+        previous_path = previous.get("fbx_path", "")
+        content_hash = previous.get("hash")
+
+        # Signature không đổi: không cần export lại scene
+        if (not force and signature is not None
+                and previous.get("signature") == signature
+                and os.path.exists(previous_path)):
+            changed = False
+        else:
+            fbx_path = os.path.join(paths.fbx_folder, f"cascadeur_to_blender_{stamp}_scene{i}.fbx")
+            paths.fbx_loader(s).export_all_objects(fbx_path)
+            content_hash = fbx_content_hash(fbx_path)
+            changed = (force
+                       or previous.get("hash") != content_hash
+                       or not os.path.exists(previous_path))
+            if not changed:
+                # Nội dung không đổi: bỏ file mới, giữ file đã import trước đó
+                os.remove(fbx_path)
+
+        if changed:
+            fbx_paths.append(fbx_path)
+            state[key] = {"hash": content_hash, "fbx_path": fbx_path, "signature": signature}
+            if log:
+                log(f"Exported scene {i} to {fbx_path}")
+        else:
+            fbx_path = previous_path
+            state[key] = dict(previous, signature=signature)
+            if log:
+                log(f"Scene {i} unchanged, skipped")
+
+        scene_entries.append({
+            "scene": key,
+            "index": i,
+            "fbx_path": fbx_path,
+            "hash": content_hash,
+            "changed": changed
+        })
+
+    save_scene_state(paths, state)
+
+    return {
+        "fbx_paths": fbx_paths,
+        "scenes": scene_entries
+    }
+
+
+def parse_marked_frames(keyframes_data):
+    """
+    Marked frame numbers from Blender keyframe data.
+
+    Accepts the exported metadata ({"12": {}, ...}), a plain list of frames,
+    or a trigger payload wrapping either under "keyframes" or "frames".
+
+    Args:
+        keyframes_data: Decoded JSON data
+
+    Returns:
+        Sorted list of unique frame numbers
+    """
+    data = keyframes_data
+    while isinstance(data, dict) and "data" in data and isinstance(data["data"], dict):
+        data = data["data"]
+
+    if isinstance(data, dict):
+        if "frames" in data:
+            data = data["frames"]
+        elif "keyframes" in data:
+            data = data["keyframes"]
+
+    if isinstance(data, dict):
+        data = data.keys()
+
+    frames = set()
+    for frame in data or []:
+        try:
+            frames.add(int(frame))
+        except (TypeError, ValueError):
+            pass
+    return sorted(frames)
+
+
+def apply_marked_frames(scene, marked_frames, title='Apply marked keyframes'):
+    """
+    Set an interval section at every marked frame on every layer.
+
+    All layers are edited inside a single scene.modify call.
+
+    Args:
+        scene: Cascadeur scene
+        marked_frames: Sorted list of frame numbers
+        title: Name of the modification in the undo history
+
+    Returns:
+        Number of sections set
+    """
+    return apply_layer_marks(scene, [(None, marked_frames)], title)
+
+
+def apply_layer_marks(scene, layer_marks, title='Apply marked keyframes'):
+    """
+    Set interval sections at marked frames, each list of frames on its own
+    layers, inside a single scene.modify call.
+
+    Args:
+        scene: Cascadeur scene
+        layer_marks: List of (layer ids or None for every layer, sorted frames)
+        title: Name of the modification in the undo history
+
+    Returns:
+        Number of sections set
+    """
+    import bisect
+
+    lv = scene.layers_viewer()
+    applied_count = 0
+
+    def mod(model, update, scene):
+        nonlocal applied_count
+        le = model.layers_editor()
+        all_layer_ids = lv.all_layer_ids()
+
+        for layer_ids, marked_frames in layer_marks:
+            for layer_id in (all_layer_ids if layer_ids is None else layer_ids):
+                # Chỉ các frame nằm trong độ dài của layer
+                max_frame = lv.frames_count([layer_id])
+                end = bisect.bisect_right(marked_frames, max_frame)
+
+                for frame in marked_frames[:end]:
+                    if frame < 0:
+                        continue
+                    try:
+                        le.set_section(frame, layer_id)
+                        applied_count += 1
+                    except Exception:
+                        # Bỏ qua frame không thể đặt section
+                        pass
+
+    scene.modify(title, mod)
+    return applied_count
+
+
+def apply_keyframes_json(scene, json_path):
+    """
+    Load Blender keyframe metadata and apply it to the scene.
+
+    Args:
+        scene: Cascadeur scene
+        json_path: Keyframe JSON path
+
+    Returns:
+        Number of marked frames found in the file
+    """
+    with open(json_path, 'r') as f:
+        marked_frames = parse_marked_frames(json.load(f))
+
+    if marked_frames:
+        apply_marked_frames(scene, marked_frames)
+    return len(marked_frames)
+
+
+def collect_key_frames(scene):
+    """
+    Key frames of all layers of a scene, gathered in one pass.
+
+    Args:
+        scene: Cascadeur scene
+
+    Returns:
+        Sorted list of unique frame numbers
+    """
+    lv = scene.layers_viewer()
+    frames = set()
+
+    for layer_id in lv.all_layer_ids():
+        try:
+            frames.update(lv.layer(layer_id).key_frame_indices())
+        except Exception:
+            # Folder layer hoặc layer không có key
+            pass
+
+    return sorted(int(frame) for frame in frames)
+
+
+IMPORTED_OBJECTS_FILE = "cascadeur_imported_objects.json"
+
+# Các object đã import từ Blender theo scene, được nạp từ file một lần mỗi process
+_imported_objects_cache = {}
+
+
+def current_scene_key(scene_manager):
+    """
+    Key of the current scene of the scene manager.
+
+    Args:
+        scene_manager: Cascadeur scene manager
+
+    Returns:
+        Scene key string
+    """
+    current = scene_manager.current_scene()
+    index = 0
+    try:
+        for i, s in enumerate(scene_manager.scenes()):
+            if s == current:
+                index = i
+                break
+    except Exception:
+        pass
+    return scene_key(current, index)
+
+
+def load_imported_objects(paths):
+    """
+    Blender objects already imported into each scene.
+
+    Args:
+        paths: ExchangePaths object
+
+    Returns:
+        Dictionary {scene key: {object name: info}}
+    """
+    imported = _imported_objects_cache.get(paths.exchange_folder)
+    if imported is not None:
+        return imported
+
+    imported = {}
+    imported_path = os.path.join(paths.exchange_folder, IMPORTED_OBJECTS_FILE)
+    if os.path.exists(imported_path):
+        try:
+            with open(imported_path, 'r') as f:
+                imported = json.load(f)
+        except (OSError, ValueError):
+            imported = {}
+
+    _imported_objects_cache[paths.exchange_folder] = imported
+    return imported
+
+
+def save_imported_objects(paths, imported):
+    """
+    Persist the Blender objects imported into each scene.
+
+    Args:
+        paths: ExchangePaths object
+        imported: Dictionary {scene key: {object name: info}}
+    """
+    _imported_objects_cache[paths.exchange_folder] = imported
+    imported_path = os.path.join(paths.exchange_folder, IMPORTED_OBJECTS_FILE)
+    with open(imported_path, 'w') as f:
+        json.dump(imported, f, indent=2)
+
+
+def scene_has_object(scene, object_name):
+    """
+    Check whether a scene still contains an object with the given name.
+
+    Args:
+        scene: Cascadeur scene
+        object_name: Object name
+
+    Returns:
+        True or False, or None if the scene objects cannot be listed
+    """
+    try:
+        mv = scene.model_viewer()
+        for object_id in mv.get_objects():
+            if mv.get_object_name(object_id) == object_name:
+                return True
+        return False
+    except Exception:
+        return None
+
+
+def import_object_fbx(paths, scene, key, fbx_loader, fbx_path, data):
+    """
+    Import an FBX sent from Blender, updating only the animation of objects
+    that were already imported into the scene.
+
+    Args:
+        paths: ExchangePaths object
+        scene: Cascadeur scene
+        key: Scene key
+        fbx_loader: FBX loader bound to the scene
+        fbx_path: FBX file path
+        data: Trigger data ("object_name", "force_model", "skeleton_only",
+              "payload_hash", "generation", "stage")
+
+    Returns:
+        "animation" if only the animation was updated, "model" otherwise,
+        "skipped" for a stale part of a progressive transfer
+    """
+    object_name = data.get("object_name", "")
+    imported = load_imported_objects(paths)
+    scene_objects = imported.setdefault(key, {})
+
+    known = bool(object_name) and object_name in scene_objects
+    if known and scene_has_object(scene, object_name) is False:
+        # Object đã bị xóa khỏi scene
+        known = False
+
+    # Truyền progressive: bản proxy bị bỏ qua khi bản đầy đủ (hoặc bản mới hơn) đã được áp dụng
+    generation = data.get("generation", 0)
+    stored_generation = scene_objects[object_name].get("generation", 0) if known else 0
+    if generation and (generation < stored_generation or
+                       (generation == stored_generation and data.get("stage") != "full")):
+        return "skipped"
+    # Bản proxy cùng generation đã import model, bản đầy đủ chỉ thay animation
+    force_model = data.get("force_model", False) and not (generation and generation == stored_generation)
+
+    payload = data.get("payload_hash", "")
+    stored_payload = scene_objects[object_name].get("payload_hash", "") if known else ""
+
+    if data.get("skeleton_only", False):
+        # FBX chỉ chứa skeleton: mesh phải đã được import với cùng payload
+        if not known or stored_payload != payload:
+            write_blender_trigger(paths, "reset_payload", {"object_name": object_name},
+                                  time.strftime("%Y%m%d%H%M%S"))
+            raise RuntimeError(f"The mesh of {object_name} is not in this scene, export the object again")
+
+    # Rig hoặc mesh đã thay đổi từ lần import trước thì import lại model
+    payload_changed = bool(payload and stored_payload) and payload != stored_payload
+
+    if known and not force_model and not payload_changed:
+        fbx_loader.import_animation(fbx_path)
+        scene_objects[object_name]["fbx_path"] = fbx_path
+        if generation:
+            scene_objects[object_name]["generation"] = generation
+        save_imported_objects(paths, imported)
+        return "animation"
+
+    fbx_loader.import_model(fbx_path)
+    if object_name:
+        scene_objects[object_name] = {"fbx_path": fbx_path, "payload_hash": data.get("payload_hash", "")}
+        if generation:
+            scene_objects[object_name]["generation"] = generation
+        save_imported_objects(paths, imported)
+    return "model"
+
+
+def scene_object_ids(scene, object_name=None):
+    """
+    Ids of the objects of a scene, or of the objects with a given name.
+
+    Returns:
+        Set of object ids (empty if the scene objects cannot be listed)
+    """
+    try:
+        mv = scene.model_viewer()
+        return {object_id for object_id in mv.get_objects()
+                if object_name is None or mv.get_object_name(object_id) == object_name}
+    except Exception:
+        return set()
+
+
+def object_layer_ids(scene, object_ids):
+    """
+    Layers holding the given objects.
+
+    Returns:
+        Set of layer ids (empty if none can be found)
+    """
+    lv = scene.layers_viewer()
+    layer_ids = set()
+    for object_id in object_ids:
+        try:
+            layer_id = lv.layer_id_by_obj_id(object_id)
+        except Exception:
+            continue
+        if layer_id is not None:
+            layer_ids.add(layer_id)
+    return layer_ids
+
+
+def read_item_frames(item):
+    """Marked frames of a batch item, from its keyframe JSON."""
+    json_path = item.get("json_path", "")
+    if not json_path or not os.path.exists(json_path):
+        return []
+    with open(json_path, 'r') as f:
+        return parse_marked_frames(json.load(f))
+
+
+def import_batch(paths, scene, app_scene, key, fbx_loader, items, scene_manager=None):
+    """
+    Import every item of an "import_batch" manifest sent from Blender.
+
+    Items flagged "new_scene" (the actions of one armature) are imported
+    as a model into a new Cascadeur scene each, so that one action does not
+    replace another on the same object. The other items are imported into
+    the current scene. Every item gets only its own marked frames: on the
+    layers of its objects in the current scene (all applied in a single
+    modify), or on every layer of its own scene.
+
+    Args:
+        paths: ExchangePaths object
+        scene: Cascadeur scene used for modify
+        app_scene: Current application scene
+        key: Scene key
+        fbx_loader: FBX loader bound to the scene
+        items: List of {"fbx_path", "json_path", "object_name", "force_model", "new_scene"}
+        scene_manager: Cascadeur scene manager, needed for "new_scene" items
+
+    Returns:
+        (imported count, marked frame count, list of error messages)
+    """
+    imported_count = 0
+    marked_count = 0
+    errors = []
+    current_marks = []
+
+    for item in items:
+        fbx_path = item.get("fbx_path", "")
+        if not fbx_path or not os.path.exists(fbx_path):
+            errors.append(f"FBX file not found: {fbx_path}")
+            continue
+        try:
+            frames = read_item_frames(item)
+            if item.get("new_scene", False):
+                if scene_manager is None:
+                    raise RuntimeError("no scene manager to create a scene")
+                target = scene_manager.create_application_scene()
+                paths.fbx_loader(target).import_model(fbx_path)
+                imported_count += 1
+                if frames:
+                    apply_marked_frames(target.domain_scene(), frames)
+                    marked_count += len(frames)
+                continue
+
+            before = scene_object_ids(app_scene)
+            mode = import_object_fbx(paths, app_scene, key, fbx_loader, fbx_path, item)
+            if mode == "skipped":
+                continue
+            imported_count += 1
+        except Exception as e:
+            errors.append(f"Failed to import {fbx_path}: {e}")
+            continue
+
+        if frames:
+            if mode == "model":
+                object_ids = scene_object_ids(app_scene) - before
+            else:
+                object_ids = scene_object_ids(app_scene, item.get("object_name", ""))
+            current_marks.append((fbx_path, object_layer_ids(scene, object_ids), frames))
+
+    # Frame đánh dấu của mỗi item chỉ đặt trên layer của item đó
+    layer_marks = []
+    for fbx_path, layer_ids, frames in current_marks:
+        if not layer_ids and len(current_marks) > 1:
+            errors.append(f"Marked keyframes of {fbx_path} not applied: its layers were not found")
+            continue
+        layer_marks.append((layer_ids or None, frames))
+        marked_count += len(frames)
+    if layer_marks:
+        apply_layer_marks(scene, layer_marks, 'Apply marked keyframes of batch')
+    return imported_count, marked_count, errors
+
+
+class LiveLinkReader:
+    """
+    Resident reader of the live link: a thread decodes every pose received
+    on the port into a live_link_protocol.PoseDecoder, which keeps the
+    newest pose and the stream statistics. Errors in a packet never stop
+    the thread.
+    """
+
+    def __init__(self, port, host="127.0.0.1"):
+        self.address = (host, port)
+        self.decoder = live_link_protocol.PoseDecoder()
+        self._socket = None
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind(self.address)
+        self._socket.settimeout(0.5)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        if self._socket:
+            self._socket.close()
+
+    def _run(self):
+        buffer = bytearray(live_link_protocol.MAX_PACKET_SIZE)
+        view = memoryview(buffer)
+        while self._running:
+            try:
+                length = self._socket.recv_into(buffer)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            try:
+                self.decoder.decode(view[:length])
+            except Exception:
+                # Gói lỗi không được làm dừng thread
+                self.decoder.invalid += 1
+
+
+# Reader chạy thường trú trong process Cascadeur giữa các lần chạy command
+_live_link_reader = None
+
+
+def start_live_link_reader(port=None):
+    """Start the resident live link reader (stopping the previous one)."""
+    global _live_link_reader
+    stop_live_link_reader()
+    reader = LiveLinkReader(port or get_port())
+    reader.start()
+    _live_link_reader = reader
+    return reader
+
+
+def stop_live_link_reader():
+    """Stop the resident live link reader, returns it (or None)."""
+    global _live_link_reader
+    reader, _live_link_reader = _live_link_reader, None
+    if reader is not None:
+        reader.stop()
+    return reader
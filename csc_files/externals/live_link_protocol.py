@@ -0,0 +1,238 @@
+# Giao thức live link: pose của armature qua UDP trên localhost.
+#
+# Module này chỉ dùng thư viện chuẩn để cả hai bên cùng import: Blender
+# (utils/live_link.py), Cascadeur (commons.py) và script nhận thử
+# (utils/live_link_receiver.py) chạy bằng Python thường.
+#
+# Mỗi datagram (little-endian):
+#   header  HEADER_FORMAT (32 bytes)
+#   FLAG_KEY (pose đầy đủ):
+#     u4 kích thước bảng tên, tên bone UTF-8 ngăn cách bằng b"\0" (đệm tới 4 byte)
+#     float32 (bone_count, 16) matrix_basis
+#   delta (chỉ các bone đã thay đổi so với frame gửi trước):
+#     u2 (changed_count,) index bone (đệm tới 4 byte)
+#     float32 (changed_count, 16) matrix_basis
+#
+# Ma trận có thứ tự như foreach_get("matrix_basis") trả về (theo cột).
+# Delta chứa giá trị tuyệt đối của các bone thay đổi, nên mất một gói chỉ
+# làm bone đó cũ cho tới lần thay đổi tiếp theo hoặc pose đầy đủ kế tiếp.
+import os
+import sys
+import time
+import struct
+from array import array
+
+LIVE_MAGIC = b"B2CL"
+LIVE_VERSION = 1
+
+# Flags trong header
+FLAG_KEY = 1
+
+# magic, version, flags, bone_count, stream, sequence, sent_time, frame, changed_count
+HEADER_FORMAT = "<4sBBHIIdfI"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+# Kích thước một ma trận (16 float32)
+MATRIX_SIZE = 64
+
+# Giới hạn kích thước datagram UDP
+MAX_PACKET_SIZE = 65507
+
+# Số bone tối đa bên nhận giữ trong buffer
+MAX_BONES = 1024
+
+# Khoảng thời gian tối đa giữa hai pose đầy đủ (giây)
+KEY_INTERVAL = 1.0
+
+
+def _pad4(data):
+    return data + b"\0" * (-len(data) % 4)
+
+
+def _name_table(bone_names):
+    return _pad4(b"\0".join(name.encode("utf-8") for name in bone_names))
+
+
+def _read_floats(data):
+    """float32 values of a little-endian buffer."""
+    values = array("f")
+    values.frombytes(data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def check_pose_size(bone_names):
+    """
+    Raise ValueError if a rig cannot be streamed.
+
+    The full pose (names and all matrices) is the largest packet of a
+    stream and must fit in one datagram.
+    """
+    bone_names = list(bone_names)
+    if len(bone_names) > MAX_BONES:
+        raise ValueError(f"The live link supports at most {MAX_BONES} bones, the rig has {len(bone_names)}")
+    size = HEADER_SIZE + 4 + len(_name_table(bone_names)) + len(bone_names) * MATRIX_SIZE
+    if size > MAX_PACKET_SIZE:
+        raise ValueError(f"The pose of {len(bone_names)} bones needs {size} bytes, "
+                         f"more than one UDP packet ({MAX_PACKET_SIZE} bytes)")
+
+
+class PoseEncoder:
+    """Encode the poses of one armature into live link packets."""
+
+    def __init__(self, bone_names, key_interval=KEY_INTERVAL):
+        self.bone_names = list(bone_names)
+        check_pose_size(self.bone_names)
+        self.key_interval = key_interval
+        self.stream = struct.unpack("<I", os.urandom(4))[0]
+        self.sequence = 0
+        self.previous = None
+        self.last_key_time = 0.0
+        self._names = _name_table(self.bone_names)
+
+    def encode(self, matrices, frame, now=None):
+        """
+        Encode a pose.
+
+        Args:
+            matrices: Contiguous float32 buffer of bone_count * 16 matrix_basis
+                      values (numpy array, array("f") or bytes)
+            frame: Current frame (float, with subframe)
+            now: Send time (time.time()), used for latency measurement
+
+        Returns:
+            Packet bytes, or None if nothing changed since the last packet
+        """
+        now = time.time() if now is None else now
+        data = memoryview(matrices).cast("B")
+        bone_count = len(self.bone_names)
+        if len(data) != bone_count * MATRIX_SIZE:
+            raise ValueError(f"Expected {bone_count} matrices, got {len(data)} bytes")
+
+        if self.previous is None or now - self.last_key_time >= self.key_interval:
+            flags = FLAG_KEY
+            body = struct.pack("<I", len(self._names)) + self._names + bytes(data)
+            changed_count = bone_count
+            self.last_key_time = now
+        else:
+            # Ma trận không đổi giữ nguyên từng byte khi đọc lại từ cùng một pose
+            previous = memoryview(self.previous)
+            changed = [i for i in range(bone_count)
+                       if data[i * MATRIX_SIZE:(i + 1) * MATRIX_SIZE] != previous[i * MATRIX_SIZE:(i + 1) * MATRIX_SIZE]]
+            if not changed:
+                return None
+            flags = 0
+            indices = _pad4(struct.pack(f"<{len(changed)}H", *changed))
+            body = indices + b"".join(data[i * MATRIX_SIZE:(i + 1) * MATRIX_SIZE] for i in changed)
+            changed_count = len(changed)
+
+        self.sequence += 1
+        header = struct.pack(
+            HEADER_FORMAT, LIVE_MAGIC, LIVE_VERSION, flags, bone_count,
+            self.stream, self.sequence, now, frame, changed_count)
+
+        if self.previous is None:
+            self.previous = bytearray(data)
+        else:
+            self.previous[:] = data
+        return header + body
+
+
+class PoseDecoder:
+    """
+    Keep the newest pose of a live link stream in a preallocated buffer.
+
+    `matrices` holds 16 floats per bone (column-major matrix_basis, as
+    Blender sends it). Packets older than the last decoded one are dropped,
+    deltas are only applied after a full pose of the same stream.
+    Truncated, malformed or foreign packets are counted as invalid and leave
+    the pose untouched.
+    """
+
+    def __init__(self, max_bones=MAX_BONES):
+        self.max_bones = max_bones
+        self.matrices = array("f", bytes(max_bones * MATRIX_SIZE))
+        self.bone_names = []
+        self.stream = None
+        self.sequence = 0
+        self.frame = 0.0
+        self.sent_time = 0.0
+        # Thống kê
+        self.packets = 0
+        self.bytes = 0
+        self.lost = 0
+        self.stale = 0
+        self.invalid = 0
+
+    def _reject(self):
+        self.invalid += 1
+        return False
+
+    def decode(self, packet):
+        """
+        Update the pose from a packet.
+
+        Returns:
+            True if the pose changed, False if the packet was dropped
+        """
+        packet = memoryview(packet).cast("B")
+        size = len(packet)
+        if size < HEADER_SIZE:
+            return self._reject()
+        (magic, version, flags, bone_count, stream, sequence,
+         sent_time, frame, changed_count) = struct.unpack_from(HEADER_FORMAT, packet, 0)
+        key = bool(flags & FLAG_KEY)
+        if (magic != LIVE_MAGIC or version > LIVE_VERSION or bone_count > self.max_bones
+                or changed_count > bone_count or (key and changed_count != bone_count)):
+            return self._reject()
+
+        if stream != self.stream:
+            # Stream mới (bên gửi khởi động lại): chờ pose đầy đủ
+            if not key:
+                return False
+        elif sequence <= self.sequence:
+            self.stale += 1
+            return False
+
+        # Kiểm tra toàn bộ độ dài trước khi ghi vào pose
+        offset = HEADER_SIZE
+        if key:
+            if size < offset + 4:
+                return self._reject()
+            (names_size,) = struct.unpack_from("<I", packet, offset)
+            offset += 4
+            names = bytes(packet[offset:offset + names_size]).rstrip(b"\0")
+            offset += names_size + (-names_size % 4)
+            try:
+                bone_names = names.decode("utf-8").split("\0") if bone_count else []
+            except UnicodeDecodeError:
+                return self._reject()
+            if len(bone_names) != bone_count or size < offset + bone_count * MATRIX_SIZE:
+                return self._reject()
+        else:
+            indices_end = offset + changed_count * 2
+            offset = indices_end + (-changed_count * 2 % 4)
+            if bone_count != len(self.bone_names) or size < offset + changed_count * MATRIX_SIZE:
+                return self._reject()
+            indices = struct.unpack_from(f"<{changed_count}H", packet, HEADER_SIZE)
+            if indices and max(indices) >= bone_count:
+                return self._reject()
+        values = _read_floats(packet[offset:offset + changed_count * MATRIX_SIZE])
+
+        if stream == self.stream and sequence > self.sequence + 1:
+            self.lost += sequence - self.sequence - 1
+        if key:
+            self.bone_names = bone_names
+            self.matrices[:bone_count * 16] = values
+        else:
+            for i, bone in enumerate(indices):
+                self.matrices[bone * 16:bone * 16 + 16] = values[i * 16:i * 16 + 16]
+
+        self.stream = stream
+        self.sequence = sequence
+        self.frame = frame
+        self.sent_time = sent_time
+        self.packets += 1
+        self.bytes += size
+        return True
@@ -1,8 +1,7 @@
 import csc
-import os
-import json
 import time
-import tempfile
+
+from . import commons
 
 
 def command_name():
@@ -10,31 +9,8 @@ def command_name():
 
 
 def run(scene):
-    # Cấu hình
-    try:
-        config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "settings.cfg")
-        import configparser
-        config = configparser.ConfigParser()
-        config.read(config_path)
-        
-        exchange_folder = config.get("Addon Settings", "exchange_folder", fallback=tempfile.gettempdir())
-    except:
-        # Fallback to temp dir
-        exchange_folder = tempfile.gettempdir()
-    
-    # Đảm bảo thư mục tồn tại
-    if not os.path.exists(exchange_folder):
-        os.makedirs(exchange_folder)
-    
-    # Thư mục trigger cho Blender
-    blender_trigger_folder = os.path.join(exchange_folder, "blender_triggers")
-    if not os.path.exists(blender_trigger_folder):
-        os.makedirs(blender_trigger_folder)
-
-    # Thư mục cho FBX
-    fbx_folder = os.path.join(exchange_folder, "fbx")
-    if not os.path.exists(fbx_folder):
-        os.makedirs(fbx_folder)
+    # Cấu hình và thư mục trao đổi (được cache trong commons)
+    paths = commons.get_paths()
 
     # Lấy đường dẫn tạm cho export
     current_time = time.strftime("%Y%m%d%H%M%S")
@@ -42,33 +18,15 @@ def run(scene):
     # Lấy app và scene hiện tại
     mp = csc.app.get_application()
     scene_manager = mp.get_scene_manager()
-    tools_manager = mp.get_tools_manager()
     
-    # Export tất cả scene
+    # Export tất cả scene, chỉ giữ các scene đã thay đổi
     try:
         scenes = scene_manager.scenes()
-        fbx_paths = []
-        
-        for i, s in enumerate(scenes):
-            fbx_path = os.path.join(fbx_folder, f"cascadeur_to_blender_{current_time}_scene{i}.fbx")
-            fbx_loader = tools_manager.get_tool("FbxSceneLoader").get_fbx_loader(s)
-            fbx_loader.export_all_objects(fbx_path)
-            fbx_paths.append(fbx_path)
-            scene.info(f"Exported scene {i} to {fbx_path}")
+        manifest = commons.export_scenes_incremental(paths, scenes, current_time, log=scene.info)
         
         # Tạo trigger cho Blender
-        trigger_data = {
-            "action": "import_all_scenes",
-            "data": {
-                "fbx_paths": fbx_paths
-            }
-        }
-        
-        # Ghi file trigger
-        trigger_path = os.path.join(blender_trigger_folder, f"trigger_import_all_scenes_{current_time}.json")
-        with open(trigger_path, 'w') as f:
-            json.dump(trigger_data, f, indent=2)
+        trigger_path = commons.write_blender_trigger(paths, "import_all_scenes", manifest, current_time)
         
-        scene.info(f"Created trigger for Blender at {trigger_path}")
+        scene.info(f"Created trigger for Blender at {trigger_path} ({len(manifest['fbx_paths'])} of {len(scenes)} scenes changed)")
     except Exception as e:
         scene.error(f"Failed to export all scenes: {str(e)}")
\ No newline at end of file
@@ -1,8 +1,8 @@
 import csc
 import os
-import json
 import time
-import tempfile
+
+from . import commons
 
 
 def command_name():
@@ -10,62 +10,20 @@ def command_name():
 
 
 def run(scene):
-    # Cấu hình
-    try:
-        config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "settings.cfg")
-        import configparser
-        config = configparser.ConfigParser()
-        config.read(config_path)
-        
-        exchange_folder = config.get("Addon Settings", "exchange_folder", fallback=tempfile.gettempdir())
-    except:
-        # Fallback to temp dir
-        exchange_folder = tempfile.gettempdir()
-    
-    # Đảm bảo thư mục tồn tại
-    if not os.path.exists(exchange_folder):
-        os.makedirs(exchange_folder)
-    
-    # Thư mục trigger cho Blender
-    blender_trigger_folder = os.path.join(exchange_folder, "blender_triggers")
-    if not os.path.exists(blender_trigger_folder):
-        os.makedirs(blender_trigger_folder)
-
-    # Thư mục cho FBX
-    fbx_folder = os.path.join(exchange_folder, "fbx")
-    if not os.path.exists(fbx_folder):
-        os.makedirs(fbx_folder)
+    # Cấu hình và thư mục trao đổi (được cache trong commons)
+    paths = commons.get_paths()
 
     # Lấy đường dẫn tạm cho export
     current_time = time.strftime("%Y%m%d%H%M%S")
-    fbx_path = os.path.join(fbx_folder, f"cascadeur_to_blender_{current_time}.fbx")
-
-    # Kiểm tra xem có thư mục cascadeur_triggers
-    cascade_trigger_folder = os.path.join(exchange_folder, "cascadeur_triggers")
-    if not os.path.exists(cascade_trigger_folder):
-        os.makedirs(cascade_trigger_folder)
+    fbx_path = os.path.join(paths.fbx_folder, f"cascadeur_to_blender_{current_time}.fbx")
 
     # Kiểm tra xem có file trigger mới không
-    newest_trigger = None
-    newest_time = 0
-    
-    for filename in os.listdir(cascade_trigger_folder):
-        if filename.startswith("trigger_") and filename.endswith(".json"):
-            filepath = os.path.join(cascade_trigger_folder, filename)
-            mtime = os.path.getmtime(filepath)
-            if mtime > newest_time:
-                newest_time = mtime
-                newest_trigger = filepath
+    newest_trigger = commons.find_newest_trigger(paths.cascadeur_trigger_folder)
     
     if newest_trigger:
         try:
-            # Đọc file trigger
-            with open(newest_trigger, 'r') as f:
-                trigger_data = json.load(f)
-            
-            # Đánh dấu file trigger đã được xử lý
-            processed_path = newest_trigger + ".processed"
-            os.rename(newest_trigger, processed_path)
+            # Đọc file trigger và đánh dấu đã được xử lý
+            trigger_data = commons.consume_trigger(newest_trigger)
             
             # Lấy action
             action = trigger_data.get("action", "")
@@ -73,11 +31,10 @@ def run(scene):
             # Lấy app và scene hiện tại
             mp = csc.app.get_application()
             scene_pr = mp.get_scene_manager().current_scene()
-            tools_manager = mp.get_tools_manager()
+            scene_key = commons.current_scene_key(mp.get_scene_manager())
             
             # Lấy FbxSceneLoader
-            fbx_scene_loader_tool = tools_manager.get_tool("FbxSceneLoader")
-            fbx_scene_loader = fbx_scene_loader_tool.get_fbx_loader(scene_pr)
+            fbx_scene_loader = paths.fbx_loader(scene_pr)
             
             # Xử lý các action khác nhau
             if action == "export_current_scene":
@@ -87,17 +44,8 @@ def run(scene):
                     scene.info(f"Exported current scene to {fbx_path}")
                     
                     # Tạo trigger cho Blender
-                    trigger_data = {
-                        "action": "import_scene",
-                        "data": {
-                            "fbx_path": fbx_path
-                        }
-                    }
-                    
-                    # Ghi file trigger
-                    trigger_path = os.path.join(blender_trigger_folder, f"trigger_import_scene_{current_time}.json")
-                    with open(trigger_path, 'w') as f:
-                        json.dump(trigger_data, f, indent=2)
+                    trigger_data = {"fbx_path": fbx_path, "scene": scene_key}
+                    commons.write_blender_trigger(paths, "import_scene", trigger_data, current_time)
                 except Exception as e:
                     scene.error(f"Failed to export scene: {str(e)}")
             
@@ -106,37 +54,23 @@ def run(scene):
                 try:
                     scene_manager = mp.get_scene_manager()
                     scenes = scene_manager.scenes()
-                    fbx_paths = []
-                    
-                    for i, s in enumerate(scenes):
-                        fbx_path_i = fbx_path.replace(".fbx", f"_scene{i}.fbx")
-                        fbx_loader = tools_manager.get_tool("FbxSceneLoader").get_fbx_loader(s)
-                        fbx_loader.export_all_objects(fbx_path_i)
-                        fbx_paths.append(fbx_path_i)
-                        scene.info(f"Exported scene {i} to {fbx_path_i}")
+                    force = trigger_data.get("data", {}).get("force", False)
+                    manifest = commons.export_scenes_incremental(paths, scenes, current_time, force, scene.info)
                     
                     # Tạo trigger cho Blender
-                    trigger_data = {
-                        "action": "import_all_scenes",
-                        "data": {
-                            "fbx_paths": fbx_paths
-                        }
-                    }
-                    
-                    # Ghi file trigger
-                    trigger_path = os.path.join(blender_trigger_folder, f"trigger_import_all_scenes_{current_time}.json")
-                    with open(trigger_path, 'w') as f:
-                        json.dump(trigger_data, f, indent=2)
+                    commons.write_blender_trigger(paths, "import_all_scenes", manifest, current_time)
                 except Exception as e:
                     scene.error(f"Failed to export all scenes: {str(e)}")
             
             elif action == "import_fbx":
                 # Import FBX từ Blender
                 try:
-                    fbx_path = trigger_data.get("data", {}).get("fbx_path", "")
+                    data = trigger_data.get("data", {})
+                    fbx_path = data.get("fbx_path", "")
                     if fbx_path and os.path.exists(fbx_path):
-                        fbx_scene_loader.import_model(fbx_path)
-                        scene.info(f"Imported FBX from {fbx_path}")
+                        # Object đã có trong scene thì chỉ cập nhật animation
+                        mode = commons.import_object_fbx(paths, scene_pr, scene_key, fbx_scene_loader, fbx_path, data)
+                        scene.info(f"Imported FBX ({mode}) from {fbx_path}")
                     else:
                         scene.error(f"FBX file not found: {fbx_path}")
                 except Exception as e:
@@ -145,10 +79,12 @@ def run(scene):
             elif action == "import_object":
                 # Import object từ Blender
                 try:
-                    fbx_path = trigger_data.get("data", {}).get("fbx_path", "")
+                    data = trigger_data.get("data", {})
+                    fbx_path = data.get("fbx_path", "")
                     if fbx_path and os.path.exists(fbx_path):
-                        fbx_scene_loader.import_model(fbx_path)
-                        scene.info(f"Imported object from {fbx_path}")
+                        # Object đã có trong scene thì chỉ cập nhật animation
+                        mode = commons.import_object_fbx(paths, scene_pr, scene_key, fbx_scene_loader, fbx_path, data)
+                        scene.info(f"Imported object ({mode}) from {fbx_path}")
                     else:
                         scene.error(f"FBX file not found: {fbx_path}")
                 except Exception as e:
@@ -167,26 +103,34 @@ def run(scene):
                         
                         # Nếu có JSON, xử lý keyframes
                         if json_path and os.path.exists(json_path):
-                            with open(json_path, 'r') as f:
-                                keyframes_data = json.load(f)
-                            
-                            # Xử lý keyframes (thêm code xử lý keyframes dựa trên API của Cascadeur)
-                            scene.info(f"Processed keyframes from {json_path}")
+                            # Áp dụng tất cả keyframe trong một lần modify
+                            count = commons.apply_keyframes_json(scene, json_path)
+                            scene.info(f"Processed {count} keyframes from {json_path}")
                     else:
                         scene.error(f"FBX file not found: {fbx_path}")
                 except Exception as e:
                     scene.error(f"Failed to import animation: {str(e)}")
             
+            elif action == "import_batch":
+                # Import nhiều object/animation từ Blender trong một lần
+                try:
+                    items = trigger_data.get("data", {}).get("items", [])
+                    imported, marked, errors = commons.import_batch(
+                        paths, scene, scene_pr, scene_key, fbx_scene_loader, items, mp.get_scene_manager())
+                    for message in errors:
+                        scene.error(message)
+                    scene.info(f"Imported {imported} / {len(items)} files, {marked} marked keyframes")
+                except Exception as e:
+                    scene.error(f"Failed to import batch: {str(e)}")
+            
             elif action == "import_json":
                 # Import JSON từ Blender
                 try:
                     json_path = trigger_data.get("data", {}).get("json_path", "")
                     if json_path and os.path.exists(json_path):
-                        with open(json_path, 'r') as f:
-                            keyframes_data = json.load(f)
-                        
-                        # Xử lý keyframes (thêm code xử lý keyframes dựa trên API của Cascadeur)
-                        scene.info(f"Processed keyframes from {json_path}")
+                        # Áp dụng tất cả keyframe trong một lần modify
+                        count = commons.apply_keyframes_json(scene, json_path)
+                        scene.info(f"Processed {count} keyframes from {json_path}")
                     else:
                         scene.error(f"JSON file not found: {json_path}")
                 except Exception as e:
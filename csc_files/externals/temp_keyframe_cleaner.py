@@ -1,9 +1,6 @@
 import csc
-import os
-import json
-import time
-import tempfile
-import configparser
+
+from . import commons
 
 
 def command_name():
@@ -11,56 +8,19 @@ def command_name():
 
 
 def run(scene):
-    # Đọc cấu hình
-    try:
-        config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "settings.cfg")
-        config = configparser.ConfigParser()
-        config.read(config_path)
-        
-        exchange_folder = config.get("Addon Settings", "exchange_folder", fallback=tempfile.gettempdir())
-    except:
-        # Fallback to temp dir
-        exchange_folder = tempfile.gettempdir()
-    
-    # Đảm bảo thư mục tồn tại
-    if not os.path.exists(exchange_folder):
-        os.makedirs(exchange_folder)
-    
-    # Kiểm tra xem có thư mục cascadeur_triggers
-    trigger_folder = os.path.join(exchange_folder, "cascadeur_triggers")
-    if not os.path.exists(trigger_folder):
-        os.makedirs(trigger_folder)
-        scene.info("Created triggers folder: " + trigger_folder)
-        return
+    # Cấu hình và thư mục trao đổi (được cache trong commons)
+    paths = commons.get_paths()
 
     # Tìm trigger file mới nhất
-    newest_trigger = None
-    newest_time = 0
-    
-    for filename in os.listdir(trigger_folder):
-        if filename.startswith("trigger_clean_keyframes_") and filename.endswith(".json"):
-            filepath = os.path.join(trigger_folder, filename)
-            mtime = os.path.getmtime(filepath)
-            if mtime > newest_time:
-                newest_time = mtime
-                newest_trigger = filepath
+    newest_trigger = commons.find_newest_trigger(paths.cascadeur_trigger_folder, "trigger_clean_keyframes_")
     
     if newest_trigger:
         try:
-            # Đọc file trigger
-            with open(newest_trigger, 'r') as f:
-                trigger_data = json.load(f)
-            
-            # Đánh dấu file trigger đã được xử lý
-            processed_path = newest_trigger + ".processed"
-            os.rename(newest_trigger, processed_path)
-            
-            # Lấy dữ liệu keyframe
-            data = trigger_data.get("data", {})
-            keyframes = data.get("keyframes", {})
+            # Đọc file trigger và đánh dấu đã được xử lý
+            trigger_data = commons.consume_trigger(newest_trigger)
             
-            # Chuyển đổi các key từ string về integer
-            marked_frames = [int(frame) for frame in keyframes.keys()]
+            # Lấy danh sách frame được đánh dấu
+            marked_frames = commons.parse_marked_frames(trigger_data)
             
             if not marked_frames:
                 scene.error("No marked keyframes received")
@@ -82,6 +42,7 @@ def run(scene):
 def keep_only_marked_keyframes(scene, marked_frames):
     """Xóa tất cả keyframe không được đánh dấu trong các layer"""
     lv = scene.layers_viewer()
+    marked_frames = set(marked_frames)
     removed_count = 0
     
     def mod(model, update, scene):
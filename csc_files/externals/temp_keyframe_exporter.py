@@ -0,0 +1,28 @@
+import csc
+import time
+
+from . import commons
+
+
+def command_name():
+    return "B2C.Temp Keyframe Exporter"
+
+
+def run(scene):
+    # Cấu hình và thư mục trao đổi (được cache trong commons)
+    paths = commons.get_paths()
+    current_time = time.strftime("%Y%m%d%H%M%S")
+    
+    try:
+        # Lấy key frame của tất cả layer trong scene hiện tại
+        frames = commons.collect_key_frames(scene)
+        
+        if not frames:
+            scene.error("No key frames found in the current scene")
+            return
+        
+        # Gửi danh sách frame (mảng int đã sắp xếp) cho Blender
+        trigger_path = commons.write_blender_trigger(paths, "clean_keyframes", {"frames": frames}, current_time)
+        scene.info(f"Sent {len(frames)} key frames to Blender ({trigger_path})")
+    except Exception as e:
+        scene.error(f"Failed to export key frames: {str(e)}")
@@ -0,0 +1,22 @@
+import csc
+
+from . import commons
+
+
+def command_name():
+    return "B2C.Live Link"
+
+
+def run(scene):
+    # Bật / tắt reader live link thường trú (nhận pose Blender gửi qua UDP)
+    reader = commons.stop_live_link_reader()
+    if reader is not None:
+        decoder = reader.decoder
+        scene.info(f"Live link stopped: {decoder.packets} poses received, {decoder.lost} lost, {decoder.stale} stale, {decoder.invalid} invalid")
+        return
+
+    try:
+        reader = commons.start_live_link_reader()
+        scene.info(f"Live link listening on port {reader.address[1]}")
+    except Exception as e:
+        scene.error(f"Failed to start live link: {str(e)}")
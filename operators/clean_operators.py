@@ -1,15 +1,59 @@
 import bpy
 import os
 import json
+import math
+import numpy as np
 from bpy.types import Operator
+from bpy.props import EnumProperty, FloatProperty, BoolProperty
+from ..utils import anim_utils, keyframe_utils
+from ..utils.curve_stream import CurveStream
 
 # Clean Keyframes trong Blender
 class BTC_OT_CleanKeyframes(Operator):
     bl_idname = "btc.clean_keyframes"
     bl_label = "Clean Keyframes"
-    bl_description = "Remove all keyframes except those marked in metadata"
+    bl_description = "Remove all keyframes except those marked in metadata, or the keys that are not needed within a tolerance"
     bl_options = {'REGISTER', 'UNDO'}
     
+    mode: EnumProperty(
+        name="Mode",
+        items=[
+            ('MARKED', "Keep Marked", "Keep exactly the marked keyframes"),
+            ('DECIMATE', "Decimate", "Remove the keys of each curve while the curve, sampled at every frame, stays within the tolerance"),
+        ],
+        default='MARKED'
+    )
+    angle_tolerance: FloatProperty(
+        name="Angle Tolerance",
+        description="Largest rotation error (per Euler axis, or of the whole quaternion rotation)",
+        subtype='ANGLE',
+        default=math.radians(0.5),
+        min=0.0
+    )
+    distance_tolerance: FloatProperty(
+        name="Distance Tolerance",
+        description="Largest location error",
+        subtype='DISTANCE',
+        default=0.001,
+        min=0.0
+    )
+    value_tolerance: FloatProperty(
+        name="Value Tolerance",
+        description="Largest error of the other curves (scale, custom properties)",
+        default=0.001,
+        min=0.0
+    )
+    keep_marked: BoolProperty(
+        name="Keep Marked",
+        description="Never remove the keys on marked frames",
+        default=True
+    )
+    selected_bones_only: BoolProperty(
+        name="Selected Bones Only",
+        description="Only clean the curves of the selected bones (in Pose Mode)",
+        default=False
+    )
+    
     @classmethod
     def poll(cls, context):
         return (context.active_object and 
@@ -22,13 +66,22 @@ class BTC_OT_CleanKeyframes(Operator):
         
         # Lấy danh sách keyframe được đánh dấu từ metadata
         marked_keyframes = self.get_marked_keyframes(context)
+        bone_marks = keyframe_utils.get_bone_marks(context.scene)
+        fcurves = self.get_fcurves(context, armature)
         
-        if not marked_keyframes:
+        if self.mode == 'DECIMATE':
+            if not self.keep_marked:
+                marked_keyframes, bone_marks = [], {}
+            kept, removed = self.decimate_keyframes(fcurves, marked_keyframes, bone_marks)
+            self.report({'INFO'}, f"Decimated keyframes. Kept {kept} keys, removed {removed} keys")
+            return {'FINISHED'}
+        
+        if not marked_keyframes and not bone_marks:
             self.report({'WARNING'}, "No marked keyframes found in metadata")
             return {'CANCELLED'}
         
         # Xóa các keyframe không nằm trong danh sách đã đánh dấu
-        cleaned_count = self.clean_keyframes(armature, marked_keyframes)
+        cleaned_count = self.clean_keyframes(fcurves, marked_keyframes, bone_marks)
         
         self.report({'INFO'}, f"Cleaned keyframes. Kept {len(marked_keyframes)} marked keyframes, removed {cleaned_count} keyframes")
         return {'FINISHED'}
@@ -45,35 +98,111 @@ class BTC_OT_CleanKeyframes(Operator):
         
         return marked_frames
     
-    def clean_keyframes(self, armature, marked_keyframes):
-        # Lưu frame hiện tại
-        current_frame = bpy.context.scene.frame_current
+    def get_fcurves(self, context, armature):
+        """fcurve cần xử lý: tất cả, hoặc chỉ của các bone đang chọn"""
+        fcurves = list(armature.animation_data.action.fcurves)
+        if not self.selected_bones_only:
+            return fcurves
+        selected = {bone.name for bone in context.selected_pose_bones or [] if bone.id_data == armature}
+        return [fcurve for fcurve in fcurves
+                if (anim_utils.bone_path_parts(fcurve.data_path) or (None,))[0] in selected]
+    
+    def marked_keys(self, fcurves, co, bounds, marked, bone_marks, keep_unmarked=False):
+        """
+        Mask of the keys of a chunk that lie on a marked frame: the global
+        marks, plus the marks of the bone of each fcurve.
         
-        action = armature.animation_data.action
-        fcurves = action.fcurves
+        With `keep_unmarked` and no global marks, every key of an fcurve
+        without marks of its own is kept, so per-bone marks only clean the
+        bones they belong to.
+        """
+        frames = np.rint(co[:, 0]).astype(np.int32)
+        keep = np.isin(frames, marked) if marked.size else np.zeros(len(co), dtype=bool)
+        if bone_marks or (keep_unmarked and not marked.size):
+            for i, fcurve in enumerate(fcurves):
+                parts = anim_utils.bone_path_parts(fcurve.data_path)
+                own = bone_marks.get(parts[0]) if parts else None
+                if bounds[i + 1] == bounds[i]:
+                    continue
+                if own is not None:
+                    keep[bounds[i]:bounds[i + 1]] |= np.isin(frames[bounds[i]:bounds[i + 1]], own)
+                elif keep_unmarked and not marked.size:
+                    keep[bounds[i]:bounds[i + 1]] = True
+        return keep
+    
+    def curve_tolerance(self, data_path):
+        """Sai số cho phép của một fcurve theo loại thuộc tính."""
+        prop = data_path.rsplit(".", 1)[-1]
+        if prop in {"rotation_euler", "rotation_axis_angle"}:
+            return self.angle_tolerance
+        if prop == "rotation_quaternion":
+            # Sai số mỗi thành phần <= góc / 4 thì góc lệch <= angle_tolerance
+            return self.angle_tolerance / 4.0
+        if prop == "location":
+            return self.distance_tolerance
+        return self.value_tolerance
+    
+    def decimate_keyframes(self, fcurves, marked_keyframes, bone_marks):
+        """
+        Decimate fcurves read chunk by chunk. The surviving keys keep their
+        interpolation and handles; fcurves with easing interpolation are
+        left untouched.
         
-        removed_count = 0
+        Returns:
+            (kept keys, removed keys)
+        """
+        fcurves = [fcurve for fcurve in fcurves if len(fcurve.keyframe_points) > 2]
+        marked = np.asarray(marked_keyframes, dtype=np.int32)
+        tolerances = np.array([self.curve_tolerance(fcurve.data_path) for fcurve in fcurves])
         
-        # Lặp qua từng fcurve và xóa các keyframe không được đánh dấu
-        for fcurve in fcurves:
-            # Lặp qua từng keyframe trong fcurve theo thứ tự ngược lại
-            # vì chúng ta sẽ xóa một số keyframe
-            keyframe_points = fcurve.keyframe_points
-            i = len(keyframe_points) - 1
-            
-            while i >= 0:
-                keyframe = keyframe_points[i]
-                frame = int(keyframe.co[0])
+        kept = removed = 0
+        stream = CurveStream(fcurves)
+        handle_left = np.empty(stream.chunk_keys * 2, dtype=np.float32)
+        handle_right = np.empty(stream.chunk_keys * 2, dtype=np.float32)
+        interpolation = np.empty(stream.chunk_keys, dtype=np.int32)
+        supported = (keyframe_utils.INTERP_CONSTANT, keyframe_utils.INTERP_LINEAR, keyframe_utils.INTERP_BEZIER)
+        for first, last, co, bounds in stream.chunks():
+            keep = self.marked_keys(stream.fcurves[first:last], co, bounds, marked, bone_marks)
+            for i, fcurve in enumerate(stream.fcurves[first:last]):
+                start, end = bounds[i], bounds[i + 1]
+                points = fcurve.keyframe_points
+                points.foreach_get("handle_left", handle_left[start * 2:end * 2])
+                points.foreach_get("handle_right", handle_right[start * 2:end * 2])
+                points.foreach_get("interpolation", interpolation[start:end])
                 
-                # Nếu frame không nằm trong danh sách được đánh dấu, xóa nó
-                if frame not in marked_keyframes:
-                    keyframe_points.remove(keyframe)
-                    removed_count += 1
+                # Chế độ easing (SINE, BACK...) không được tính lại, giữ nguyên fcurve
+                if not np.isin(interpolation[start:end], supported).all():
+                    kept += int(end - start)
+                    continue
                 
-                i -= 1
+                # Sai số đo trên đường cong đã nội suy ở từng frame, key còn lại
+                # giữ nguyên interpolation và handle
+                mask = keyframe_utils.decimate_keys(
+                    co[start:end],
+                    handle_left[start * 2:end * 2].reshape(-1, 2),
+                    handle_right[start * 2:end * 2].reshape(-1, 2),
+                    interpolation[start:end],
+                    tolerances[first + i],
+                    keep[start:end])
+                removed += anim_utils.keep_fcurve_keys(fcurve, mask, freeze_handles=True)
+                kept += int(np.count_nonzero(mask))
+        return kept, removed
+    
+    def clean_keyframes(self, fcurves, marked_keyframes, bone_marks):
+        # Lưu frame hiện tại
+        current_frame = bpy.context.scene.frame_current
+        
+        marked = np.asarray(marked_keyframes, dtype=np.int32)
+        
+        removed_count = 0
         
-        # Cập nhật animation để áp dụng các thay đổi
-        action.fcurves.update()
+        # Đọc key theo từng chunk fcurve và xóa các keyframe không được đánh dấu
+        # (chung hoặc riêng của bone)
+        stream = CurveStream(fcurves)
+        for first, last, co, bounds in stream.chunks():
+            keep = self.marked_keys(stream.fcurves[first:last], co, bounds, marked, bone_marks, keep_unmarked=True)
+            for i, fcurve in enumerate(stream.fcurves[first:last]):
+                removed_count += anim_utils.keep_fcurve_keys(fcurve, keep[bounds[i]:bounds[i + 1]])
         
         # Khôi phục frame hiện tại
         bpy.context.scene.frame_current = current_frame
@@ -139,8 +268,28 @@ class BTC_OT_CleanKeyframesCascadeur(Operator):
             self.report({'ERROR'}, f"Error: {str(e)}")
             return {'CANCELLED'}
 
+# Xóa các lần import cũ từ Cascadeur
+class BTC_OT_PurgeOldImports(Operator):
+    bl_idname = "btc.purge_old_imports"
+    bl_label = "Purge Old Imports"
+    bl_description = "Remove objects and data of Cascadeur imports older than the number of imports to keep"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    def execute(self, context):
+        from ..utils import datablock_utils
+        
+        keep = context.scene.btc_keep_generations
+        if keep <= 0:
+            self.report({'WARNING'}, "Keep Imports is 0, nothing to purge")
+            return {'CANCELLED'}
+        
+        removed_count = datablock_utils.purge_old_generations(context.scene, keep)
+        self.report({'INFO'}, f"Removed {removed_count} datablocks from old imports")
+        return {'FINISHED'}
+
 # Danh sách các lớp để đăng ký
 classes = [
     BTC_OT_CleanKeyframes,
     BTC_OT_CleanKeyframesCascadeur,
+    BTC_OT_PurgeOldImports,
 ]
\ No newline at end of file
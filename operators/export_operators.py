@@ -4,8 +4,8 @@ import os
 import time
 import tempfile
 from bpy.types import Operator
-from bpy.props import StringProperty
-from ..utils import file_utils, preferences
+from bpy.props import StringProperty, BoolProperty, EnumProperty
+from ..utils import file_utils, preferences, export_utils, keyframe_utils, anim_utils, datablock_utils, live_link
 
 # Import class từ keyframe_operators
 from .keyframe_operators import BTC_OT_PickArmature
@@ -17,6 +17,12 @@ class BTC_OT_ExportObject(Operator):
     bl_description = "Export selected object to Cascadeur"
     bl_options = {'REGISTER', 'UNDO'}
     
+    full_import: BoolProperty(
+        name="Full Import",
+        description="Import the whole model in Cascadeur again instead of updating the animation of the object imported before",
+        default=False
+    )
+    
     @classmethod
     def poll(cls, context):
         return context.scene.btc_armature is not None
@@ -32,12 +38,50 @@ class BTC_OT_ExportObject(Operator):
         prefs = preferences.get_preferences(context)
         exchange_folder = preferences.get_exchange_folder(context)
         
-        # Tạo đường dẫn export
-        export_path = file_utils.get_export_path(file_type="fbx", use_temp=True)
+        # Giới hạn animation theo các frame đã đánh dấu
+        frames_mode = context.scene.btc_export_frames
+        frame_range, settings = export_utils.frame_subset(context.scene, armature, frames_mode)
+        if frames_mode != 'ALL' and frame_range is None:
+            self.report({'WARNING'}, "No marked keyframes, exporting the whole timeline")
+        
+        # Rig và mesh không đổi từ lần gửi trước: chỉ gửi skeleton và animation
+        objects = export_utils.export_objects(armature)
+        if self.full_import:
+            # Gửi lại toàn bộ: đọc lại cả weight, UV và shape key của mesh
+            datablock_utils.clear_geometry_hash_cache()
+        payload = datablock_utils.payload_hash(objects)
+        skeleton_only = (
+            context.scene.btc_reuse_sent_mesh
+            and not self.full_import
+            and export_utils.payload_unchanged(armature, payload)
+        )
+        if skeleton_only:
+            objects = [armature]
+            settings = export_utils.skeleton_only_settings(settings)
+        
+        trigger_extra = {
+            "object_name": armature.name,
+            "force_model": self.full_import,
+            "skeleton_only": skeleton_only,
+            "payload_hash": payload
+        }
         
         try:
+            # Gửi bản xem trước ngay, bản đầy đủ được export nền rồi thay thế
+            if context.scene.btc_progressive_export and armature.animation_data and armature.animation_data.action:
+                return self.export_progressive(context, armature, objects, exchange_folder, prefs,
+                                               trigger_extra, frame_range=frame_range, settings=settings)
+            
+            # Export trong tiến trình Blender nền, selection của người dùng giữ nguyên
+            if context.scene.btc_background_export:
+                return self.export_background(context, armature, objects, exchange_folder, prefs,
+                                              trigger_extra, frame_range=frame_range, settings=settings)
+            
+            # Tạo đường dẫn export
+            export_path = file_utils.get_export_path(file_type="fbx", use_temp=True)
+            
             # Export FBX
-            if not self.export_fbx(context, export_path):
+            if not self.export_fbx(context, export_path, frame_range=frame_range, settings=settings, objects=objects):
                 self.report({'ERROR'}, "Failed to export FBX")
                 return {'CANCELLED'}
             
@@ -50,10 +94,7 @@ class BTC_OT_ExportObject(Operator):
             # Tạo trigger file
             trigger_data = {
                 "action": "import_object",
-                "data": {
-                    "fbx_path": fbx_path,
-                    "object_name": armature.name
-                }
+                "data": dict(trigger_extra, fbx_path=fbx_path)
             }
             
             trigger_path = file_utils.create_trigger_file(exchange_folder, "import_object", trigger_data)
@@ -61,6 +102,9 @@ class BTC_OT_ExportObject(Operator):
                 self.report({'ERROR'}, "Failed to create trigger file")
                 return {'CANCELLED'}
             
+            if not skeleton_only:
+                export_utils.remember_payload(armature.name, payload)
+            
             # Tự động mở Cascadeur nếu đã bật tùy chọn
             if prefs.auto_open_cascadeur:
                 bpy.ops.btc.open_cascadeur()
@@ -72,27 +116,91 @@ class BTC_OT_ExportObject(Operator):
             self.report({'ERROR'}, f"Export error: {str(e)}")
             return {'CANCELLED'}
     
-    def export_fbx(self, context, filepath):
+    def export_background(self, context, armature, objects, exchange_folder, prefs,
+                          trigger_data, action=None, frame_range=None, settings=None):
+        """Chạy export FBX trong tiến trình nền, trigger được tạo khi export xong"""
+        try:
+            item = export_utils.export_item(objects, armature, action, frame_range, trigger_data)
+            job = export_utils.BackgroundExportJob(
+                [item],
+                exchange_folder,
+                "import_object",
+                settings=settings,
+                open_cascadeur=prefs.auto_open_cascadeur
+            )
+            job.start(context)
+        except Exception as e:
+            self.report({'ERROR'}, f"Background export error: {str(e)}")
+            return {'CANCELLED'}
+        
+        self.report({'INFO'}, f"Exporting {armature.name} in background")
+        return {'FINISHED'}
+    
+    def export_progressive(self, context, armature, objects, exchange_folder, prefs,
+                           trigger_data, action=None, frame_range=None, settings=None):
+        """Gửi bản proxy (ít frame, chỉ bone chính) ngay, bản đầy đủ được export nền và thay thế bản proxy"""
+        generation = export_utils.new_generation()
+        source_action = action or armature.animation_data.action
+        proxy, proxy_range, proxy_settings = export_utils.proxy_subset(
+            armature, source_action, frame_range, settings or export_utils.fbx_export_settings())
+        try:
+            export_path = file_utils.get_export_path(file_type="fbx", use_temp=True)
+            exported = self.export_fbx(context, export_path, proxy, proxy_range, proxy_settings, objects)
+        finally:
+            bpy.data.actions.remove(proxy)
+        if not exported:
+            self.report({'ERROR'}, "Failed to export the preview FBX")
+            return {'CANCELLED'}
+        
+        fbx_path = file_utils.copy_file_to_exchange(export_path, exchange_folder, "fbx")
+        if not fbx_path:
+            self.report({'ERROR'}, "Failed to copy FBX to exchange folder")
+            return {'CANCELLED'}
+        
+        # Cùng generation: Cascadeur bỏ qua bản proxy nếu bản đầy đủ đã được áp dụng
+        proxy_data = dict(trigger_data, fbx_path=fbx_path, generation=generation, stage="proxy")
+        if not file_utils.create_trigger_file(exchange_folder, "import_object", {"action": "import_object", "data": proxy_data}):
+            self.report({'ERROR'}, "Failed to create trigger file")
+            return {'CANCELLED'}
+        if not trigger_data.get("skeleton_only", False):
+            export_utils.remember_payload(armature.name, trigger_data.get("payload_hash", ""))
+        
+        if prefs.auto_open_cascadeur:
+            bpy.ops.btc.open_cascadeur()
+        
+        full_data = dict(trigger_data, generation=generation, stage="full")
+        return self.export_background(context, armature, objects, exchange_folder, prefs,
+                                      full_data, action, frame_range, settings)
+    
+    def export_fbx(self, context, filepath, action=None, frame_range=None, settings=None, objects=None):
         """Export armature to FBX"""
         try:
+            scene = context.scene
+            armature = scene.btc_armature
+            
             # Lưu trạng thái selection hiện tại
             original_selection = context.selected_objects.copy()
             active_object = context.active_object
+            original_range = (scene.frame_start, scene.frame_end)
             
-            # Chọn armature
+            # Chọn armature và các mesh của nó
             bpy.ops.object.select_all(action='DESELECT')
-            context.scene.btc_armature.select_set(True)
-            context.view_layer.objects.active = context.scene.btc_armature
+            for obj in objects or export_utils.export_objects(armature):
+                obj.select_set(True)
+            context.view_layer.objects.active = armature
             
-            # Export FBX
-            bpy.ops.export_scene.fbx(
-                filepath=filepath,
-                use_selection=True,
-                object_types={'ARMATURE', 'MESH'},
-                use_mesh_modifiers=True,
-                use_mesh_modifiers_render=True,
-                add_leaf_bones=False
-            )
+            # Action và khoảng frame của phần animation được export
+            original_action = anim_utils.assign_action(armature, action) if action is not None else None
+            if frame_range:
+                scene.frame_start, scene.frame_end = frame_range
+            
+            try:
+                # Export FBX
+                bpy.ops.export_scene.fbx(filepath=filepath, **(settings or export_utils.fbx_export_settings()))
+            finally:
+                if action is not None:
+                    armature.animation_data.action = original_action
+                scene.frame_start, scene.frame_end = original_range
             
             # Khôi phục selection
             bpy.ops.object.select_all(action='DESELECT')
@@ -107,6 +215,174 @@ class BTC_OT_ExportObject(Operator):
             print(f"FBX export error: {str(e)}")
             return False
 
+# Xuất nhiều armature / action trong một lần
+class BTC_OT_ExportBatch(Operator):
+    bl_idname = "btc.export_batch"
+    bl_label = "Export Batch"
+    bl_description = "Export the selected armatures, or all of their actions, to Cascadeur with a single trigger"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    mode: EnumProperty(
+        name="Mode",
+        items=[
+            ('ARMATURES', "Selected Armatures", "Export the current action of every selected armature"),
+            ('ACTIONS', "All Actions", "Export every action of every selected armature, each into its own Cascadeur scene"),
+        ],
+        default='ARMATURES'
+    )
+    
+    full_import: BoolProperty(
+        name="Full Import",
+        description="Import the whole models in Cascadeur again instead of updating the animation of objects imported before",
+        default=False
+    )
+    
+    @classmethod
+    def poll(cls, context):
+        return any(obj.type == 'ARMATURE' for obj in context.selected_objects)
+    
+    def execute(self, context):
+        prefs = preferences.get_preferences(context)
+        exchange_folder = preferences.get_exchange_folder(context)
+        
+        armatures = [obj for obj in context.selected_objects if obj.type == 'ARMATURE']
+        
+        # Danh sách (armature, action) cần export
+        pairs = []
+        for armature in armatures:
+            if self.mode == 'ACTIONS':
+                pairs.extend((armature, action) for action in anim_utils.armature_actions(armature))
+            else:
+                action = armature.animation_data.action if armature.animation_data else None
+                pairs.append((armature, action))
+        
+        if not pairs:
+            self.report({'WARNING'}, "The selected armatures have no actions")
+            return {'CANCELLED'}
+        
+        try:
+            stamp = time.strftime("%Y%m%d%H%M%S")
+            items = []
+            for index, (armature, action) in enumerate(pairs):
+                json_path = self.write_keyframes_json(context, armature, action, exchange_folder, f"{stamp}_{index:03d}")
+                frame_range = tuple(int(frame) for frame in action.frame_range) if action else None
+                items.append(export_utils.export_item(
+                    export_utils.export_objects(armature),
+                    armature,
+                    action,
+                    frame_range,
+                    {
+                        "object_name": armature.name,
+                        "action": action.name if action else "",
+                        "json_path": json_path,
+                        "force_model": self.full_import,
+                        # Các action của cùng một armature không thể nằm chung một object
+                        "new_scene": self.mode == 'ACTIONS'
+                    }
+                ))
+            
+            # Một tiến trình nền cho tất cả file FBX
+            if context.scene.btc_background_export:
+                job = export_utils.BackgroundExportJob(
+                    items,
+                    exchange_folder,
+                    "import_batch",
+                    settings=self.item_settings(),
+                    open_cascadeur=prefs.auto_open_cascadeur
+                )
+                job.start(context)
+                self.report({'INFO'}, f"Exporting {len(items)} animations in background")
+                return {'FINISHED'}
+            
+            fbx_paths = self.export_items(context, items, exchange_folder, stamp)
+            
+            trigger_data = {
+                "action": "import_batch",
+                "data": {
+                    "items": [dict(item["data"], fbx_path=fbx_path) for item, fbx_path in zip(items, fbx_paths)]
+                }
+            }
+            trigger_path = file_utils.create_trigger_file(exchange_folder, "import_batch", trigger_data)
+            if not trigger_path:
+                self.report({'ERROR'}, "Failed to create trigger file")
+                return {'CANCELLED'}
+            
+            if prefs.auto_open_cascadeur:
+                bpy.ops.btc.open_cascadeur()
+            
+            self.report({'INFO'}, f"Exported {len(items)} animations to {exchange_folder}")
+            return {'FINISHED'}
+        
+        except Exception as e:
+            self.report({'ERROR'}, f"Batch export error: {str(e)}")
+            return {'CANCELLED'}
+    
+    def write_keyframes_json(self, context, armature, action, exchange_folder, suffix):
+        """Ghi frame đánh dấu của một animation, hoặc mọi keyframe nếu chưa đánh dấu"""
+        frames = []
+        bone_marks = {}
+        scene = context.scene
+        current_action = armature.animation_data.action if armature.animation_data else None
+        if armature == scene.btc_armature and action == current_action:
+            keyframes, marks = keyframe_utils.get_keyframe_arrays(scene.btc_keyframes)
+            frames = keyframes[marks].tolist()
+            bone_marks = keyframe_utils.get_bone_marks(scene)
+        if not frames and action is not None:
+            frames = keyframe_utils.action_key_frames(action).tolist()
+        
+        folder = file_utils.ensure_dir_exists(os.path.join(exchange_folder, "json"))
+        json_path = os.path.join(folder, f"blender_to_cascadeur_{suffix}.json")
+        with open(json_path, 'w') as f:
+            json.dump(keyframe_utils.keyframes_metadata(frames, bone_marks), f, indent=2)
+        return json_path
+    
+    def item_settings(self):
+        """Mỗi file FBX chỉ bake action của item, không bake mọi action và NLA strip"""
+        return export_utils.fbx_export_settings(bake_anim_use_all_actions=False, bake_anim_use_nla_strips=False)
+    
+    def export_items(self, context, items, exchange_folder, stamp):
+        """Export tất cả FBX, selection và trạng thái frame chỉ được lưu/khôi phục một lần"""
+        scene = context.scene
+        view_layer = context.view_layer
+        original_selection = context.selected_objects.copy()
+        active_object = view_layer.objects.active
+        frame_range = (scene.frame_start, scene.frame_end)
+        original_actions = {}
+        
+        folder = file_utils.ensure_dir_exists(os.path.join(exchange_folder, "fbx"))
+        settings = self.item_settings()
+        fbx_paths = []
+        try:
+            for index, item in enumerate(items):
+                for obj in context.selected_objects:
+                    obj.select_set(False)
+                for obj in item["objects"]:
+                    obj.select_set(True)
+                
+                armature = item["active"]
+                view_layer.objects.active = armature
+                if item["action"] is not None:
+                    previous = anim_utils.assign_action(armature, item["action"])
+                    original_actions.setdefault(armature, previous)
+                if item["frame_range"]:
+                    scene.frame_start, scene.frame_end = item["frame_range"]
+                
+                fbx_path = os.path.join(folder, f"blender_to_cascadeur_{stamp}_{index:03d}.fbx")
+                bpy.ops.export_scene.fbx(filepath=fbx_path, **settings)
+                fbx_paths.append(fbx_path)
+        finally:
+            # Khôi phục action, khoảng frame và selection
+            for armature, action in original_actions.items():
+                armature.animation_data.action = action
+            scene.frame_start, scene.frame_end = frame_range
+            for obj in context.selected_objects:
+                obj.select_set(False)
+            for obj in original_selection:
+                obj.select_set(True)
+            view_layer.objects.active = active_object
+        
+        return fbx_paths
+
 # Xuất animation
 class BTC_OT_ExportAnimation(Operator):
     bl_idname = "btc.export_animation"
@@ -204,14 +480,9 @@ class BTC_OT_ExportAnimation(Operator):
             return {'CANCELLED'}
     
     def get_marked_keyframes(self, context):
-        """Lấy danh sách keyframes được đánh dấu"""
-        marked_keyframes = {}
-        
-        for item in context.scene.btc_keyframes:
-            if item.is_marked:
-                marked_keyframes[str(item.frame)] = {}
-        
-        return marked_keyframes
+        """Lấy danh sách keyframes được đánh dấu, kèm frame đánh dấu riêng từng bone"""
+        frames, marks = keyframe_utils.get_keyframe_arrays(context.scene.btc_keyframes)
+        return keyframe_utils.keyframes_metadata(frames[marks].tolist(), keyframe_utils.get_bone_marks(context.scene))
     
     def open_arp_export(self, context):
         """Mở panel xuất Auto-Rig Pro"""
@@ -354,9 +625,54 @@ class BTC_OT_ExportComplete(Operator):
             self.report({'ERROR'}, f"Export error: {str(e)}")
             return {'CANCELLED'}
 
+# Bật / tắt live link pose sang Cascadeur
+class BTC_OT_LiveLink(Operator):
+    bl_idname = "btc.live_link"
+    bl_label = "Live Link"
+    bl_description = "Stream the pose of the armature to Cascadeur over UDP while the frame or the pose changes"
+    
+    @classmethod
+    def poll(cls, context):
+        return context.scene.btc_armature is not None or live_link.get_live_link() is not None
+    
+    def execute(self, context):
+        sender = live_link.stop_live_link()
+        if sender is not None:
+            self.report({'INFO'}, f"Live link stopped: sent {sender.packets} poses ({sender.bytes // 1024} KB)")
+            return {'FINISHED'}
+        
+        port = live_link.live_link_port(context)
+        try:
+            live_link.start_live_link(context.scene.btc_armature, port)
+        except (OSError, ValueError) as e:
+            self.report({'ERROR'}, f"Live link error: {str(e)}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Live link streaming to port {port}")
+        return {'FINISHED'}
+
+# Hủy export nền
+class BTC_OT_CancelExport(Operator):
+    bl_idname = "btc.cancel_export"
+    bl_label = "Cancel Export"
+    bl_description = "Cancel the running background exports"
+    
+    def execute(self, context):
+        jobs = export_utils.get_export_jobs()
+        if not jobs:
+            self.report({'INFO'}, "No background export is running")
+            return {'CANCELLED'}
+        
+        for job in jobs:
+            job.cancel()
+        self.report({'INFO'}, f"Cancelled {len(jobs)} background exports")
+        return {'FINISHED'}
+
 # Danh sách các lớp để đăng ký
 classes = [
     BTC_OT_ExportObject,
+    BTC_OT_ExportBatch,
+    BTC_OT_LiveLink,
+    BTC_OT_CancelExport,
     BTC_OT_ExportAnimation,
     BTC_OT_ExportComplete,
 ]
\ No newline at end of file
@@ -2,7 +2,7 @@ import bpy
 import os
 import json
 from bpy.types import Operator
-from bpy.props import StringProperty
+from bpy.props import StringProperty, BoolProperty
 from ..utils import file_utils, preferences
 
 # Import FBX từ Cascadeur vào Blender
@@ -49,14 +49,27 @@ class BTC_OT_ImportAllScenes(Operator):
     bl_description = "Import all open scenes from Cascadeur"
     bl_options = {'REGISTER', 'UNDO'}
     
+    force: BoolProperty(
+        name="Force Full Export",
+        description="Re-export every scene, even the ones whose objects and key frames did not change since the last import",
+        default=False,
+        options={'SKIP_SAVE'}
+    )
+    
+    @classmethod
+    def description(cls, context, properties):
+        if properties.force:
+            return "Re-export and import every open scene from Cascadeur, even the unchanged ones"
+        return cls.bl_description
+    
     def execute(self, context):
         # Lấy cài đặt preferences
         prefs = preferences.get_preferences(context)
         exchange_folder = preferences.get_exchange_folder(context)
         
         try:
-            # Tạo trigger file để yêu cầu Cascadeur export tất cả scene
-            trigger_data = {"action": "export_all_scenes"}
+            # Tạo trigger file để yêu cầu Cascadeur export các scene đã thay đổi
+            trigger_data = {"force": self.force}
             
             # Tạo thư mục con cho Cascadeur
             cascadeur_trigger_folder = os.path.join(exchange_folder, "cascadeur_triggers")
@@ -209,10 +222,63 @@ class BTC_OT_ImportJSONToCascadeur(Operator):
             self.report({'ERROR'}, f"Import error: {str(e)}")
             return {'CANCELLED'}
 
+# Lấy key frame từ Cascadeur để đánh dấu trong Blender
+class BTC_OT_ImportKeyframesFromCascadeur(Operator):
+    bl_idname = "btc.import_keyframes"
+    bl_label = "Import Key Frames"
+    bl_description = "Mark the key frames of the current Cascadeur scene in the keyframe list"
+    bl_options = {'REGISTER'}
+    
+    @classmethod
+    def poll(cls, context):
+        from ..utils.csc_handling import CascadeurHandler
+        return context.scene.btc_armature is not None and CascadeurHandler().is_csc_exe_path_valid
+    
+    def execute(self, context):
+        try:
+            # Chạy lệnh trong Cascadeur, kết quả được gửi về qua trigger clean_keyframes
+            from ..utils.csc_handling import CascadeurHandler
+            handler = CascadeurHandler()
+            
+            if not handler.execute_csc_command("commands.externals.temp_keyframe_exporter"):
+                self.report({'ERROR'}, "Failed to execute command in Cascadeur")
+                return {'CANCELLED'}
+            
+            self.report({'INFO'}, "Requested key frames from Cascadeur")
+            return {'FINISHED'}
+            
+        except Exception as e:
+            self.report({'ERROR'}, f"Import error: {str(e)}")
+            return {'CANCELLED'}
+
+# Hủy job import các scene đang chạy
+class BTC_OT_CancelImport(Operator):
+    bl_idname = "btc.cancel_import"
+    bl_label = "Cancel Import"
+    bl_description = "Stop importing the remaining Cascadeur scenes"
+    bl_options = {'REGISTER'}
+    
+    @classmethod
+    def poll(cls, context):
+        from ..utils import file_watcher
+        return file_watcher.get_import_job() is not None
+    
+    def execute(self, context):
+        from ..utils import file_watcher
+        job = file_watcher.get_import_job()
+        if job is None:
+            return {'CANCELLED'}
+        
+        job.cancel()
+        self.report({'INFO'}, f"Import cancelled after {job.done} of {job.total} scenes")
+        return {'FINISHED'}
+
 # Danh sách các lớp để đăng ký
 classes = [
     BTC_OT_ImportScene,
     BTC_OT_ImportAllScenes,
     BTC_OT_ImportFBXToCascadeur,
     BTC_OT_ImportJSONToCascadeur,
+    BTC_OT_ImportKeyframesFromCascadeur,
+    BTC_OT_CancelImport,
 ]
\ No newline at end of file
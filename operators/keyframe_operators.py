@@ -1,5 +1,7 @@
 import bpy
+import numpy as np
 from bpy.types import Operator, PropertyGroup
+from ..utils import keyframe_utils, anim_utils
 
 # Define PropertyGroup for keyframe
 class KeyframeItem(PropertyGroup):
@@ -31,6 +33,9 @@ class BTC_OT_PickArmature(Operator):
         # Clear old list
         context.scene.btc_keyframes.clear()
         
+        # Chỉ mục bone -> frame của armature cũ không còn dùng
+        keyframe_utils.clear_bone_index_cache()
+        
         # If no armature, return
         if not context.scene.btc_armature:
             return
@@ -39,19 +44,9 @@ class BTC_OT_PickArmature(Operator):
         
         # Find all keyframes from armature
         if armature.animation_data and armature.animation_data.action:
-            keyframes = set()
-            
-            for fcurve in armature.animation_data.action.fcurves:
-                for keyframe in fcurve.keyframe_points:
-                    # Add frame to set
-                    frame = int(keyframe.co[0])
-                    keyframes.add(frame)
-            
-            # Add keyframes to list
-            for frame in sorted(list(keyframes)):
-                item = context.scene.btc_keyframes.add()
-                item.frame = frame
-                item.is_marked = False  # Default is not marked
+            # Keys are read chunk by chunk, the list is written with foreach_set
+            frames = keyframe_utils.action_key_frames(armature.animation_data.action)
+            keyframe_utils.set_keyframe_arrays(context.scene.btc_keyframes, frames, np.zeros(frames.size, dtype=bool))
 
 # Mark current keyframe
 class BTC_OT_MarkCurrentKeyframe(Operator):
@@ -118,11 +113,7 @@ class BTC_OT_MarkAllKeyframes(Operator):
         return context.scene.btc_armature is not None and len(context.scene.btc_keyframes) > 0
     
     def execute(self, context):
-        count = 0
-        for item in context.scene.btc_keyframes:
-            if not item.is_marked:
-                item.is_marked = True
-                count += 1
+        count = keyframe_utils.set_all_marks(context.scene.btc_keyframes, True)
         
         self.report({'INFO'}, f"Marked {count} keyframes")
         return {'FINISHED'}
@@ -139,15 +130,319 @@ class BTC_OT_ClearAllKeyframes(Operator):
         return context.scene.btc_armature is not None and len(context.scene.btc_keyframes) > 0
     
     def execute(self, context):
-        count = 0
-        for item in context.scene.btc_keyframes:
-            if item.is_marked:
-                item.is_marked = False
-                count += 1
+        count = keyframe_utils.set_all_marks(context.scene.btc_keyframes, False)
         
         self.report({'INFO'}, f"Cleared {count} keyframes")
         return {'FINISHED'}
 
+# Đánh dấu một khoảng frame, có thể cách đều mỗi N frame
+class BTC_OT_MarkFrameRange(Operator):
+    bl_idname = "btc.mark_frame_range"
+    bl_label = "Mark Frame Range"
+    bl_description = "Mark or clear every Nth frame of a frame range in one step"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    action: bpy.props.EnumProperty(
+        name="Action",
+        items=[
+            ('MARK', "Mark", "Mark the frames"),
+            ('CLEAR', "Clear", "Clear the marks of the frames"),
+        ],
+        default='MARK'
+    )
+    frame_start: bpy.props.IntProperty(name="Start", default=1)
+    frame_end: bpy.props.IntProperty(name="End", default=250)
+    step: bpy.props.IntProperty(
+        name="Every",
+        description="Mark every Nth frame, counted from the start frame",
+        default=1,
+        min=1
+    )
+    keyed_only: bpy.props.BoolProperty(
+        name="Keyed Frames Only",
+        description="Only mark frames that are already in the keyframe list",
+        default=True
+    )
+    keep_marked: bpy.props.BoolProperty(
+        name="Keep Marked",
+        description="Keep the marks outside of the range",
+        default=True
+    )
+    
+    @classmethod
+    def poll(cls, context):
+        return context.scene.btc_armature is not None
+    
+    def invoke(self, context, event):
+        # Mặc định là khoảng frame của scene (hoặc preview range)
+        scene = context.scene
+        if scene.use_preview_range:
+            self.frame_start, self.frame_end = scene.frame_preview_start, scene.frame_preview_end
+        else:
+            self.frame_start, self.frame_end = scene.frame_start, scene.frame_end
+        return context.window_manager.invoke_props_dialog(self)
+    
+    def execute(self, context):
+        start, end = sorted((self.frame_start, self.frame_end))
+        frames = np.arange(start, end + 1, self.step, dtype=np.int32)
+        keyframes = context.scene.btc_keyframes
+        
+        if self.action == 'CLEAR':
+            count = keyframe_utils.unmark_frames(keyframes, frames)
+            self.report({'INFO'}, f"Cleared {count} keyframes between {start} and {end}")
+            return {'FINISHED'}
+        
+        count = keyframe_utils.set_marked_frames(keyframes, frames, add_missing=not self.keyed_only,
+                                                 clear_others=not self.keep_marked)
+        self.report({'INFO'}, f"Marked frames {start}-{end} (every {self.step}), {count} marked in total")
+        return {'FINISHED'}
+
+# Đánh dấu frame của các key đang chọn trong Dope Sheet / Graph Editor
+class BTC_OT_MarkSelectedKeys(Operator):
+    bl_idname = "btc.mark_selected_keys"
+    bl_label = "Mark Selected Keys"
+    bl_description = "Mark the frames of the keys selected in the Dope Sheet or Graph Editor"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    keep_marked: bpy.props.BoolProperty(
+        name="Keep Marked",
+        description="Keep the frames that are already marked",
+        default=True
+    )
+    
+    @classmethod
+    def poll(cls, context):
+        armature = context.scene.btc_armature
+        return armature is not None and armature.animation_data is not None and armature.animation_data.action is not None
+    
+    def execute(self, context):
+        frames = keyframe_utils.selected_key_frames(context.scene.btc_armature.animation_data.action)
+        if not frames.size:
+            self.report({'WARNING'}, "No keys are selected")
+            return {'CANCELLED'}
+        
+        count = keyframe_utils.set_marked_frames(context.scene.btc_keyframes, frames,
+                                                 clear_others=not self.keep_marked)
+        self.report({'INFO'}, f"Marked {frames.size} frames of the selected keys, {count} marked in total")
+        return {'FINISHED'}
+
+# Đánh dấu các frame có timeline marker
+class BTC_OT_MarkersToKeyframes(Operator):
+    bl_idname = "btc.markers_to_keyframes"
+    bl_label = "Import Timeline Markers"
+    bl_description = "Mark the frames of the timeline markers"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    selected_only: bpy.props.BoolProperty(
+        name="Selected Markers Only",
+        description="Only use the selected timeline markers",
+        default=False
+    )
+    keep_marked: bpy.props.BoolProperty(
+        name="Keep Marked",
+        description="Keep the frames that are already marked",
+        default=True
+    )
+    
+    @classmethod
+    def poll(cls, context):
+        return context.scene.btc_armature is not None and len(context.scene.timeline_markers) > 0
+    
+    def execute(self, context):
+        markers = context.scene.timeline_markers
+        frames = np.empty(len(markers), dtype=np.int32)
+        markers.foreach_get("frame", frames)
+        if self.selected_only:
+            selected = np.empty(len(markers), dtype=bool)
+            markers.foreach_get("select", selected)
+            frames = frames[selected]
+        if not frames.size:
+            self.report({'WARNING'}, "No timeline markers to import")
+            return {'CANCELLED'}
+        
+        count = keyframe_utils.set_marked_frames(context.scene.btc_keyframes, frames,
+                                                 clear_others=not self.keep_marked)
+        self.report({'INFO'}, f"Marked {np.unique(frames).size} marker frames, {count} marked in total")
+        return {'FINISHED'}
+
+# Tạo timeline marker tại các frame đã đánh dấu
+class BTC_OT_KeyframesToMarkers(Operator):
+    bl_idname = "btc.keyframes_to_markers"
+    bl_label = "Export Timeline Markers"
+    bl_description = "Add a timeline marker on every marked frame"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    replace: bpy.props.BoolProperty(
+        name="Replace",
+        description="Remove the markers added by an earlier export first",
+        default=True
+    )
+    
+    # Tên marker do add-on tạo ra
+    marker_prefix = "B2C"
+    # Custom property của scene lưu tên các marker add-on đã tạo
+    markers_prop = "btc_timeline_markers"
+    
+    @classmethod
+    def poll(cls, context):
+        return context.scene.btc_armature is not None and len(context.scene.btc_keyframes) > 0
+    
+    def execute(self, context):
+        markers = context.scene.timeline_markers
+        frames, marks = keyframe_utils.get_keyframe_arrays(context.scene.btc_keyframes)
+        frames = frames[marks]
+        
+        added = set(context.scene.get(self.markers_prop, []))
+        if self.replace:
+            # Chỉ xóa marker add-on đã tạo mà người dùng chưa đổi tên hay di chuyển
+            for marker in [marker for marker in markers
+                           if marker.name in added and marker.name == f"{self.marker_prefix}_{marker.frame}"]:
+                markers.remove(marker)
+            added = set()
+        
+        # Không tạo marker trùng frame với marker đã có
+        existing = np.empty(len(markers), dtype=np.int32)
+        markers.foreach_get("frame", existing)
+        new_frames = np.setdiff1d(frames, existing)
+        for frame in new_frames.tolist():
+            added.add(markers.new(f"{self.marker_prefix}_{frame}", frame=frame).name)
+        context.scene[self.markers_prop] = sorted(added)
+        
+        self.report({'INFO'}, f"Added {new_frames.size} timeline markers")
+        return {'FINISHED'}
+
+# Tự động đánh dấu key pose bằng phân tích curve
+class BTC_OT_AutoMarkKeyframes(Operator):
+    bl_idname = "btc.auto_mark_keyframes"
+    bl_label = "Auto Mark"
+    bl_description = "Mark the key poses found from velocity minima, acceleration peaks and direction changes of the animation"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    selection: bpy.props.EnumProperty(
+        name="Select",
+        items=[
+            ('COUNT', "Top N", "Mark the frames with the highest scores"),
+            ('THRESHOLD', "Threshold", "Mark every frame with a score above the threshold"),
+        ],
+        default='COUNT'
+    )
+    count: bpy.props.IntProperty(
+        name="Count",
+        description="Number of frames to mark",
+        default=20,
+        min=1
+    )
+    threshold: bpy.props.FloatProperty(
+        name="Threshold",
+        description="Minimum score (0-1) of a marked frame",
+        default=0.5,
+        min=0.0,
+        max=1.0
+    )
+    min_spacing: bpy.props.IntProperty(
+        name="Min Spacing",
+        description="Minimum number of frames between two marked frames",
+        default=4,
+        min=1
+    )
+    smoothing: bpy.props.IntProperty(
+        name="Smoothing",
+        description="Moving average window in frames, reduces the noise of motion capture",
+        default=3,
+        min=1
+    )
+    include_ends: bpy.props.BoolProperty(
+        name="Include Ends",
+        description="Always mark the first and last frame of the action",
+        default=True
+    )
+    keep_marked: bpy.props.BoolProperty(
+        name="Keep Marked",
+        description="Keep the frames that are already marked",
+        default=False
+    )
+    
+    @classmethod
+    def poll(cls, context):
+        armature = context.scene.btc_armature
+        return armature is not None and armature.animation_data is not None and armature.animation_data.action is not None
+    
+    def execute(self, context):
+        action = context.scene.btc_armature.animation_data.action
+        start, end = action.frame_range
+        frames = np.arange(int(start), int(end) + 1, dtype=np.int32)
+        
+        # Ma trận frame x channel của tất cả fcurve
+        matrix = anim_utils.action_channel_matrix(action, frames)
+        scores = keyframe_utils.key_pose_scores(matrix, self.smoothing)
+        picked = keyframe_utils.pick_key_poses(
+            scores,
+            count=self.count if self.selection == 'COUNT' else 0,
+            threshold=self.threshold if self.selection == 'THRESHOLD' else 0.0,
+            min_spacing=self.min_spacing,
+            include_ends=self.include_ends
+        )
+        
+        keyframe_utils.set_marked_frames(context.scene.btc_keyframes, frames[picked].tolist(),
+                                         clear_others=not self.keep_marked)
+        self.report({'INFO'}, f"Marked {len(picked)} key poses in {len(frames)} frames")
+        return {'FINISHED'}
+
+# Đánh dấu riêng cho các bone đang chọn
+class BTC_OT_MarkBoneKeyframes(Operator):
+    bl_idname = "btc.mark_bone_keyframes"
+    bl_label = "Mark Bone Keyframes"
+    bl_description = "Mark or clear frames on the selected bones only, their keys are kept when cleaning even if the frame is not marked for the whole body"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    action: bpy.props.EnumProperty(
+        name="Action",
+        items=[
+            ('MARK', "Mark", "Mark the frames on the selected bones"),
+            ('CLEAR', "Clear", "Clear the marks of the selected bones"),
+        ],
+        default='MARK'
+    )
+    scope: bpy.props.EnumProperty(
+        name="Frames",
+        items=[
+            ('CURRENT', "Current Frame", "Only the current frame"),
+            ('KEYED', "Keyed Frames", "Every frame keyed on the selected bones, or every mark of the selected bones when clearing"),
+        ],
+        default='CURRENT'
+    )
+    
+    @classmethod
+    def poll(cls, context):
+        armature = context.scene.btc_armature
+        return armature is not None and armature.mode == 'POSE' and bool(context.selected_pose_bones)
+    
+    def execute(self, context):
+        scene = context.scene
+        bone_names = [bone.name for bone in context.selected_pose_bones if bone.id_data == scene.btc_armature]
+        if not bone_names:
+            self.report({'WARNING'}, "No bone of the picked armature is selected")
+            return {'CANCELLED'}
+        
+        if self.scope == 'CURRENT':
+            frames = np.array([scene.frame_current], dtype=np.int32)
+        else:
+            armature = scene.btc_armature
+            action = armature.animation_data.action if armature.animation_data else None
+            index = keyframe_utils.cached_bone_key_frames(action) if action else {}
+            keyed = [index[name] for name in bone_names if name in index]
+            frames = np.unique(np.concatenate(keyed)) if keyed else np.empty(0, dtype=np.int32)
+        
+        if self.action == 'CLEAR' and self.scope == 'KEYED':
+            # Xóa mọi frame đánh dấu riêng của các bone này
+            marks = keyframe_utils.get_bone_marks(scene)
+            frames = np.unique(np.concatenate([marks[name] for name in bone_names if name in marks] or [frames]))
+        
+        changed = keyframe_utils.mark_bone_frames(scene, bone_names, frames, mark=self.action == 'MARK')
+        verb = "Marked" if self.action == 'MARK' else "Cleared"
+        self.report({'INFO'}, f"{verb} {changed} frames on {len(bone_names)} bones")
+        return {'FINISHED'}
+
 # List of classes to register
 classes = [
     BTC_OT_PickArmature,
@@ -155,4 +450,10 @@ classes = [
     BTC_OT_ClearCurrentKeyframe,
     BTC_OT_MarkAllKeyframes,
     BTC_OT_ClearAllKeyframes,
+    BTC_OT_MarkFrameRange,
+    BTC_OT_MarkSelectedKeys,
+    BTC_OT_MarkersToKeyframes,
+    BTC_OT_KeyframesToMarkers,
+    BTC_OT_AutoMarkKeyframes,
+    BTC_OT_MarkBoneKeyframes,
 ]
\ No newline at end of file
@@ -106,6 +106,38 @@ class BTC_PT_KeyframeMarkersPanel(PanelBasics, Panel):
         row = layout.row(align=True)
         row.operator("btc.mark_all_keyframes", text="Mark All", icon="KEYFRAME_HLT")
         row.operator("btc.clear_all_keyframes", text="Clear All", icon="X")
+        
+        # Đánh dấu nhiều frame một lần
+        row = layout.row(align=True)
+        row.operator("btc.mark_frame_range", text="Mark Range", icon="PREVIEW_RANGE")
+        op = row.operator("btc.mark_frame_range", text="Every Nth", icon="IPO_CONSTANT")
+        op.step = 5
+        row = layout.row(align=True)
+        row.operator("btc.mark_selected_keys", text="From Selected Keys", icon="ACTION")
+        row = layout.row(align=True)
+        row.operator("btc.markers_to_keyframes", text="From Markers", icon="MARKER_HLT")
+        row.operator("btc.keyframes_to_markers", text="To Markers", icon="MARKER")
+        
+        # Tự động đánh dấu key pose
+        row = layout.row()
+        row.operator("btc.auto_mark_keyframes", text="Auto Mark", icon="AUTO")
+        
+        # Đánh dấu riêng cho các bone đang chọn (Pose Mode)
+        box = layout.box()
+        box.label(text="Selected Bones:", icon="BONE_DATA")
+        row = box.row(align=True)
+        op = row.operator("btc.mark_bone_keyframes", text="Mark Current", icon="KEYFRAME")
+        op.action, op.scope = 'MARK', 'CURRENT'
+        op = row.operator("btc.mark_bone_keyframes", text="Mark Keyed", icon="KEYFRAME_HLT")
+        op.action, op.scope = 'MARK', 'KEYED'
+        row = box.row(align=True)
+        op = row.operator("btc.mark_bone_keyframes", text="Clear Current", icon="KEYFRAME")
+        op.action, op.scope = 'CLEAR', 'CURRENT'
+        op = row.operator("btc.mark_bone_keyframes", text="Clear All", icon="X")
+        op.action, op.scope = 'CLEAR', 'KEYED'
+        bone_marks = context.scene.get("btc_bone_marks") or {}
+        if bone_marks:
+            box.label(text=f"{len(bone_marks)} bones have their own marks")
 
 # Panel con - Marked Keyframes
 class BTC_PT_MarkedKeyframesPanel(PanelBasics, Panel):
@@ -126,6 +158,7 @@ class BTC_PT_MarkedKeyframesPanel(PanelBasics, Panel):
         
         row = layout.row()
         row.label(text=f"Marked: {marked_count} / {total_count} keyframes")
+        row.prop(context.scene, "btc_filter_selected_bones", text="", icon="BONE_DATA")
         
         # UIList with checkbox
         row = layout.row()
@@ -173,6 +206,29 @@ class BTC_PT_ExportPanel(PanelBasics, Panel):
         row = layout.row()
         row.scale_y = 1.2
         row.operator("btc.export_object", text="Export Object", icon="OBJECT_DATA")
+        row = layout.row()
+        row.operator_menu_enum("btc.export_batch", "mode", text="Export Batch", icon="OUTLINER_OB_ARMATURE")
+        row = layout.row()
+        from ..utils import live_link
+        streaming = live_link.get_live_link() is not None
+        row.operator("btc.live_link", text="Stop Live Link" if streaming else "Live Link", icon="LINKED", depress=streaming)
+        row = layout.row()
+        row.prop(context.scene, "btc_export_frames", text="Frames")
+        row = layout.row()
+        row.prop(context.scene, "btc_reuse_sent_mesh")
+        row = layout.row()
+        row.prop(context.scene, "btc_background_export")
+        row = layout.row()
+        row.prop(context.scene, "btc_progressive_export")
+        
+        # Tiến độ các export nền
+        from ..utils import export_utils
+        jobs = export_utils.get_export_jobs()
+        if jobs:
+            box = layout.box()
+            for job in jobs:
+                box.label(text=f"{job.name}: {job.message} ({int(job.progress * 100)}%)", icon="TIME")
+            box.operator("btc.cancel_export", text="Cancel", icon="CANCEL")
         
         # Export animation
         row = layout.row()
@@ -242,20 +298,52 @@ class BTC_PT_CascadeurToBlenderPanel(PanelBasics, Panel):
         col = layout.column()
         col.enabled = handler.is_csc_exe_path_valid
         
+        row = col.row()
+        row.prop(context.scene, "btc_import_mode", text="")
+        
         row = col.row()
         row.scale_y = 1.2
         row.operator("btc.import_scene", text="Import Scene", icon="SCENE_DATA")
         
-        row = col.row()
+        row = col.row(align=True)
         row.scale_y = 1.2
         row.operator("btc.import_all_scenes", text="Import All Scenes", icon="DOCUMENTS")
+        op = row.operator("btc.import_all_scenes", text="", icon="FILE_REFRESH")
+        op.force = True
+        
+        row = col.row()
+        row.prop(context.scene, "btc_import_per_collection")
+        row = col.row()
+        row.prop(context.scene, "btc_import_share_meshes")
+        row = col.row()
+        row.prop(context.scene, "btc_keep_generations")
+        row.prop(context.scene, "btc_auto_purge_imports")
+        
+        # Tiến độ import các scene
+        from ..utils import file_watcher
+        job = file_watcher.get_import_job()
+        if job is not None:
+            box = layout.box()
+            box.label(text=f"Importing {job.done} / {job.total} scenes ({int(job.progress * 100)}%)", icon="TIME")
+            if job.current_file:
+                box.label(text=job.current_file)
+            box.operator("btc.cancel_import", text="Cancel", icon="CANCEL")
+        
+        row = col.row()
+        row.operator("btc.import_keyframes", text="Import Key Frames", icon="KEYFRAME_HLT")
         
         # Clean Keyframes in Blender
         box = layout.box()
         box.label(text="Cleanup Tools:", icon="BRUSH_DATA")
         
+        row = box.row(align=True)
+        op = row.operator("btc.clean_keyframes", text="Clean Keyframes", icon="BRUSH_DATA")
+        op.mode = 'MARKED'
+        op = row.operator("btc.clean_keyframes", text="Decimate", icon="MOD_DECIM")
+        op.mode = 'DECIMATE'
+        
         row = box.row()
-        row.operator("btc.clean_keyframes", text="Clean Keyframes", icon="BRUSH_DATA")
+        row.operator("btc.purge_old_imports", text="Purge Old Imports", icon="TRASH")
 
 # Đăng ký UIList cho phần Marked Keyframes
 class BTC_UL_KeyframeList(UIList):
@@ -275,4 +363,26 @@ class BTC_UL_KeyframeList(UIList):
         elif self.layout_type == 'GRID':
             layout.alignment = 'CENTER'
             layout.label(text=str(item.frame))
-            layout.prop(item, "is_marked", text="")
\ No newline at end of file
+            layout.prop(item, "is_marked", text="")
+    
+    def filter_items(self, context, data, propname):
+        """Chỉ hiện các frame có key (hoặc đánh dấu riêng) trên các bone đang chọn"""
+        keyframes = getattr(data, propname)
+        scene = context.scene
+        armature = scene.btc_armature
+        if not scene.btc_filter_selected_bones or armature is None or armature.mode != 'POSE':
+            return [], []
+        
+        import numpy as np
+        from ..utils import keyframe_utils
+        frames, _ = keyframe_utils.get_keyframe_arrays(keyframes)
+        bone_names = [bone.name for bone in context.selected_pose_bones or [] if bone.id_data == armature]
+        action = armature.animation_data.action if armature.animation_data else None
+        index = keyframe_utils.cached_bone_key_frames(action) if action else {}
+        bone_marks = keyframe_utils.get_bone_marks(scene)
+        shown = [index[name] for name in bone_names if name in index]
+        shown += [bone_marks[name] for name in bone_names if name in bone_marks]
+        
+        visible = np.isin(frames, np.concatenate(shown)) if shown else np.zeros(len(frames), dtype=bool)
+        flags = np.where(visible, self.bitflag_filter_item, 0)
+        return flags.tolist(), []
\ No newline at end of file
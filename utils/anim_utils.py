@@ -0,0 +1,600 @@
+import os
+import re
+import bpy
+import numpy as np
+from . import datablock_utils
+from . import fbx_anim_reader
+
+# pose.bones["Name"].location -> ("Name", "location")
+BONE_PATH_RE = re.compile(r'^pose\.bones\["((?:[^"\\]|\\.)*)"\]\.(\w+)$')
+
+def bone_path_parts(data_path):
+    """Split a pose bone data path into (bone name, property), or None."""
+    match = BONE_PATH_RE.match(data_path)
+    if not match:
+        return None
+    return match.group(1).replace('\\"', '"'), match.group(2)
+
+def bone_data_path(bone_name, prop):
+    """Build the data path of a pose bone property."""
+    return 'pose.bones["{}"].{}'.format(bone_name.replace('"', '\\"'), prop)
+
+def get_fcurve_keys(fcurve):
+    """Return the keyframe coordinates of an fcurve as an (N, 2) float32 array."""
+    count = len(fcurve.keyframe_points)
+    co = np.empty(count * 2, dtype=np.float32)
+    if count:
+        fcurve.keyframe_points.foreach_get("co", co)
+    return co.reshape(count, 2)
+
+def set_fcurve_keys(fcurve, co, interpolation='LINEAR'):
+    """
+    Replace the keyframes of an fcurve with the given (N, 2) coordinates.
+
+    Keys are written with foreach_set, handles are recomputed by update().
+    """
+    co = np.ascontiguousarray(co, dtype=np.float32).reshape(-1)
+    count = co.size // 2
+
+    points = fcurve.keyframe_points
+    if len(points) != count:
+        points.clear()
+        points.add(count)
+
+    if count:
+        points.foreach_set("co", co)
+        points.foreach_set("handle_left", co)
+        points.foreach_set("handle_right", co)
+        if interpolation:
+            interp = bpy.types.Keyframe.bl_rna.properties["interpolation"].enum_items[interpolation].value
+            points.foreach_set("interpolation", np.full(count, interp, dtype=np.int32))
+    fcurve.update()
+
+# Thuộc tính keyframe được giữ lại khi xóa bớt key (foreach_get/foreach_set)
+KEYFRAME_VECTOR_PROPS = ("co", "handle_left", "handle_right")
+KEYFRAME_FLOAT_PROPS = ("back", "amplitude", "period")
+KEYFRAME_ENUM_PROPS = ("interpolation", "easing", "handle_left_type", "handle_right_type", "type")
+
+def keep_fcurve_keys(fcurve, keep, freeze_handles=False):
+    """
+    Remove the keys of an fcurve where `keep` is False.
+
+    The remaining keys keep their handles, interpolation and easing, all
+    properties are read and written with foreach_get / foreach_set.
+    With `freeze_handles`, the automatic handles of the keys next to a
+    removed key become ALIGNED (VECTOR becomes FREE), so update() does not
+    recompute them from the new neighbours.
+
+    Returns:
+        Number of removed keys
+    """
+    points = fcurve.keyframe_points
+    count = len(points)
+    keep = np.asarray(keep, dtype=bool)
+    kept = int(np.count_nonzero(keep))
+    if kept == count:
+        return 0
+
+    values = {}
+    for prop in KEYFRAME_VECTOR_PROPS:
+        data = np.empty(count * 2, dtype=np.float32)
+        points.foreach_get(prop, data)
+        values[prop] = data.reshape(-1, 2)[keep].ravel()
+    for prop in KEYFRAME_FLOAT_PROPS:
+        data = np.empty(count, dtype=np.float32)
+        points.foreach_get(prop, data)
+        values[prop] = data[keep]
+    for prop in KEYFRAME_ENUM_PROPS:
+        data = np.empty(count, dtype=np.int32)
+        points.foreach_get(prop, data)
+        values[prop] = data[keep]
+
+    if freeze_handles:
+        # Key còn lại có key liền trước hoặc liền sau bị xóa
+        gap = ~keep
+        near = keep & (np.append(gap[1:], False) | np.insert(gap[:-1], 0, False))
+        types = bpy.types.Keyframe.bl_rna.properties["handle_left_type"].enum_items
+        frozen = {types[name].value: types[target].value for name, target in
+                  (('AUTO', 'ALIGNED'), ('AUTO_CLAMPED', 'ALIGNED'), ('VECTOR', 'FREE'))}
+        near = near[keep]
+        for prop in ("handle_left_type", "handle_right_type"):
+            data = values[prop]
+            for source, target in frozen.items():
+                data[near & (data == source)] = target
+
+    points.clear()
+    if kept:
+        points.add(kept)
+        for prop, data in values.items():
+            points.foreach_set(prop, data)
+    fcurve.update()
+    return count - kept
+
+def new_action_from_channels(name, channels):
+    """
+    Create an action from bone channels.
+
+    Args:
+        name: Action name
+        channels: Iterable of (bone name, property, array index, (N, 2) keys)
+
+    Returns:
+        The new action
+    """
+    action = bpy.data.actions.new(name)
+    for bone_name, prop, index, co in channels:
+        fcurve = action.fcurves.new(bone_data_path(bone_name, prop), index=index, action_group=bone_name)
+        set_fcurve_keys(fcurve, co)
+    return action
+
+def sample_action(action, frames, name=None, bone_names=None):
+    """
+    Create a copy of an action keyed only at the given frames.
+
+    Every fcurve is evaluated at `frames` and keyed with LINEAR interpolation,
+    so the curves between two sampled frames are straight lines.
+    With `bone_names`, only the curves of those bones (and non bone curves)
+    are copied.
+    """
+    frames = np.asarray(frames, dtype=np.float32)
+    sampled = bpy.data.actions.new(name or f"{action.name}_sampled")
+    for fcurve in action.fcurves:
+        if bone_names is not None:
+            parts = bone_path_parts(fcurve.data_path)
+            if parts is not None and parts[0] not in bone_names:
+                continue
+        values = np.fromiter((fcurve.evaluate(frame) for frame in frames), dtype=np.float32, count=frames.size)
+        group = fcurve.group.name if fcurve.group else ""
+        new_fcurve = sampled.fcurves.new(fcurve.data_path, index=fcurve.array_index, action_group=group)
+        set_fcurve_keys(new_fcurve, np.column_stack((frames, values)))
+    return sampled
+
+def action_channel_matrix(action, frames):
+    """
+    Values of every fcurve of an action at the given frames.
+
+    The curves are interpolated linearly between their keys with np.interp
+    (exact for baked or mocap curves keyed on every frame).
+
+    Returns:
+        (frames, channels) float32 matrix, channels in action.fcurves order
+    """
+    frames = np.asarray(frames, dtype=np.float32)
+    matrix = np.empty((frames.size, len(action.fcurves)), dtype=np.float32)
+    for column, fcurve in enumerate(action.fcurves):
+        keys = get_fcurve_keys(fcurve)
+        if len(keys):
+            matrix[:, column] = np.interp(frames, keys[:, 0], keys[:, 1])
+        else:
+            matrix[:, column] = 0.0
+    return matrix
+
+def action_bone_channels(action, bone_names=None):
+    """
+    Yield (bone name, property, array index, keys) for the bone fcurves of an action.
+
+    Args:
+        action: Source action
+        bone_names: Optional set of bone names to keep
+    """
+    for fcurve in action.fcurves:
+        parts = bone_path_parts(fcurve.data_path)
+        if parts is None:
+            continue
+        bone_name, prop = parts
+        if bone_names is not None and bone_name not in bone_names:
+            continue
+        yield bone_name, prop, fcurve.array_index, get_fcurve_keys(fcurve)
+
+def assign_action(armature, action):
+    """Assign an action to an armature, returning the previous one."""
+    anim_data = armature.animation_data or armature.animation_data_create()
+    previous = anim_data.action
+    anim_data.action = action
+    return previous
+
+def armature_actions(armature):
+    """
+    Actions that animate an armature.
+    
+    The active action and the NLA strip actions come first, followed by every
+    other action whose bone curves all target bones of the armature.
+    """
+    actions = []
+    anim_data = armature.animation_data
+    if anim_data:
+        if anim_data.action:
+            actions.append(anim_data.action)
+        for track in anim_data.nla_tracks:
+            for strip in track.strips:
+                if strip.action and strip.action not in actions:
+                    actions.append(strip.action)
+    
+    bone_names = set(armature.pose.bones.keys())
+    for action in bpy.data.actions:
+        if action in actions or getattr(action, "id_root", 'OBJECT') not in {'OBJECT', ''}:
+            continue
+        action_bones = set()
+        for fcurve in action.fcurves:
+            parts = bone_path_parts(fcurve.data_path)
+            if parts:
+                action_bones.add(parts[0])
+        if action_bones and action_bones <= bone_names:
+            actions.append(action)
+    return actions
+
+def import_fbx_animation(fbx_path, armature, action_name=None):
+    """
+    Apply the animation of an FBX file onto an existing armature.
+
+    The file goes through Blender's FBX importer (with its axis conversion
+    and bone orientation handling) with only what the animation needs; the
+    bone curves of the imported armature are copied into a new action on
+    `armature` (matched by bone name), with rotations converted to the
+    rotation_mode of each target bone, and everything the import created is
+    removed again.
+
+    Args:
+        fbx_path: FBX file path
+        armature: Target armature object
+        action_name: Name of the new action (defaults to the file name)
+
+    Returns:
+        (new action, number of curves copied)
+    """
+    context = bpy.context
+    bone_names = {bone.name for bone in armature.pose.bones}
+
+    # Lưu selection hiện tại vì importer sẽ thay đổi nó
+    original_selection = list(context.selected_objects)
+    active_object = context.view_layer.objects.active
+
+    snapshot = datablock_utils.snapshot_ids()
+    bpy.ops.import_scene.fbx(filepath=fbx_path, use_anim=True, use_custom_normals=False,
+                             use_image_search=False, use_custom_props=False)
+    new_ids = datablock_utils.new_ids_since(snapshot)
+
+    try:
+        # Chọn armature import có nhiều bone trùng tên nhất
+        source = None
+        best_match = 0
+        for id_data in new_ids:
+            if not isinstance(id_data, bpy.types.Object) or id_data.type != 'ARMATURE':
+                continue
+            if not id_data.animation_data or not id_data.animation_data.action:
+                continue
+            match = len(bone_names.intersection(bone.name for bone in id_data.pose.bones))
+            if match > best_match:
+                source, best_match = id_data, match
+
+        if source is None:
+            raise RuntimeError("No animated armature with matching bones in FBX")
+
+        if not action_name:
+            action_name = os.path.splitext(os.path.basename(fbx_path))[0]
+        channels = convert_rotation_channels(
+            action_bone_channels(source.animation_data.action, bone_names), source, armature)
+        action = new_action_from_channels(action_name, channels)
+        assign_action(armature, action)
+    finally:
+        # Xóa tất cả dữ liệu do importer tạo ra
+        bpy.data.batch_remove(new_ids)
+
+        for obj in context.selected_objects:
+            obj.select_set(False)
+        for obj in original_selection:
+            obj.select_set(True)
+        context.view_layer.objects.active = active_object
+
+    return action, len(channels)
+
+# Thuộc tính xoay của pose bone theo rotation_mode
+ROTATION_PROPERTIES = ("rotation_quaternion", "rotation_axis_angle", "rotation_euler")
+
+def rotation_property(rotation_mode):
+    """Pose bone property animated for a rotation_mode."""
+    if rotation_mode == 'QUATERNION':
+        return "rotation_quaternion"
+    if rotation_mode == 'AXIS_ANGLE':
+        return "rotation_axis_angle"
+    return "rotation_euler"
+
+def convert_rotation_channels(channels, source, target):
+    """
+    Rewrite the rotation channels of the bones of `source` in the
+    rotation_mode of the bones of `target` with the same name.
+
+    The rotation curves of a bone are sampled at the union of their key
+    frames, converted through rotation matrices and keyed again. Rotation
+    curves of a mode the source bone does not use are dropped.
+
+    Args:
+        channels: Iterable of (bone name, property, array index, (N, 2) keys)
+        source: Armature object the channels come from
+        target: Armature object the channels are written for
+
+    Returns:
+        List of channels
+    """
+    result = []
+    rotations = {}
+    for channel in channels:
+        if channel[1] in ROTATION_PROPERTIES:
+            rotations.setdefault(channel[0], []).append(channel)
+        else:
+            result.append(channel)
+
+    for bone_name, bone_channels in rotations.items():
+        source_bone = source.pose.bones[bone_name]
+        source_mode = source_bone.rotation_mode
+        target_mode = target.pose.bones[bone_name].rotation_mode
+        prop = rotation_property(source_mode)
+        curves = {index: keys for _, channel_prop, index, keys in bone_channels if channel_prop == prop}
+        if not curves:
+            continue
+        if rotation_property(target_mode) == prop and (prop != "rotation_euler" or source_mode == target_mode):
+            result.extend((bone_name, prop, index, keys) for index, keys in curves.items())
+            continue
+
+        default = tuple(getattr(source_bone, prop))
+        frames = np.unique(np.concatenate([keys[:, 0] for keys in curves.values()]))
+        values = np.column_stack([np.interp(frames, curves[index][:, 0], curves[index][:, 1])
+                                  if index in curves else np.full(frames.size, default[index])
+                                  for index in range(len(default))])
+        new_prop, new_values = matrix_to_rotation(rotation_to_matrix(values, source_mode), target_mode)
+        for index in range(new_values.shape[1]):
+            result.append((bone_name, new_prop, index, np.column_stack((frames, new_values[:, index]))))
+    return result
+
+# FBX RotationOrder -> order in which the axis rotations are applied
+FBX_ROTATION_ORDERS = ("XYZ", "XZY", "YZX", "YXZ", "ZXY", "ZYX")
+
+def _axis_rotation(axis, radians):
+    """(N, 3, 3) rotation matrices around one axis."""
+    c, s = np.cos(radians), np.sin(radians)
+    one, zero = np.ones_like(c), np.zeros_like(c)
+    if axis == "X":
+        rows = ((one, zero, zero), (zero, c, -s), (zero, s, c))
+    elif axis == "Y":
+        rows = ((c, zero, s), (zero, one, zero), (-s, zero, c))
+    else:
+        rows = ((c, -s, zero), (s, c, zero), (zero, zero, one))
+    return np.stack([np.stack(row, axis=-1) for row in rows], axis=-2)
+
+def euler_to_matrix(degrees, order="XYZ"):
+    """(N, 3) euler angles in degrees -> (N, 3, 3) rotation matrices."""
+    radians = np.radians(np.asarray(degrees, dtype=np.float64).reshape(-1, 3))
+    matrix = np.broadcast_to(np.eye(3), (len(radians), 3, 3))
+    for axis in order:
+        matrix = _axis_rotation(axis, radians[:, "XYZ".index(axis)]) @ matrix
+    return matrix
+
+def matrix_to_quaternion(matrix):
+    """(N, 3, 3) rotation matrices -> (N, 4) quaternions (w, x, y, z) with continuous signs."""
+    m = np.asarray(matrix, dtype=np.float64)
+    m00, m11, m22 = m[:, 0, 0], m[:, 1, 1], m[:, 2, 2]
+    trace = m00 + m11 + m22
+    quat = np.empty((len(m), 4))
+
+    # Shepperd: chọn nhánh ổn định nhất cho từng ma trận
+    cases = np.argmax(np.stack((trace, m00, m11, m22), axis=-1), axis=-1)
+
+    sel = cases == 0
+    s = np.sqrt(np.maximum(trace[sel] + 1.0, 1e-12)) * 2.0
+    quat[sel] = np.stack((0.25 * s,
+                          (m[sel, 2, 1] - m[sel, 1, 2]) / s,
+                          (m[sel, 0, 2] - m[sel, 2, 0]) / s,
+                          (m[sel, 1, 0] - m[sel, 0, 1]) / s), axis=-1)
+    sel = cases == 1
+    s = np.sqrt(np.maximum(1.0 + m00[sel] - m11[sel] - m22[sel], 1e-12)) * 2.0
+    quat[sel] = np.stack(((m[sel, 2, 1] - m[sel, 1, 2]) / s,
+                          0.25 * s,
+                          (m[sel, 0, 1] + m[sel, 1, 0]) / s,
+                          (m[sel, 0, 2] + m[sel, 2, 0]) / s), axis=-1)
+    sel = cases == 2
+    s = np.sqrt(np.maximum(1.0 + m11[sel] - m00[sel] - m22[sel], 1e-12)) * 2.0
+    quat[sel] = np.stack(((m[sel, 0, 2] - m[sel, 2, 0]) / s,
+                          (m[sel, 0, 1] + m[sel, 1, 0]) / s,
+                          0.25 * s,
+                          (m[sel, 1, 2] + m[sel, 2, 1]) / s), axis=-1)
+    sel = cases == 3
+    s = np.sqrt(np.maximum(1.0 + m22[sel] - m00[sel] - m11[sel], 1e-12)) * 2.0
+    quat[sel] = np.stack(((m[sel, 1, 0] - m[sel, 0, 1]) / s,
+                          (m[sel, 0, 2] + m[sel, 2, 0]) / s,
+                          (m[sel, 1, 2] + m[sel, 2, 1]) / s,
+                          0.25 * s), axis=-1)
+
+    quat /= np.linalg.norm(quat, axis=-1, keepdims=True)
+
+    # Giữ dấu liên tục giữa các frame để nội suy không bị lật
+    if len(quat) > 1:
+        flips = np.einsum("ij,ij->i", quat[1:], quat[:-1]) < 0.0
+        sign = np.where(np.concatenate(([False], np.cumsum(flips) % 2 == 1)), -1.0, 1.0)
+        quat *= sign[:, None]
+    return quat
+
+def matrix_to_euler_xyz(matrix):
+    """(N, 3, 3) rotation matrices -> (N, 3) euler XYZ angles in radians."""
+    m = np.asarray(matrix, dtype=np.float64)
+    y = np.arcsin(np.clip(-m[:, 2, 0], -1.0, 1.0))
+    x = np.arctan2(m[:, 2, 1], m[:, 2, 2])
+    z = np.arctan2(m[:, 1, 0], m[:, 0, 0])
+    return np.stack((x, y, z), axis=-1)
+
+def matrix_to_euler(matrix, order="XYZ"):
+    """
+    (N, 3, 3) rotation matrices -> (N, 3) euler angles in radians for a
+    Blender euler order, unwrapped so that they are continuous between frames.
+
+    The axes are relabeled so that `order` becomes XYZ; an odd permutation
+    mirrors the frame, which negates the angles.
+    """
+    perm = ["XYZ".index(axis) for axis in order]
+    m = np.asarray(matrix, dtype=np.float64)[:, perm][:, :, perm]
+    angles = matrix_to_euler_xyz(m)
+    if order not in ("XYZ", "YZX", "ZXY"):
+        angles = -angles
+    euler = np.empty_like(angles)
+    euler[:, perm] = angles
+    return np.unwrap(euler, axis=0) if len(euler) > 1 else euler
+
+def quaternion_to_matrix(quat):
+    """(N, 4) quaternions (w, x, y, z) -> (N, 3, 3) rotation matrices."""
+    q = np.asarray(quat, dtype=np.float64).reshape(-1, 4)
+    norm = np.linalg.norm(q, axis=-1, keepdims=True)
+    w, x, y, z = (q / np.where(norm > 1e-12, norm, 1.0)).T
+    return np.stack((
+        np.stack((1.0 - 2.0 * (y * y + z * z), 2.0 * (x * y - w * z), 2.0 * (x * z + w * y)), axis=-1),
+        np.stack((2.0 * (x * y + w * z), 1.0 - 2.0 * (x * x + z * z), 2.0 * (y * z - w * x)), axis=-1),
+        np.stack((2.0 * (x * z - w * y), 2.0 * (y * z + w * x), 1.0 - 2.0 * (x * x + y * y)), axis=-1),
+    ), axis=-2)
+
+def rotation_to_matrix(values, rotation_mode):
+    """(N, 3 or 4) pose bone rotation values of a rotation_mode -> (N, 3, 3) matrices."""
+    values = np.asarray(values, dtype=np.float64)
+    if rotation_mode == 'QUATERNION':
+        return quaternion_to_matrix(values)
+    if rotation_mode == 'AXIS_ANGLE':
+        half = values[:, 0] * 0.5
+        axis = values[:, 1:]
+        length = np.linalg.norm(axis, axis=-1, keepdims=True)
+        axis = np.divide(axis, length, out=np.zeros_like(axis), where=length > 1e-12)
+        return quaternion_to_matrix(np.column_stack((np.cos(half), axis * np.sin(half)[:, None])))
+    return euler_to_matrix(np.degrees(values), rotation_mode)
+
+def matrix_to_rotation(matrix, rotation_mode):
+    """
+    (N, 3, 3) rotation matrices -> (property, (N, 3 or 4) values) for a pose
+    bone rotation_mode (quaternion, axis angle or any euler order).
+    """
+    if rotation_mode == 'QUATERNION':
+        return "rotation_quaternion", matrix_to_quaternion(matrix)
+    if rotation_mode == 'AXIS_ANGLE':
+        quat = matrix_to_quaternion(matrix)
+        half = np.arccos(np.clip(quat[:, 0], -1.0, 1.0))
+        sin = np.sin(half)[:, None]
+        # Trục mặc định của Blender khi góc bằng 0 là Y
+        axis = np.divide(quat[:, 1:], sin, out=np.tile([0.0, 1.0, 0.0], (len(quat), 1)), where=sin > 1e-8)
+        return "rotation_axis_angle", np.column_stack((2.0 * half, axis))
+    return "rotation_euler", matrix_to_euler(matrix, rotation_mode)
+
+def _sample_axes(axes, times, default):
+    """Sample the 3 axis curves of a channel at the given times -> (N, 3)."""
+    values = np.empty((len(times), 3))
+    for axis in range(3):
+        curve = axes[axis] if axes is not None else default[axis]
+        if isinstance(curve, tuple):
+            values[:, axis] = np.interp(times, curve[0], curve[1])
+        else:
+            values[:, axis] = curve
+    return values
+
+def _rest_relative_matrix(bone):
+    """Rest matrix of a bone relative to its parent (armature space for roots)."""
+    rest = np.array(bone.matrix_local, dtype=np.float64)
+    if bone.parent:
+        rest = np.linalg.inv(np.array(bone.parent.matrix_local, dtype=np.float64)) @ rest
+    return rest
+
+def _translation_scale(animation, armature):
+    """
+    Scale from FBX translations to armature units.
+
+    Estimated from the rest offsets of child bones, which is independent of
+    the unit settings of the exporter. Falls back to UnitScaleFactor.
+    """
+    ratios = []
+    for bone in armature.data.bones:
+        model = animation.models.get(bone.name)
+        if model is None or bone.parent is None:
+            continue
+        fbx_length = np.linalg.norm(model["T"])
+        bone_length = np.linalg.norm(_rest_relative_matrix(bone)[:3, 3])
+        if fbx_length > 1e-6 and bone_length > 1e-6:
+            ratios.append(bone_length / fbx_length)
+    if ratios:
+        return float(np.median(ratios))
+    return animation.unit_scale / 100.0
+
+def fbx_animation_channels(animation, armature, fps):
+    """
+    Convert FBX bone curves to pose bone channels of an armature.
+
+    FBX curves hold each bone's transform relative to its parent. The pose
+    basis is that transform expressed relative to the bone's rest matrix,
+    which assumes the armature was built from the same skeleton with the
+    default Y primary bone axis (as Blender's FBX exporter writes it).
+
+    Args:
+        animation: FBXAnimation from fbx_anim_reader
+        armature: Target armature object
+        fps: Frames per second used to convert key times to frames
+
+    Yields:
+        (bone name, property, array index, (N, 2) keys)
+    """
+    trans_scale = _translation_scale(animation, armature)
+
+    for pose_bone in armature.pose.bones:
+        axes = animation.channels.get(pose_bone.name)
+        model = animation.models.get(pose_bone.name)
+        if not axes or model is None:
+            continue
+
+        # Hợp tất cả thời điểm key của bone
+        times = [curve[0] for channel in axes.values() for curve in channel if isinstance(curve, tuple)]
+        if not times:
+            continue
+        times = np.unique(np.concatenate(times))
+        frames = times * fps
+
+        translation = _sample_axes(axes.get("T"), times, model["T"]) * trans_scale
+        rotation = _sample_axes(axes.get("R"), times, model["R"])
+        scaling = _sample_axes(axes.get("S"), times, model["S"])
+
+        order = FBX_ROTATION_ORDERS[model["RotationOrder"]] if model["RotationOrder"] < 6 else "XYZ"
+        rot = euler_to_matrix(rotation, order)
+        rot = euler_to_matrix([model["PreRotation"]])[0] @ rot
+        rot = rot @ euler_to_matrix([model["PostRotation"]])[0].T
+
+        local = np.zeros((len(times), 4, 4))
+        local[:, :3, :3] = rot * scaling[:, None, :]
+        local[:, :3, 3] = translation
+        local[:, 3, 3] = 1.0
+
+        basis = np.linalg.inv(_rest_relative_matrix(pose_bone.bone)) @ local
+        location = basis[:, :3, 3]
+        scale = np.linalg.norm(basis[:, :3, :3], axis=1)
+        rot = basis[:, :3, :3] / np.where(scale > 1e-12, scale, 1.0)[:, None, :]
+
+        rotation_prop, rotation_values = matrix_to_rotation(rot, pose_bone.rotation_mode)
+
+        for prop, values in (("location", location), (rotation_prop, rotation_values), ("scale", scale)):
+            for index in range(values.shape[1]):
+                yield pose_bone.name, prop, index, np.column_stack((frames, values[:, index]))
+
+def read_fbx_animation_curves(fbx_path, armature, action_name=None):
+    """
+    Apply the animation of a binary FBX file onto an armature without
+    Blender's FBX importer, using fbx_anim_reader.
+
+    No axis conversion or bone orientation correction is applied: the file
+    must use Blender's axes and the default Y bone axis, as the files
+    written by Blender's FBX exporter and sent back by Cascadeur do.
+
+    Returns:
+        (new action, number of curves written)
+    """
+    scene = bpy.context.scene
+    fps = scene.render.fps / scene.render.fps_base
+
+    animation = fbx_anim_reader.read_fbx_animation(fbx_path)
+    channels = list(fbx_animation_channels(animation, armature, fps))
+    if not channels:
+        raise RuntimeError("No bone curves in FBX match the armature")
+
+    if not action_name:
+        action_name = os.path.splitext(os.path.basename(fbx_path))[0]
+    action = new_action_from_channels(action_name, channels)
+    assign_action(armature, action)
+    return action, len(channels)
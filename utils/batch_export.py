@@ -0,0 +1,308 @@
+# Xuất hàng loạt file .blend sang Cascadeur, chạy không giao diện:
+#   blender -b --python batch_export.py -- <folder|manifest> [--workers N] [--summary out.json]
+#
+# Mỗi file .blend được xử lý trong một tiến trình Blender nền riêng
+# (pick armature -> mark keyframes -> export FBX/JSON). Khi tất cả xong,
+# một trigger "import_batch" duy nhất được tạo cho Cascadeur và thời gian
+# của từng bước được ghi vào file summary JSON.
+#
+# Manifest có thể là file .txt (mỗi dòng một file .blend) hoặc file .json:
+#   ["a.blend", {"blend": "b.blend", "armature": "Rig", "action": "Walk"}]
+import os
+import sys
+import json
+import time
+import argparse
+import importlib.util
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import bpy
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT_PATH = os.path.abspath(__file__)
+
+def load_addon():
+    """Import add-on package (không đăng ký class) để dùng lại các module utils."""
+    init_path = os.path.join(ADDON_DIR, "__init__.py")
+    for module in list(sys.modules.values()):
+        if os.path.abspath(getattr(module, "__file__", None) or "") == init_path:
+            return module
+
+    name = os.path.basename(ADDON_DIR)
+    spec = importlib.util.spec_from_file_location(name, init_path, submodule_search_locations=[ADDON_DIR])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+def addon_module(name):
+    return importlib.import_module(f"{load_addon().__name__}.utils.{name}")
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="blender -b --python batch_export.py --",
+        description="Export the animation of many .blend files to Cascadeur")
+    parser.add_argument("source", nargs="?", help="Folder of .blend files or manifest (.json/.txt)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Number of background Blender processes")
+    parser.add_argument("--exchange-folder", default="", help="Exchange folder (defaults to the add-on setting)")
+    parser.add_argument("--summary", default="", help="Path of the JSON summary")
+    parser.add_argument("--mark", choices=("stored", "all"), default="stored",
+                        help="Use the frames marked in the file, or mark every keyframe")
+    parser.add_argument("--recursive", action="store_true", help="Search sub folders for .blend files")
+    parser.add_argument("--timeout", type=float, default=0, help="Timeout per file in seconds (0 = none)")
+    parser.add_argument("--no-trigger", action="store_true", help="Do not create the Cascadeur trigger")
+    parser.add_argument("--worker", default="", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+def read_entries(source, recursive=False):
+    """Return the list of {"blend", "armature", "action"} entries of a folder or manifest."""
+    if os.path.isdir(source):
+        blend_files = []
+        for root, dirs, files in os.walk(source):
+            blend_files.extend(os.path.join(root, f) for f in files if f.lower().endswith(".blend"))
+            if not recursive:
+                break
+        return [{"blend": os.path.abspath(path)} for path in sorted(blend_files)]
+
+    base = os.path.dirname(os.path.abspath(source))
+    if source.lower().endswith(".json"):
+        with open(source, 'r') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get("files", [])
+        entries = [item if isinstance(item, dict) else {"blend": item} for item in data]
+    else:
+        with open(source, 'r') as f:
+            entries = [{"blend": line.strip()} for line in f if line.strip() and not line.startswith("#")]
+
+    for entry in entries:
+        entry["blend"] = os.path.normpath(os.path.join(base, entry["blend"]))
+    return entries
+
+
+# ---------------------------------------------------------------------------
+# Worker: chạy trong tiến trình Blender đã mở file .blend
+# ---------------------------------------------------------------------------
+
+def pick_armature(scene, name=""):
+    """Armature được chỉ định, armature đã pick trong add-on, hoặc armature đầu tiên có animation."""
+    if name:
+        obj = bpy.data.objects.get(name)
+        return obj if obj and obj.type == 'ARMATURE' else None
+
+    picked = scene.get("btc_armature")
+    if isinstance(picked, bpy.types.Object) and picked.type == 'ARMATURE':
+        return picked
+
+    armatures = [obj for obj in scene.objects if obj.type == 'ARMATURE']
+    for obj in armatures:
+        if obj.animation_data and obj.animation_data.action:
+            return obj
+    return armatures[0] if armatures else None
+
+def stored_marked_frames(scene):
+    """Frame đã được đánh dấu trong btc_keyframes của file."""
+    return sorted(
+        int(item.get("frame", 0))
+        for item in scene.get("btc_keyframes", [])
+        if item.get("is_marked", False)
+    )
+
+def run_worker(job):
+    keyframe_utils = addon_module("keyframe_utils")
+    export_utils = addon_module("export_utils")
+
+    timings = {}
+    result = {"blend": bpy.data.filepath, "status": "failed", "timings": timings}
+    scene = bpy.context.scene
+
+    # Pick armature
+    start = time.perf_counter()
+    armature = pick_armature(scene, job.get("armature", ""))
+    if armature is None:
+        raise RuntimeError("No armature found")
+    if job.get("action"):
+        action = bpy.data.actions.get(job["action"])
+        if action is None:
+            raise RuntimeError(f"Action not found: {job['action']}")
+        if armature.animation_data is None:
+            armature.animation_data_create()
+        armature.animation_data.action = action
+    action = armature.animation_data.action if armature.animation_data else None
+    result["armature"] = armature.name
+    result["action"] = action.name if action else ""
+    timings["pick"] = time.perf_counter() - start
+
+    # Mark keyframes
+    start = time.perf_counter()
+    frames = stored_marked_frames(scene) if job.get("mark") == "stored" else []
+    bone_marks = keyframe_utils.get_bone_marks(scene) if job.get("mark") == "stored" else {}
+    if not frames and action is not None:
+        frames = keyframe_utils.action_key_frames(action).tolist()
+    if action is not None:
+        first, last = action.frame_range
+        scene.frame_start, scene.frame_end = int(first), int(last)
+    result["frames"] = len(frames)
+    timings["mark"] = time.perf_counter() - start
+
+    # Export FBX và JSON
+    start = time.perf_counter()
+    view_layer = bpy.context.view_layer
+    for obj in view_layer.objects:
+        obj.select_set(False)
+    for obj in export_utils.export_objects(armature):
+        obj.select_set(True)
+    view_layer.objects.active = armature
+
+    bpy.ops.export_scene.fbx(filepath=job["fbx_path"], **export_utils.fbx_export_settings())
+    with open(job["json_path"], 'w') as f:
+        json.dump(keyframe_utils.keyframes_metadata(frames, bone_marks), f, indent=2)
+
+    result["fbx_path"] = job["fbx_path"]
+    result["json_path"] = job["json_path"]
+    timings["export"] = time.perf_counter() - start
+    result["status"] = "ok"
+    return result
+
+def worker_main(job_path):
+    with open(job_path, 'r') as f:
+        job = json.load(f)
+
+    start = time.perf_counter()
+    try:
+        result = run_worker(job)
+    except Exception as e:
+        result = {"blend": bpy.data.filepath, "status": "failed", "error": str(e)}
+    result.setdefault("timings", {})["total"] = time.perf_counter() - start
+
+    with open(job["result_path"], 'w') as f:
+        json.dump(result, f, indent=2)
+    if result["status"] != "ok":
+        sys.exit(1)
+
+
+# ---------------------------------------------------------------------------
+# Điều phối: chia file cho các tiến trình Blender nền
+# ---------------------------------------------------------------------------
+
+def export_entry(index, entry, exchange_folder, work_folder, mark, timeout):
+    """Chạy một tiến trình Blender nền cho một file .blend."""
+    name = f"{index:04d}_{os.path.splitext(os.path.basename(entry['blend']))[0]}"
+    job = {
+        "armature": entry.get("armature", ""),
+        "action": entry.get("action", ""),
+        "mark": mark,
+        "fbx_path": os.path.join(exchange_folder, "fbx", f"batch_{name}.fbx"),
+        "json_path": os.path.join(exchange_folder, "json", f"batch_{name}.json"),
+        "result_path": os.path.join(work_folder, f"{name}_result.json"),
+    }
+    job_path = os.path.join(work_folder, f"{name}_job.json")
+    with open(job_path, 'w') as f:
+        json.dump(job, f, indent=2)
+
+    command = [
+        bpy.app.binary_path, "-b", "--factory-startup", entry["blend"],
+        "--python", SCRIPT_PATH, "--", "--worker", job_path,
+    ]
+    start = time.perf_counter()
+    try:
+        process = subprocess.run(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            timeout=timeout or None,
+        )
+        output = process.stdout
+    except subprocess.TimeoutExpired:
+        output = "Timed out"
+
+    if os.path.exists(job["result_path"]):
+        with open(job["result_path"], 'r') as f:
+            result = json.load(f)
+    else:
+        # Blender thoát trước khi worker ghi kết quả (file hỏng, timeout...)
+        result = {"status": "failed", "error": output.strip().splitlines()[-1] if output.strip() else "No result"}
+
+    result["blend"] = entry["blend"]
+    result["wall_seconds"] = time.perf_counter() - start
+    return result
+
+def run_batch(args):
+    file_utils = addon_module("file_utils")
+
+    exchange_folder = args.exchange_folder
+    if not exchange_folder:
+        preferences = addon_module("preferences")
+        exchange_folder = preferences.get_exchange_folder(bpy.context)
+    for subfolder in ("fbx", "json", "batch"):
+        file_utils.ensure_dir_exists(os.path.join(exchange_folder, subfolder))
+
+    entries = read_entries(args.source, args.recursive)
+    stamp = time.strftime("%Y%m%d%H%M%S")
+    work_folder = file_utils.ensure_dir_exists(os.path.join(exchange_folder, "batch", stamp))
+    workers = max(1, min(args.workers, len(entries) or 1))
+    print(f"Exporting {len(entries)} files with {workers} workers")
+
+    start = time.perf_counter()
+    results = [None] * len(entries)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(export_entry, index, entry, exchange_folder, work_folder, args.mark, args.timeout): index
+            for index, entry in enumerate(entries)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            index = futures[future]
+            results[index] = future.result()
+            print(f"[{done}/{len(entries)}] {results[index]['status']}: {entries[index]['blend']}", flush=True)
+    total_seconds = time.perf_counter() - start
+
+    succeeded = [result for result in results if result.get("status") == "ok"]
+    summary = {
+        "source": os.path.abspath(args.source),
+        "exchange_folder": exchange_folder,
+        "workers": workers,
+        "total_seconds": total_seconds,
+        "files_per_second": len(entries) / total_seconds if total_seconds else 0.0,
+        "succeeded": len(succeeded),
+        "failed": len(results) - len(succeeded),
+        "files": results,
+    }
+
+    # Một trigger cho cả batch
+    if succeeded and not args.no_trigger:
+        items = [{
+            "fbx_path": result["fbx_path"],
+            "json_path": result["json_path"],
+            "object_name": result.get("armature", ""),
+            "source": result["blend"],
+        } for result in succeeded]
+        summary["trigger_path"] = file_utils.create_trigger_file(exchange_folder, "import_batch", {"items": items})
+
+    summary_path = args.summary or os.path.join(work_folder, "summary.json")
+    with open(summary_path, 'w') as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"Exported {summary['succeeded']} / {len(entries)} files in {total_seconds:.1f}s, summary: {summary_path}")
+    return summary
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    args = parse_args(argv)
+
+    if args.worker:
+        worker_main(args.worker)
+        return
+
+    if not args.source:
+        print("Usage: blender -b --python batch_export.py -- <folder|manifest> [--workers N]")
+        sys.exit(2)
+
+    summary = run_batch(args)
+    if summary["failed"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# Script export FBX chạy trong một tiến trình Blender nền:
+#   blender -b --factory-startup --python bg_export_worker.py -- job.json
+#
+# Không import add-on, chỉ dùng bpy và file job JSON do export_utils ghi ra.
+# Tiến độ được in ra stdout dưới dạng "B2C_PROGRESS <0..1> <message>".
+import sys
+import json
+import bpy
+
+def report_progress(value, message=""):
+    print(f"B2C_PROGRESS {value:.3f} {message}", flush=True)
+
+def run(job):
+    report_progress(0.0, "Loading data")
+    
+    # Scene trống để tên object không bị trùng với object mặc định
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    
+    with bpy.data.libraries.load(job["blend_path"], link=False) as (data_from, data_to):
+        data_to.objects = list(data_from.objects)
+        data_to.actions = list(data_from.actions)
+    
+    scene = bpy.context.scene
+    view_layer = bpy.context.view_layer
+    for obj in data_to.objects:
+        if obj is not None:
+            scene.collection.objects.link(obj)
+    
+    scene.render.fps = job["fps"]
+    scene.render.fps_base = job["fps_base"]
+    
+    # FBX exporter dùng scale_length và hệ đơn vị của scene (apply_unit_scale)
+    units = job.get("unit_settings", {})
+    for name in ("system", "scale_length", "length_unit"):
+        if name in units:
+            setattr(scene.unit_settings, name, units[name])
+    
+    settings = dict(job["settings"])
+    settings["object_types"] = set(settings.get("object_types", []))
+    
+    exports = job["exports"]
+    for index, export in enumerate(exports):
+        report_progress(0.1 + 0.9 * index / len(exports), f"Exporting {export['active']}")
+        
+        for obj in view_layer.objects:
+            obj.select_set(obj.name in export["objects"])
+        
+        active = bpy.data.objects.get(export["active"])
+        if active is not None:
+            view_layer.objects.active = active
+            action = bpy.data.actions.get(export["action"]) if export["action"] else None
+            if action is not None:
+                if active.animation_data is None:
+                    active.animation_data_create()
+                active.animation_data.action = action
+        
+        # Khoảng frame để bake animation
+        scene.frame_start = export["frame_start"]
+        scene.frame_end = export["frame_end"]
+        
+        bpy.ops.export_scene.fbx(filepath=export["fbx_path"], **settings)
+    
+    report_progress(1.0, "Done")
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    if not argv:
+        print("Usage: blender -b --factory-startup --python bg_export_worker.py -- job.json")
+        sys.exit(2)
+    
+    with open(argv[0], 'r') as f:
+        job = json.load(f)
+    
+    try:
+        run(job)
+    except Exception as e:
+        print(f"B2C_ERROR {e}", flush=True)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
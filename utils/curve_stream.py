@@ -0,0 +1,56 @@
+# Đọc key của nhiều fcurve theo từng nhóm với buffer dùng lại: bộ nhớ không
+# phụ thuộc vào tổng số key của action. Dùng chung cho tìm keyframe, clean
+# và decimate.
+import numpy as np
+
+# Số key tối đa trong buffer (float32 x 2 = 8 MB)
+CHUNK_KEYS = 1 << 20
+
+
+class CurveStream:
+    """
+    Read the keys of many fcurves in chunks of consecutive fcurves.
+
+    All chunks are read into the same preallocated buffer. A chunk holds at
+    most `chunk_keys` keys, except when a single fcurve has more keys: that
+    fcurve is read alone (keyframe_points can only be read whole).
+    """
+
+    def __init__(self, fcurves, chunk_keys=CHUNK_KEYS):
+        self.fcurves = list(fcurves)
+        self.counts = np.fromiter((len(fcurve.keyframe_points) for fcurve in self.fcurves),
+                                  dtype=np.int64, count=len(self.fcurves))
+        self.chunk_keys = int(max(chunk_keys, self.counts.max(initial=0)))
+        self._co = np.empty(self.chunk_keys * 2, dtype=np.float32)
+
+    @property
+    def total_keys(self):
+        return int(self.counts.sum())
+
+    def chunks(self):
+        """
+        Yield (first, last, co, bounds) for each chunk.
+
+        Args (yielded):
+            first, last: The chunk holds self.fcurves[first:last]
+            co: (keys, 2) [frame, value] view into the reused buffer, only
+                valid until the next chunk is read
+            bounds: (last - first + 1,) offsets of each fcurve in `co`
+        """
+        total_curves = len(self.fcurves)
+        first = 0
+        while first < total_curves:
+            last = first
+            size = 0
+            while last < total_curves and (last == first or size + self.counts[last] <= self.chunk_keys):
+                size += int(self.counts[last])
+                last += 1
+
+            bounds = np.zeros(last - first + 1, dtype=np.int64)
+            np.cumsum(self.counts[first:last], out=bounds[1:])
+            co = self._co[:size * 2]
+            for i, fcurve in enumerate(self.fcurves[first:last]):
+                if bounds[i + 1] > bounds[i]:
+                    fcurve.keyframe_points.foreach_get("co", co[bounds[i] * 2:bounds[i + 1] * 2])
+            yield first, last, co.reshape(-1, 2), bounds
+            first = last
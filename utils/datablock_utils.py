@@ -0,0 +1,329 @@
+import hashlib
+import bpy
+import numpy as np
+
+# Custom property caching the geometry hash on a mesh datablock
+GEOMETRY_HASH_PROP = "btc_geometry_hash"
+
+# Custom property storing the hash of the rig and meshes last sent to Cascadeur
+PAYLOAD_HASH_PROP = "btc_payload_hash"
+
+# Custom properties tracking which round-trip created a datablock
+SOURCE_PROP = "btc_source"
+GENERATION_PROP = "btc_generation"
+GENERATION_COUNTER_PROP = "btc_generations"
+
+# Cache geometry hash theo tên mesh: (signature, hash)
+_geometry_hash_cache = {}
+
+# ID collections that an FBX import can add to the file
+IMPORTED_ID_COLLECTIONS = (
+    "objects", "meshes", "materials", "armatures", "actions",
+    "images", "textures", "cameras", "lights", "collections",
+)
+
+def snapshot_ids():
+    """Snapshot the ID collections an import can add to."""
+    return {attr: set(getattr(bpy.data, attr)) for attr in IMPORTED_ID_COLLECTIONS}
+
+def new_ids_since(snapshot):
+    """IDs added to the file since snapshot_ids() was taken."""
+    new_ids = []
+    for attr, before in snapshot.items():
+        new_ids.extend(id_data for id_data in getattr(bpy.data, attr) if id_data not in before)
+    return new_ids
+
+def mesh_geometry_hash(mesh, group_names=()):
+    """
+    Hash the geometry of a mesh: vertices, polygons, shape keys, UV layers,
+    material slots and indices, and vertex-group weights.
+    
+    All arrays but the weights are read with foreach_get, so the cost is a
+    few memory copies even for dense meshes. Weights have no flat array in
+    the API and are read vertex by vertex. The vertex-group names belong to
+    the object, pass them in `group_names` so that the indices of the
+    weights are hashed with the groups they point to.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    
+    counts = np.array([len(mesh.vertices), len(mesh.polygons), len(mesh.loops)], dtype=np.int64)
+    digest.update(counts.tobytes())
+    
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    digest.update(co.tobytes())
+    
+    loop_total = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", loop_total)
+    digest.update(loop_total.tobytes())
+    
+    vertex_index = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", vertex_index)
+    digest.update(vertex_index.tobytes())
+    
+    if mesh.shape_keys:
+        for key_block in mesh.shape_keys.key_blocks:
+            digest.update(key_block.name.encode("utf-8"))
+            key_block.data.foreach_get("co", co)
+            digest.update(co.tobytes())
+    
+    uv = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+    for uv_layer in mesh.uv_layers:
+        digest.update(f"uv={uv_layer.name};".encode("utf-8"))
+        uv_layer.data.foreach_get("uv", uv)
+        digest.update(uv.tobytes())
+    
+    for material in mesh.materials:
+        digest.update(f"material={material.name if material else ''};".encode("utf-8"))
+    material_index = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("material_index", material_index)
+    digest.update(material_index.tobytes())
+    
+    for name in group_names:
+        digest.update(f"group={name};".encode("utf-8"))
+    group_counts = np.fromiter((len(vertex.groups) for vertex in mesh.vertices),
+                               dtype=np.int32, count=len(mesh.vertices))
+    digest.update(group_counts.tobytes())
+    if group_counts.any():
+        groups = np.array([(element.group, element.weight) for vertex in mesh.vertices
+                           for element in vertex.groups], dtype=np.float64)
+        digest.update(groups.tobytes())
+    
+    return digest.hexdigest()
+
+def object_group_names(obj):
+    """Vertex-group names of an object, in index order (empty without object)."""
+    return [group.name for group in obj.vertex_groups] if obj is not None else []
+
+def get_mesh_hash(mesh, obj=None):
+    """
+    Geometry hash of a mesh, computed once and cached on the datablock.
+    `obj` is an object using the mesh, for its vertex-group names.
+    """
+    value = mesh.get(GEOMETRY_HASH_PROP)
+    if not value:
+        value = mesh_geometry_hash(mesh, object_group_names(obj))
+        mesh[GEOMETRY_HASH_PROP] = value
+    return value
+
+def geometry_signature(mesh):
+    """
+    Cheap change signature of a mesh: element counts and a digest of the
+    vertex coordinates, both read with foreach_get.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    counts = np.array([len(mesh.vertices), len(mesh.polygons), len(mesh.loops),
+                       len(mesh.shape_keys.key_blocks) if mesh.shape_keys else 0,
+                       len(mesh.uv_layers), len(mesh.materials)], dtype=np.int64)
+    digest.update(counts.tobytes())
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    digest.update(co.tobytes())
+    return digest.hexdigest()
+
+def cached_geometry_hash(mesh):
+    """
+    Geometry hash of a mesh, computed again only when its signature changed.
+    
+    Editing only the weights, UVs or shape keys of a mesh keeps the
+    signature, so the cached hash is kept until the vertices move or an
+    element count changes.
+    """
+    signature = geometry_signature(mesh)
+    cached = _geometry_hash_cache.get(mesh.name)
+    if cached is None or cached[0] != signature:
+        cached = (signature, mesh_geometry_hash(mesh))
+        _geometry_hash_cache[mesh.name] = cached
+    return cached[1]
+
+def clear_geometry_hash_cache():
+    _geometry_hash_cache.clear()
+
+def _hash_rna_settings(digest, struct):
+    """Hash the simple (non pointer) properties of an RNA struct, e.g. a modifier."""
+    for prop in struct.bl_rna.properties:
+        if prop.identifier == "rna_type":
+            continue
+        value = getattr(struct, prop.identifier, None)
+        if prop.type == 'POINTER':
+            value = getattr(value, "name", None)
+        elif prop.type == 'COLLECTION':
+            continue
+        elif getattr(prop, "is_array", False):
+            value = tuple(value)
+        digest.update(f"{prop.identifier}={value!r};".encode("utf-8"))
+
+def armature_rest_hash(digest, armature):
+    """Hash the bone hierarchy and rest pose of an armature object."""
+    bones = armature.data.bones
+    matrices = np.empty(len(bones) * 16, dtype=np.float32)
+    bones.foreach_get("matrix_local", matrices)
+    for bone in bones:
+        digest.update(f"{bone.name}<{bone.parent.name if bone.parent else ''};".encode("utf-8"))
+    digest.update(matrices.tobytes())
+
+def payload_hash(objects):
+    """
+    Hash everything of an export that is not animation: the rig rest pose,
+    the mesh geometry, modifiers, materials and parenting.
+    
+    The geometry hash is not taken from the cache of get_mesh_hash, which is
+    never refreshed, but from cached_geometry_hash: the full hash, with its
+    per-vertex weight loop, only runs again when the mesh signature changed.
+    
+    Args:
+        objects: Exported objects (armature and meshes)
+    
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for obj in sorted(objects, key=lambda obj: obj.name):
+        digest.update(f"{obj.name}:{obj.type}:{obj.parent.name if obj.parent else ''};".encode("utf-8"))
+        if obj.type == 'ARMATURE':
+            armature_rest_hash(digest, obj)
+        elif obj.type == 'MESH':
+            digest.update(np.array(obj.matrix_parent_inverse, dtype=np.float32).tobytes())
+            digest.update(np.array(obj.matrix_basis, dtype=np.float32).tobytes())
+            digest.update(cached_geometry_hash(obj.data).encode("ascii"))
+            for slot in obj.material_slots:
+                digest.update(f"material={slot.material.name if slot.material else ''};".encode("utf-8"))
+            for group in obj.vertex_groups:
+                digest.update(f"group={group.name};".encode("utf-8"))
+            for modifier in obj.modifiers:
+                _hash_rna_settings(digest, modifier)
+    return digest.hexdigest()
+
+def deduplicate_meshes(objects):
+    """
+    Relink mesh objects whose geometry matches an existing mesh to that mesh.
+    
+    Meshes already in the file are matched through their cached hash, so
+    only the geometry of the new objects is read. Duplicate meshes left
+    without users are removed in one batch.
+    
+    Args:
+        objects: Newly imported objects
+    
+    Returns:
+        Number of objects relinked to a shared mesh
+    """
+    new_meshes = {obj.data for obj in objects if obj.type == 'MESH' and obj.data}
+    
+    # Các mesh có sẵn trong file (đã có hash từ lần import trước)
+    shared = {}
+    for mesh in bpy.data.meshes:
+        if mesh not in new_meshes and mesh.get(GEOMETRY_HASH_PROP):
+            shared.setdefault(mesh[GEOMETRY_HASH_PROP], mesh)
+    
+    relinked = 0
+    duplicates = set()
+    verified = set(new_meshes)
+    for obj in objects:
+        if obj.type != 'MESH' or not obj.data:
+            continue
+        mesh = obj.data
+        key = get_mesh_hash(mesh, obj)
+        target = shared.setdefault(key, mesh)
+        
+        # Hash cache của mesh cũ có thể đã lỗi thời nếu mesh bị chỉnh sửa
+        if target not in verified:
+            verified.add(target)
+            owner = next((user for user in bpy.data.objects if user.data == target), None)
+            current = mesh_geometry_hash(target, object_group_names(owner))
+            if current != key:
+                target[GEOMETRY_HASH_PROP] = current
+                shared[key] = target = mesh
+        
+        if target is not mesh:
+            obj.data = target
+            duplicates.add(mesh)
+            relinked += 1
+    
+    orphans = [mesh for mesh in duplicates if mesh.users == 0]
+    if orphans:
+        bpy.data.batch_remove(orphans)
+    return relinked
+
+def tag_generation(scene, ids, source):
+    """
+    Tag datablocks created by one import with their source and a new generation number.
+    
+    Args:
+        scene: Scene holding the generation counters
+        ids: Datablocks created by the import
+        source: Source key (Cascadeur scene name, armature...)
+    
+    Returns:
+        The generation number
+    """
+    counters = scene.get(GENERATION_COUNTER_PROP)
+    if counters is None:
+        scene[GENERATION_COUNTER_PROP] = {}
+        counters = scene[GENERATION_COUNTER_PROP]
+    generation = int(counters.get(source, 0)) + 1
+    counters[source] = generation
+    
+    for id_data in ids:
+        id_data[SOURCE_PROP] = source
+        id_data[GENERATION_PROP] = generation
+    return generation
+
+def present_sources():
+    """Sources (see tag_generation) that still have at least one object in the file."""
+    return {obj.get(SOURCE_PROP) for obj in bpy.data.objects if obj.get(SOURCE_PROP) is not None}
+
+def purge_old_generations(scene, keep, source=None):
+    """
+    Remove datablocks of imports older than the last `keep` generations.
+    
+    Objects of old generations are always removed. Other data (meshes,
+    materials, actions...) is only removed when every user is removed too,
+    so data shared with newer imports or the user's own objects survives.
+    Everything is removed with a single bpy.data.batch_remove call.
+    
+    Args:
+        scene: Scene holding the generation counters
+        keep: Number of generations to keep per source (0 keeps everything)
+        source: Only purge this source (all sources if None)
+    
+    Returns:
+        Number of datablocks removed
+    """
+    counters = scene.get(GENERATION_COUNTER_PROP)
+    if keep <= 0 or not counters:
+        return 0
+    
+    candidates = set()
+    for attr in IMPORTED_ID_COLLECTIONS:
+        for id_data in getattr(bpy.data, attr):
+            id_source = id_data.get(SOURCE_PROP)
+            if id_source is None or (source is not None and id_source != source):
+                continue
+            if id_data.use_fake_user or id_source not in counters:
+                continue
+            if id_data.get(GENERATION_PROP, 0) <= counters[id_source] - keep:
+                candidates.add(id_data)
+    
+    if not candidates:
+        return 0
+    
+    # Giữ lại dữ liệu còn được dùng bởi datablock không bị xóa
+    user_map = bpy.data.user_map(subset=candidates)
+    changed = True
+    while changed:
+        changed = False
+        for id_data in list(candidates):
+            if isinstance(id_data, bpy.types.Object):
+                continue
+            if isinstance(id_data, bpy.types.Collection):
+                # Collection chỉ bị xóa khi mọi object bên trong cũng bị xóa
+                users = list(id_data.all_objects) + list(id_data.children)
+            else:
+                users = user_map.get(id_data, ())
+            if any(user not in candidates for user in users):
+                candidates.discard(id_data)
+                changed = True
+    
+    bpy.data.batch_remove(candidates)
+    return len(candidates)
@@ -0,0 +1,360 @@
+import bpy
+import os
+import sys
+import json
+import shutil
+import tempfile
+import threading
+import time
+import subprocess
+import numpy as np
+
+from . import file_utils, keyframe_utils, anim_utils, datablock_utils
+
+# Cài đặt export FBX dùng chung cho export thường và export nền
+FBX_EXPORT_SETTINGS = {
+    "use_selection": True,
+    "object_types": {'ARMATURE', 'MESH'},
+    "use_mesh_modifiers": True,
+    "use_mesh_modifiers_render": True,
+    "add_leaf_bones": False,
+}
+
+# Export proxy: mỗi PROXY_FRAME_STEP frame, chỉ các bone cách bone gốc tối đa PROXY_BONE_DEPTH cấp
+PROXY_FRAME_STEP = 4
+PROXY_BONE_DEPTH = 3
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bg_export_worker.py")
+
+def fbx_export_settings(**overrides):
+    """Return a copy of the FBX export settings with overrides applied."""
+    settings = dict(FBX_EXPORT_SETTINGS)
+    settings["object_types"] = set(settings["object_types"])
+    settings.update(overrides)
+    return settings
+
+def export_objects(armature):
+    """Objects exported together with an armature (the armature and its meshes)."""
+    objects = [armature]
+    objects.extend(child for child in armature.children if child.type == 'MESH')
+    return objects
+
+def skeleton_only_settings(settings):
+    """FBX settings for an export that only contains the armature and its animation."""
+    settings = dict(settings)
+    settings["object_types"] = {'ARMATURE'}
+    settings["use_mesh_modifiers"] = False
+    settings["use_mesh_modifiers_render"] = False
+    return settings
+
+def payload_unchanged(armature, payload):
+    """True if the rig and meshes were already sent to Cascadeur with this hash."""
+    return armature.get(datablock_utils.PAYLOAD_HASH_PROP) == payload
+
+def remember_payload(object_name, payload):
+    """Store the hash of the rig and meshes sent to Cascadeur on the armature."""
+    armature = bpy.data.objects.get(object_name)
+    if armature is not None and payload:
+        armature[datablock_utils.PAYLOAD_HASH_PROP] = payload
+
+def forget_payload(object_name):
+    """Make the next export of the armature send the meshes again."""
+    armature = bpy.data.objects.get(object_name)
+    if armature is not None and datablock_utils.PAYLOAD_HASH_PROP in armature:
+        del armature[datablock_utils.PAYLOAD_HASH_PROP]
+        return True
+    return False
+
+def frame_subset(scene, armature, mode):
+    """
+    Prepare an export limited to the marked keyframes.
+    
+    Args:
+        scene: Scene with the btc_keyframes list
+        armature: Exported armature
+        mode: 'ALL' (whole timeline) or 'RANGE' (first to last marked frame)
+    
+    Returns:
+        (frame_range, settings). `frame_range` is None when the scene range
+        is used.
+    """
+    frames, marks = keyframe_utils.get_keyframe_arrays(scene.btc_keyframes)
+    frames = np.unique(frames[marks])
+    action = armature.animation_data.action if armature.animation_data else None
+    if mode == 'ALL' or not frames.size or action is None:
+        return None, fbx_export_settings()
+    
+    # Chỉ bake action đang gán, không bake mọi action và NLA strip
+    settings = fbx_export_settings(bake_anim_use_all_actions=False, bake_anim_use_nla_strips=False)
+    return (int(frames[0]), int(frames[-1])), settings
+
+def key_bones(armature, depth=PROXY_BONE_DEPTH):
+    """Names of the bones at most `depth` levels below a root bone (root, spine, limbs)."""
+    names = set()
+    for bone in armature.data.bones:
+        if len(bone.parent_recursive) <= depth:
+            names.add(bone.name)
+    return names
+
+def proxy_subset(armature, action, frame_range, settings, step=PROXY_FRAME_STEP):
+    """
+    Prepare the preview export of a progressive transfer.
+    
+    Only every `step`-th frame of the key bones is kept, the other bones
+    stay in their current pose. Simplification is turned off so that the
+    exporter writes exactly the sampled frames, plus the last frame.
+    
+    Returns:
+        (action, frame_range, settings). `action` is a temporary sampled action
+        that the caller removes after exporting.
+    """
+    first, last = frame_range or (int(action.frame_range[0]), int(action.frame_range[1]))
+    frames = np.arange(first, last + 1, step)
+    if frames[-1] != last:
+        frames = np.append(frames, last)
+    proxy = anim_utils.sample_action(action, frames, f"{action.name}_proxy", key_bones(armature))
+    
+    settings = dict(settings, bake_anim_use_all_actions=False, bake_anim_use_nla_strips=False)
+    settings["bake_anim_step"] = float(step)
+    settings["bake_anim_simplify_factor"] = 0.0
+    settings["bake_anim_force_startend_keying"] = True
+    return proxy, (int(first), int(last)), settings
+
+def new_generation():
+    """Id of a progressive transfer, increasing across sessions (milliseconds)."""
+    return time.time_ns() // 1000000
+
+def write_export_library(filepath, objects, actions=()):
+    """
+    Write objects and everything they use (meshes, materials, actions...) to a .blend file.
+    
+    Extra actions that are not assigned yet can be passed in `actions`.
+    The open file and the user's selection are not modified.
+    """
+    bpy.data.libraries.write(filepath, set(objects) | set(actions), fake_user=True)
+    return filepath
+
+def export_item(objects, active, action=None, frame_range=None, data=None):
+    """
+    Describe one FBX export of a background job.
+    
+    Args:
+        objects: Objects to export
+        active: Active object (armature)
+        action: Action assigned to the active object before exporting, or None
+        frame_range: (start, end) baked frame range, defaults to the scene range
+        data: Trigger data of this export (the FBX path is added when done)
+    """
+    return {
+        "objects": list(objects),
+        "active": active,
+        "action": action,
+        "frame_range": frame_range,
+        "data": dict(data or {}),
+    }
+
+
+class BackgroundExportJob:
+    """
+    Export FBX trong một tiến trình Blender nền để không khóa UI.
+    
+    Tất cả các export của job dùng chung một file .blend tạm và một tiến trình,
+    trigger chỉ được tạo khi mọi file FBX đã xong.
+    """
+    
+    def __init__(self, exports, exchange_folder, trigger_action, trigger_data=None,
+                 settings=None, open_cascadeur=False):
+        self.exports = exports
+        if len(exports) > 1:
+            self.name = f"{len(exports)} exports"
+        else:
+            self.name = exports[0]["active"].name if exports and exports[0]["active"] else ""
+        self.exchange_folder = exchange_folder
+        self.trigger_action = trigger_action
+        self.trigger_data = dict(trigger_data or {})
+        self.settings = settings or fbx_export_settings()
+        self.open_cascadeur = open_cascadeur
+        self.progress = 0.0
+        self.message = "Starting"
+        self.error = ""
+        self.cancelled = False
+        self.fbx_paths = []
+        self._process = None
+        self._reader = None
+        self._temp_dir = ""
+        self._temp_fbx_paths = []
+    
+    def start(self, context):
+        """Ghi dữ liệu ra file tạm và chạy tiến trình export nền."""
+        scene = context.scene
+        self._temp_dir = tempfile.mkdtemp(prefix="b2c_export_")
+        
+        objects, actions = set(), set()
+        for item in self.exports:
+            objects.update(item["objects"])
+            if item["action"] is not None:
+                actions.add(item["action"])
+        blend_path = write_export_library(os.path.join(self._temp_dir, "export.blend"), objects, actions)
+        
+        export_name = os.path.splitext(os.path.basename(file_utils.get_export_path(file_type="fbx")))[0]
+        jobs = []
+        for index, item in enumerate(self.exports):
+            suffix = f"_{index:03d}" if len(self.exports) > 1 else ""
+            temp_fbx = os.path.join(self._temp_dir, f"{export_name}{suffix}.fbx")
+            self._temp_fbx_paths.append(temp_fbx)
+            frame_start, frame_end = item["frame_range"] or (scene.frame_start, scene.frame_end)
+            jobs.append({
+                "fbx_path": temp_fbx,
+                "objects": [obj.name for obj in item["objects"]],
+                "active": item["active"].name if item["active"] else "",
+                "action": item["action"].name if item["action"] else "",
+                "frame_start": int(frame_start),
+                "frame_end": int(frame_end),
+            })
+        
+        settings = dict(self.settings)
+        settings["object_types"] = sorted(settings.get("object_types", []))
+        job = {
+            "blend_path": blend_path,
+            "fps": scene.render.fps,
+            "fps_base": scene.render.fps_base,
+            # Scene của tiến trình nền là scene mặc định, đơn vị phải giống scene gốc
+            "unit_settings": {
+                "system": scene.unit_settings.system,
+                "scale_length": scene.unit_settings.scale_length,
+                "length_unit": scene.unit_settings.length_unit,
+            },
+            "settings": settings,
+            "exports": jobs,
+        }
+        job_path = os.path.join(self._temp_dir, "job.json")
+        with open(job_path, 'w') as f:
+            json.dump(job, f, indent=2)
+        
+        command = [
+            bpy.app.binary_path, "-b", "--factory-startup",
+            "--python", WORKER_SCRIPT, "--", job_path,
+        ]
+        self._process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0) if sys.platform == "win32" else 0,
+        )
+        
+        # Đọc stdout trong thread riêng, timer chỉ đọc các thuộc tính đã cập nhật
+        self._reader = threading.Thread(target=self._read_output, daemon=True)
+        self._reader.start()
+        
+        _export_jobs.append(self)
+        bpy.app.timers.register(self.step, first_interval=0.2)
+    
+    def cancel(self):
+        self.cancelled = True
+        if self._process and self._process.poll() is None:
+            self._process.terminate()
+    
+    def _read_output(self):
+        for line in self._process.stdout:
+            line = line.strip()
+            if line.startswith("B2C_PROGRESS "):
+                parts = line.split(" ", 2)
+                try:
+                    self.progress = float(parts[1])
+                except ValueError:
+                    continue
+                self.message = parts[2] if len(parts) > 2 else ""
+            elif line.startswith("B2C_ERROR "):
+                self.error = line[len("B2C_ERROR "):]
+    
+    def step(self):
+        """Timer callback: chờ tiến trình nền kết thúc."""
+        _redraw_sidebar()
+        if self._process.poll() is None:
+            return 0.2
+        
+        self._reader.join(timeout=1.0)
+        try:
+            self._finish()
+        finally:
+            if self in _export_jobs:
+                _export_jobs.remove(self)
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
+            _redraw_sidebar()
+        return None
+    
+    def _trigger_payload(self):
+        if self.trigger_action == "import_batch":
+            items = [dict(item["data"], fbx_path=fbx_path) for item, fbx_path in zip(self.exports, self.fbx_paths)]
+            return dict(self.trigger_data, items=items)
+        return {**self.trigger_data, **self.exports[0]["data"], "fbx_path": self.fbx_paths[0]}
+    
+    def _finish(self):
+        if self.cancelled:
+            print(f"Background export of {self.name} cancelled")
+            return
+        
+        missing = [path for path in self._temp_fbx_paths if not os.path.exists(path)]
+        if self._process.returncode != 0 or missing:
+            message = self.error or f"Blender exited with code {self._process.returncode}"
+            _show_message(f"Background export failed: {message}", 'ERROR')
+            return
+        
+        # Sao chép file sang thư mục trao đổi rồi mới tạo trigger
+        for temp_fbx in self._temp_fbx_paths:
+            fbx_path = file_utils.copy_file_to_exchange(temp_fbx, self.exchange_folder, "fbx")
+            if not fbx_path:
+                _show_message("Failed to copy FBX to exchange folder", 'ERROR')
+                return
+            self.fbx_paths.append(fbx_path)
+        
+        trigger_data = {
+            "action": self.trigger_action,
+            "data": self._trigger_payload(),
+        }
+        if not file_utils.create_trigger_file(self.exchange_folder, self.trigger_action, trigger_data):
+            _show_message("Failed to create trigger file", 'ERROR')
+            return
+        
+        # Cascadeur đã nhận mesh của các export đầy đủ
+        for item in self.exports:
+            if not item["data"].get("skeleton_only", False):
+                remember_payload(item["data"].get("object_name", ""), item["data"].get("payload_hash", ""))
+        
+        print(f"Exported {self.name} to {', '.join(self.fbx_paths)}")
+        if self.open_cascadeur:
+            try:
+                bpy.ops.btc.open_cascadeur()
+            except Exception as e:
+                print(f"Could not open Cascadeur: {e}")
+
+
+_export_jobs = []
+
+def get_export_jobs():
+    """Background export jobs that are still running."""
+    return list(_export_jobs)
+
+def _show_message(message, icon='INFO'):
+    print(message)
+    
+    def show():
+        bpy.context.window_manager.popup_menu(
+            lambda self, context: self.layout.label(text=message),
+            title="Background Export",
+            icon=icon
+        )
+        return None
+    
+    bpy.app.timers.register(show, first_interval=0.1)
+
+def _redraw_sidebar():
+    """Vẽ lại N-panel để cập nhật tiến độ."""
+    try:
+        for window in bpy.context.window_manager.windows:
+            for area in window.screen.areas:
+                if area.type == 'VIEW_3D':
+                    area.tag_redraw()
+    except Exception:
+        pass
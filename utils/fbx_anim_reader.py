@@ -0,0 +1,308 @@
+# Lightweight reader for the animation of binary FBX files.
+#
+# Only the records needed to rebuild bone curves are decoded: GlobalSettings,
+# AnimationStack/Layer/CurveNode/Curve, Model (names and rest transforms) and
+# Connections. Everything else (geometry, materials...) is skipped by offset
+# without being decompressed.
+import mmap
+import struct
+import zlib
+import numpy as np
+
+FBX_BINARY_MAGIC = b"Kaydara FBX Binary  \x00"
+FBX_TICKS_PER_SECOND = 46186158000
+
+# Lcl property -> channel key
+CHANNEL_PROPERTIES = {
+    "Lcl Translation": "T",
+    "Lcl Rotation": "R",
+    "Lcl Scaling": "S",
+}
+AXIS_PROPERTIES = {"d|X": 0, "d|Y": 1, "d|Z": 2}
+
+# GlobalSettings TimeMode -> frames per second
+TIME_MODE_FPS = {
+    1: 120.0, 2: 100.0, 3: 60.0, 4: 50.0, 5: 48.0, 6: 30.0, 7: 30.0,
+    8: 29.97, 9: 29.97, 10: 25.0, 11: 24.0, 12: 1000.0, 13: 23.976,
+    15: 96.0, 16: 72.0, 17: 59.94, 18: 119.88,
+}
+
+ARRAY_TYPES = {
+    ord("f"): np.float32, ord("d"): np.float64,
+    ord("i"): np.int32, ord("l"): np.int64, ord("b"): np.bool_,
+}
+SCALAR_FORMATS = {
+    ord("Y"): "<h", ord("C"): "<?", ord("I"): "<i",
+    ord("F"): "<f", ord("D"): "<d", ord("L"): "<q",
+}
+
+OBJECT_TYPES = {b"AnimationStack", b"AnimationLayer", b"AnimationCurveNode", b"AnimationCurve", b"Model"}
+
+
+class FBXAnimation:
+    """Animation curves of an FBX file, grouped by model (bone) name."""
+
+    def __init__(self):
+        self.stack_name = ""
+        self.fps = None
+        self.unit_scale = 1.0
+        # name -> {"T"/"R"/"S": [axis curve or default value] * 3}
+        self.channels = {}
+        # name -> {"T", "R", "S", "PreRotation", "PostRotation", "RotationOrder"}
+        self.models = {}
+
+    def bone_names(self):
+        return list(self.channels.keys())
+
+    def frame_range(self, fps):
+        """Return (first, last) frame of all curves at the given fps."""
+        start, end = None, None
+        for axes in self.channels.values():
+            for curves in axes.values():
+                for curve in curves:
+                    if isinstance(curve, tuple) and len(curve[0]):
+                        first, last = curve[0][0] * fps, curve[0][-1] * fps
+                        start = first if start is None else min(start, first)
+                        end = last if end is None else max(end, last)
+        return start, end
+
+
+class _Reader:
+    """Decode node records from a binary FBX buffer."""
+
+    def __init__(self, buf):
+        self.buf = buf
+        if bytes(buf[:21]) != FBX_BINARY_MAGIC:
+            raise ValueError("Not a binary FBX file")
+        self.version = struct.unpack_from("<I", buf, 23)[0]
+        self.wide = self.version >= 7500
+        self.header_format = "<QQQB" if self.wide else "<IIIB"
+        self.header_size = struct.calcsize(self.header_format)
+
+    def node(self, offset):
+        """
+        Read a node header.
+
+        Returns:
+            (end offset, property count, name, properties offset, properties length),
+            or None for a null record
+        """
+        end, prop_count, prop_len, name_len = struct.unpack_from(self.header_format, self.buf, offset)
+        if end == 0:
+            return None
+        name_start = offset + self.header_size
+        name = bytes(self.buf[name_start:name_start + name_len])
+        return end, prop_count, name, name_start + name_len, prop_len
+
+    def children(self, offset, end):
+        """Yield (offset, header) for each child node between offset and end."""
+        while offset < end:
+            header = self.node(offset)
+            if header is None:
+                return
+            yield offset, header
+            offset = header[0]
+
+    def first_child_offset(self, header):
+        _, _, _, props_start, prop_len = header
+        return props_start + prop_len
+
+    def properties(self, header):
+        """Decode all properties of a node."""
+        _, prop_count, _, offset, _ = header
+        buf = self.buf
+        values = []
+        for _ in range(prop_count):
+            code = buf[offset]
+            offset += 1
+            if code in SCALAR_FORMATS:
+                fmt = SCALAR_FORMATS[code]
+                values.append(struct.unpack_from(fmt, buf, offset)[0])
+                offset += struct.calcsize(fmt)
+            elif code in ARRAY_TYPES:
+                length, encoding, byte_len = struct.unpack_from("<III", buf, offset)
+                offset += 12
+                data = bytes(buf[offset:offset + byte_len])
+                offset += byte_len
+                if encoding == 1:
+                    data = zlib.decompress(data)
+                values.append(np.frombuffer(data, dtype=ARRAY_TYPES[code], count=length))
+            elif code in (ord("S"), ord("R")):
+                length = struct.unpack_from("<I", buf, offset)[0]
+                offset += 4
+                data = bytes(buf[offset:offset + length])
+                offset += length
+                values.append(data if code == ord("R") else data.decode("utf-8", "replace"))
+            else:
+                raise ValueError(f"Unknown FBX property type {chr(code)!r}")
+        return values
+
+    def properties70(self, header):
+        """Decode a Properties70 child into {name: values}."""
+        result = {}
+        for _, child in self.children(self.first_child_offset(header), header[0]):
+            if child[2] != b"Properties70":
+                continue
+            for _, prop in self.children(self.first_child_offset(child), child[0]):
+                if prop[2] != b"P":
+                    continue
+                values = self.properties(prop)
+                if values:
+                    result[values[0]] = values[4:]
+        return result
+
+    def find_top_level(self, names):
+        """Return {name: (offset, header)} for the requested top-level nodes."""
+        found = {}
+        offset = 27
+        while offset < len(self.buf):
+            header = self.node(offset)
+            if header is None:
+                break
+            if header[2] in names:
+                found[header[2]] = (offset, header)
+            offset = header[0]
+        return found
+
+
+def _object_name(value):
+    """'Name\\x00\\x01Class' -> 'Name'."""
+    if isinstance(value, bytes):
+        value = value.decode("utf-8", "replace")
+    return value.split("\x00\x01")[0].split("::")[-1]
+
+
+def is_binary_fbx(filepath):
+    """True if the file starts with the binary FBX magic."""
+    with open(filepath, "rb") as f:
+        return f.read(len(FBX_BINARY_MAGIC)) == FBX_BINARY_MAGIC
+
+
+def read_fbx_animation(filepath, stack_name=None):
+    """
+    Read the bone animation of a binary FBX file.
+
+    Args:
+        filepath: FBX file path
+        stack_name: Animation stack (take) to read, defaults to the first one
+
+    Returns:
+        FBXAnimation object. Each axis of a channel is either a
+        (times in seconds float64 array, values float32 array) tuple or a
+        float default value when the axis is not animated.
+    """
+    with open(filepath, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            return _read_animation(_Reader(buf), stack_name)
+
+
+def _read_animation(reader, stack_name):
+    result = FBXAnimation()
+    top = reader.find_top_level({b"GlobalSettings", b"Objects", b"Connections"})
+
+    if b"GlobalSettings" in top:
+        _, header = top[b"GlobalSettings"]
+        settings = reader.properties70(header)
+        if settings.get("UnitScaleFactor"):
+            result.unit_scale = float(settings["UnitScaleFactor"][0])
+        time_mode = int(settings.get("TimeMode", [0])[0])
+        if time_mode == 14 and settings.get("CustomFrameRate"):
+            result.fps = float(settings["CustomFrameRate"][0])
+        else:
+            result.fps = TIME_MODE_FPS.get(time_mode)
+
+    if b"Objects" not in top or b"Connections" not in top:
+        return result
+
+    stacks, layers, curve_nodes, curves, models = {}, set(), {}, {}, {}
+
+    # Objects: chỉ đọc các record liên quan tới animation và tên bone
+    _, objects_header = top[b"Objects"]
+    for _, header in reader.children(reader.first_child_offset(objects_header), objects_header[0]):
+        kind = header[2]
+        if kind not in OBJECT_TYPES:
+            continue
+        props = reader.properties(header)
+        object_id = props[0]
+
+        if kind == b"AnimationStack":
+            stacks[object_id] = _object_name(props[1])
+        elif kind == b"AnimationLayer":
+            layers.add(object_id)
+        elif kind == b"AnimationCurveNode":
+            defaults = reader.properties70(header)
+            curve_nodes[object_id] = [
+                float(defaults[axis][0]) if axis in defaults else 0.0
+                for axis in ("d|X", "d|Y", "d|Z")
+            ]
+        elif kind == b"AnimationCurve":
+            times, values = None, None
+            for _, child in reader.children(reader.first_child_offset(header), header[0]):
+                if child[2] == b"KeyTime":
+                    times = reader.properties(child)[0]
+                elif child[2] == b"KeyValueFloat":
+                    values = reader.properties(child)[0]
+            if times is not None and values is not None:
+                curves[object_id] = (
+                    times.astype(np.float64) / FBX_TICKS_PER_SECOND,
+                    values.astype(np.float32),
+                )
+        elif kind == b"Model":
+            prop70 = reader.properties70(header)
+            models[object_id] = {
+                "name": _object_name(props[1]),
+                "T": tuple(prop70.get("Lcl Translation", (0.0, 0.0, 0.0))[:3]),
+                "R": tuple(prop70.get("Lcl Rotation", (0.0, 0.0, 0.0))[:3]),
+                "S": tuple(prop70.get("Lcl Scaling", (1.0, 1.0, 1.0))[:3]),
+                "PreRotation": tuple(prop70.get("PreRotation", (0.0, 0.0, 0.0))[:3]),
+                "PostRotation": tuple(prop70.get("PostRotation", (0.0, 0.0, 0.0))[:3]),
+                "RotationOrder": int(prop70.get("RotationOrder", [0])[0]),
+            }
+
+    # Connections: curve -> curve node -> model, curve node -> layer -> stack
+    layer_stack, node_layer, node_target, curve_target = {}, {}, {}, {}
+    _, connections_header = top[b"Connections"]
+    for _, header in reader.children(reader.first_child_offset(connections_header), connections_header[0]):
+        if header[2] != b"C":
+            continue
+        props = reader.properties(header)
+        kind, child, parent = props[0], props[1], props[2]
+        if kind == "OO":
+            if child in layers and parent in stacks:
+                layer_stack[child] = parent
+            elif child in curve_nodes and parent in layers:
+                node_layer[child] = parent
+        elif kind == "OP" and len(props) > 3:
+            prop = props[3]
+            if child in curve_nodes and parent in models and prop in CHANNEL_PROPERTIES:
+                node_target[child] = (parent, CHANNEL_PROPERTIES[prop])
+            elif child in curves and parent in curve_nodes and prop in AXIS_PROPERTIES:
+                curve_target[child] = (parent, AXIS_PROPERTIES[prop])
+
+    # Chọn animation stack
+    stack_id = None
+    for candidate_id, name in stacks.items():
+        if stack_name is None or name == stack_name:
+            stack_id = candidate_id
+            result.stack_name = name
+            break
+    stack_layers = {layer for layer, stack in layer_stack.items() if stack == stack_id}
+
+    for node_id, (model_id, channel) in node_target.items():
+        # Node không gắn với layer (file cũ) vẫn được chấp nhận
+        if node_id in node_layer and node_layer[node_id] not in stack_layers:
+            continue
+        name = models[model_id]["name"]
+        result.channels.setdefault(name, {})[channel] = list(curve_nodes[node_id])
+
+    for curve_id, (node_id, axis) in curve_target.items():
+        target = node_target.get(node_id)
+        if target is None:
+            continue
+        name = models[target[0]]["name"]
+        axes = result.channels.get(name, {}).get(target[1])
+        if axes is not None:
+            axes[axis] = curves[curve_id]
+
+    result.models = {model["name"]: model for model in models.values()}
+    return result
@@ -3,8 +3,12 @@ import time
 import tempfile
 import shutil
 import json
+import itertools
 from datetime import datetime, timedelta
 
+# Số thứ tự trigger trong process: nhiều trigger trong cùng một giây không trùng tên file
+_trigger_sequence = itertools.count(1)
+
 def ensure_dir_exists(directory):
     """Ensure directory exists, create if not."""
     if directory and not os.path.exists(directory):
@@ -18,20 +22,25 @@ def create_trigger_file(exchange_folder, action, data=None):
     ensure_dir_exists(cascadeur_trigger_folder)
     
     # Prepare data
+    sequence = next(_trigger_sequence)
     trigger_data = {
         "action": action,
         "timestamp": time.time(),
+        "sequence": sequence,
         "data": data or {}
     }
     
-    # Create filename with timestamp to avoid conflicts
+    # Create filename with timestamp, process id and sequence to avoid conflicts
     timestamp = int(time.time())
-    trigger_path = os.path.join(cascadeur_trigger_folder, f"trigger_{action}_{timestamp}.json")
+    trigger_path = os.path.join(
+        cascadeur_trigger_folder, f"trigger_{action}_{timestamp}_{os.getpid()}_{sequence:06d}.json")
     
-    # Write trigger file
+    # Ghi vào file tạm rồi đổi tên: bên nhận không bao giờ đọc file ghi dở
     try:
-        with open(trigger_path, 'w') as f:
+        temp_path = trigger_path + ".tmp"
+        with open(temp_path, 'w') as f:
             json.dump(trigger_data, f, indent=2)
+        os.replace(temp_path, trigger_path)
         return trigger_path
     except (IOError, PermissionError) as e:
         print(f"Error creating trigger file: {e}")
@@ -4,7 +4,12 @@ import time
 import threading
 import bpy
 from bpy.app.handlers import persistent
+from . import anim_utils
+from . import datablock_utils
+from . import export_utils
+from . import fbx_anim_reader
 from . import file_utils
+from . import keyframe_utils
 from . import preferences
 
 class FileWatcher:
@@ -188,6 +193,14 @@ def process_trigger(trigger_data):
         bpy.app.timers.register(lambda: process_import_all_scenes(data))
     elif action == "clean_keyframes":
         bpy.app.timers.register(lambda: process_clean_keyframes(data))
+    elif action == "reset_payload":
+        bpy.app.timers.register(lambda: process_reset_payload(data))
+
+def auto_purge_generations(scene):
+    """Số thế hệ giữ lại khi tự xóa sau import, 0 nếu chưa bật Purge On Import."""
+    if not getattr(scene, "btc_auto_purge_imports", False):
+        return 0
+    return getattr(scene, "btc_keep_generations", 0)
 
 def process_import_scene(data):
     """Xử lý import scene từ Cascadeur."""
@@ -196,15 +209,40 @@ def process_import_scene(data):
         print(f"FBX file not found: {fbx_path}")
         return None
     
+    scene = bpy.context.scene
+    mode = data.get("mode") or getattr(scene, "btc_import_mode", 'FULL')
+    armature = getattr(scene, "btc_armature", None)
+    keep_generations = auto_purge_generations(scene)
+    
     try:
-        # Import FBX
-        bpy.ops.import_scene.fbx(filepath=fbx_path)
-        print(f"Imported scene from {fbx_path}")
+        if mode in {'CURVES', 'ANIMATION'} and armature is not None:
+            if mode == 'CURVES' and fbx_anim_reader.is_binary_fbx(fbx_path):
+                # Đọc trực tiếp curve từ FBX nhị phân
+                action, curve_count = anim_utils.read_fbx_animation_curves(fbx_path, armature)
+            else:
+                # Chỉ áp dụng animation lên armature hiện có
+                action, curve_count = anim_utils.import_fbx_animation(fbx_path, armature)
+            message = f"Applied {curve_count} curves to {armature.name} ({action.name})"
+            
+            # Các action cũ của armature được tính theo thế hệ
+            source = f"{armature.name}:animation"
+            datablock_utils.tag_generation(scene, [action], source)
+            datablock_utils.purge_old_generations(scene, keep_generations, source)
+        else:
+            # Import FBX
+            snapshot = datablock_utils.snapshot_ids()
+            bpy.ops.import_scene.fbx(filepath=fbx_path)
+            message = "Imported scene from Cascadeur"
+            
+            source = data.get("scene") or "current_scene"
+            datablock_utils.tag_generation(scene, datablock_utils.new_ids_since(snapshot), source)
+            datablock_utils.purge_old_generations(scene, keep_generations, source)
+        print(f"{message}: {fbx_path}")
         
         # Hiển thị thông báo thành công
         def show_message():
             bpy.context.window_manager.popup_menu(
-                lambda self, context: self.layout.label(text=f"Imported scene from Cascadeur"),
+                lambda self, context: self.layout.label(text=message),
                 title="Import Successful", 
                 icon='INFO'
             )
@@ -227,47 +265,209 @@ def process_import_scene(data):
     
     return None  # Required for bpy.app.timers
 
+# Job import đang chạy (được N-panel đọc để hiển thị tiến độ)
+_import_job = None
+
+class ImportJob:
+    """Import nhiều file FBX, mỗi timer tick một file để không khóa UI."""
+    
+    def __init__(self, fbx_paths, per_collection=False, unchanged_count=0, share_meshes=True,
+                 sources=None, keep_generations=0):
+        self.fbx_paths = list(fbx_paths)
+        self.per_collection = per_collection
+        self.share_meshes = share_meshes
+        self.sources = dict(sources or {})
+        self.keep_generations = keep_generations
+        self.relinked_count = 0
+        self.purged_count = 0
+        self.unchanged_count = unchanged_count
+        self.done = 0
+        self.success_count = 0
+        self.error_count = 0
+        self.current_file = ""
+        self.cancelled = False
+        self._steps = self._run()
+    
+    @property
+    def total(self):
+        return len(self.fbx_paths)
+    
+    @property
+    def progress(self):
+        return self.done / self.total if self.total else 1.0
+    
+    def add_paths(self, fbx_paths, sources=None):
+        """Thêm file vào job đang chạy."""
+        self.fbx_paths.extend(fbx_paths)
+        self.sources.update(sources or {})
+    
+    def cancel(self):
+        self.cancelled = True
+    
+    def step(self):
+        """Timer callback: import file tiếp theo."""
+        try:
+            if self.cancelled:
+                raise StopIteration
+            next(self._steps)
+            _redraw_sidebar()
+            return 0.01
+        except StopIteration:
+            self._finish()
+            return None
+    
+    def _run(self):
+        # fbx_paths có thể được thêm trong khi job chạy
+        index = 0
+        while index < len(self.fbx_paths):
+            fbx_path = self.fbx_paths[index]
+            index += 1
+            self.current_file = os.path.basename(fbx_path)
+            
+            if not os.path.exists(fbx_path):
+                print(f"FBX file not found: {fbx_path}")
+                self.error_count += 1
+            else:
+                try:
+                    snapshot = datablock_utils.snapshot_ids()
+                    self._import_file(fbx_path)
+                    print(f"Imported scene from {fbx_path}")
+                    self.success_count += 1
+                    
+                    # Đánh dấu thế hệ import theo scene nguồn
+                    new_ids = datablock_utils.new_ids_since(snapshot)
+                    source = self.sources.get(fbx_path) or os.path.splitext(os.path.basename(fbx_path))[0]
+                    datablock_utils.tag_generation(bpy.context.scene, new_ids, source)
+                    
+                    # Dùng chung mesh với các scene đã import trước đó
+                    if self.share_meshes:
+                        new_objects = [id_data for id_data in new_ids if isinstance(id_data, bpy.types.Object)]
+                        self.relinked_count += datablock_utils.deduplicate_meshes(new_objects)
+                    
+                    # Xóa các thế hệ cũ của scene nguồn này
+                    self.purged_count += datablock_utils.purge_old_generations(
+                        bpy.context.scene, self.keep_generations, source)
+                except Exception as e:
+                    print(f"Error importing scene from {fbx_path}: {e}")
+                    self.error_count += 1
+            
+            self.done += 1
+            yield
+    
+    def _import_file(self, fbx_path):
+        if not self.per_collection:
+            bpy.ops.import_scene.fbx(filepath=fbx_path)
+            return
+        
+        # Import vào collection riêng mang tên file
+        context = bpy.context
+        name = os.path.splitext(os.path.basename(fbx_path))[0]
+        collection = bpy.data.collections.new(name)
+        context.scene.collection.children.link(collection)
+        
+        view_layer = context.view_layer
+        previous = view_layer.active_layer_collection
+        view_layer.active_layer_collection = view_layer.layer_collection.children[collection.name]
+        try:
+            bpy.ops.import_scene.fbx(filepath=fbx_path)
+        finally:
+            view_layer.active_layer_collection = previous
+    
+    def _finish(self):
+        global _import_job
+        if _import_job is self:
+            _import_job = None
+        _redraw_sidebar()
+        
+        success_count = self.success_count
+        error_count = self.error_count
+        skipped_count = self.total - self.done
+        unchanged_count = self.unchanged_count
+        relinked_count = self.relinked_count
+        purged_count = self.purged_count
+        
+        # Display summary message
+        def show_summary():
+            message = f"Imported {success_count} scenes"
+            if unchanged_count:
+                message += f", {unchanged_count} up to date"
+            if relinked_count:
+                message += f", {relinked_count} meshes shared"
+            if purged_count:
+                message += f", {purged_count} old datablocks removed"
+            if error_count > 0:
+                message += f", {error_count} failed"
+            if skipped_count > 0:
+                message += f", {skipped_count} cancelled"
+                
+            bpy.context.window_manager.popup_menu(
+                lambda self, context: self.layout.label(text=message),
+                title="Import Summary", 
+                icon='INFO' if error_count == 0 else 'ERROR'
+            )
+            return None
+        
+        if success_count > 0 or error_count > 0 or skipped_count > 0:
+            bpy.app.timers.register(show_summary, first_interval=0.5)
+
+def get_import_job():
+    """Job import đang chạy hoặc None."""
+    return _import_job
+
+def _redraw_sidebar():
+    """Vẽ lại N-panel để cập nhật tiến độ."""
+    try:
+        for window in bpy.context.window_manager.windows:
+            for area in window.screen.areas:
+                if area.type == 'VIEW_3D':
+                    area.tag_redraw()
+    except Exception:
+        pass
+
 def process_import_all_scenes(data):
     """Xử lý import tất cả scene từ Cascadeur."""
-    fbx_paths = data.get("fbx_paths", [])
+    global _import_job
+    fbx_paths = list(data.get("fbx_paths", []))
+    
+    # Các scene không đổi kể từ lần import trước thì không cần import lại,
+    # trừ khi file .blend hiện tại không có scene đó (file mới hoặc đã revert)
+    present = datablock_utils.present_sources()
+    unchanged = []
+    for entry in data.get("scenes", []):
+        if entry.get("changed", True):
+            continue
+        fbx_path = entry.get("fbx_path", "")
+        if entry.get("scene") in present:
+            unchanged.append(entry)
+            print(f"Scene {entry.get('scene')} is up to date ({fbx_path})")
+        elif fbx_path and os.path.exists(fbx_path):
+            fbx_paths.append(fbx_path)
+            print(f"Scene {entry.get('scene')} is unchanged but not in this file, importing {fbx_path}")
+        else:
+            print(f"Scene {entry.get('scene')} is not in this file and its FBX is gone, use Force Full Export")
     
     if not fbx_paths:
-        print("No FBX paths provided for import_all_scenes")
+        if unchanged:
+            print(f"All {len(unchanged)} scenes are up to date")
+        else:
+            print("No FBX paths provided for import_all_scenes")
         return None
-        
-    success_count = 0
-    error_count = 0
     
-    # Import each FBX one by one
-    for fbx_path in fbx_paths:
-        if not os.path.exists(fbx_path):
-            print(f"FBX file not found: {fbx_path}")
-            error_count += 1
-            continue
-            
-        try:
-            bpy.ops.import_scene.fbx(filepath=fbx_path)
-            print(f"Imported scene from {fbx_path}")
-            success_count += 1
-        except Exception as e:
-            print(f"Error importing scene from {fbx_path}: {e}")
-            error_count += 1
+    # Scene nguồn của từng file, dùng để theo dõi các thế hệ import
+    sources = {entry.get("fbx_path"): entry.get("scene") for entry in data.get("scenes", [])}
     
-    # Display summary message
-    def show_summary():
-        message = f"Imported {success_count} scenes"
-        if error_count > 0:
-            message += f", {error_count} failed"
-            
-        bpy.context.window_manager.popup_menu(
-            lambda self, context: self.layout.label(text=message),
-            title="Import Summary", 
-            icon='INFO' if error_count == 0 else 'ERROR'
-        )
+    # Nếu đã có job đang chạy thì thêm file vào job đó
+    if _import_job is not None and not _import_job.cancelled:
+        _import_job.add_paths(fbx_paths, sources)
         return None
     
-    if success_count > 0 or error_count > 0:
-        bpy.app.timers.register(show_summary, first_interval=0.5)
+    scene = bpy.context.scene
+    per_collection = getattr(scene, "btc_import_per_collection", False)
+    share_meshes = getattr(scene, "btc_import_share_meshes", True)
+    keep_generations = auto_purge_generations(scene)
+    _import_job = ImportJob(fbx_paths, per_collection, len(unchanged), share_meshes,
+                            sources, keep_generations)
+    bpy.app.timers.register(_import_job.step, first_interval=0.01)
     
     return None  # Required for bpy.app.timers
 
@@ -277,24 +477,24 @@ def process_clean_keyframes(data):
         print("Invalid data for clean_keyframes")
         return None
         
-    # Try to get keyframes from data
-    keyframes_data = data.get("keyframes", {})
+    # Frames come as a sorted int array ("frames"), or as the legacy
+    # dict of frame strings ("keyframes")
+    if "frames" in data:
+        keyframes = data.get("frames") or []
+    else:
+        keyframes = [int(frame) for frame in data.get("keyframes") or {}]
     
-    if not keyframes_data:
+    if not keyframes:
         print("No keyframes data found")
         return None
     
-    # Convert keyframe keys from strings to integers
-    keyframes = {int(frame): value for frame, value in keyframes_data.items()}
-    
     # Update UI keyframes list
     try:
         # Match keyframes in UI list
         scene = bpy.context.scene
         if hasattr(scene, "btc_keyframes"):
             # Mark keyframes that exist in the received data
-            for item in scene.btc_keyframes:
-                item.is_marked = item.frame in keyframes
+            keyframe_utils.set_marked_frames(scene.btc_keyframes, keyframes)
             
             print(f"Updated {len(keyframes)} keyframes in UI")
             
@@ -311,4 +511,17 @@ def process_clean_keyframes(data):
     except Exception as e:
         print(f"Error processing keyframes: {e}")
     
-    return None  # Required for bpy.app.timers
\ No newline at end of file
+    return None  # Required for bpy.app.timers
+
+def process_reset_payload(data):
+    """Cascadeur không có mesh của object: lần export sau sẽ gửi lại mesh."""
+    object_name = data.get("object_name", "")
+    if export_utils.forget_payload(object_name):
+        message = f"Cascadeur needs the mesh of {object_name}, export the object again"
+        print(message)
+        bpy.context.window_manager.popup_menu(
+            lambda self, context: self.layout.label(text=message),
+            title="Export Needed",
+            icon='ERROR'
+        )
+    return None
@@ -0,0 +1,466 @@
+import numpy as np
+
+from .curve_stream import CurveStream
+from .anim_utils import bone_path_parts
+
+# ID property của scene lưu frame đánh dấu riêng từng bone: {bone: [frames]}
+BONE_MARKS_PROP = "btc_bone_marks"
+
+# Cache chỉ mục bone -> frame theo tên action: (signature, index)
+_bone_index_cache = {}
+
+def get_keyframe_arrays(keyframes):
+    """Return (frames, is_marked) arrays of a btc_keyframes collection."""
+    count = len(keyframes)
+    frames = np.empty(count, dtype=np.int32)
+    marks = np.empty(count, dtype=bool)
+    if count:
+        keyframes.foreach_get("frame", frames)
+        keyframes.foreach_get("is_marked", marks)
+    return frames, marks
+
+def set_keyframe_arrays(keyframes, frames, marks):
+    """
+    Replace the content of a btc_keyframes collection with the given arrays.
+    
+    Items are only added or removed when the length changes, the values are
+    written with foreach_set.
+    """
+    count = len(frames)
+    while len(keyframes) > count:
+        keyframes.remove(len(keyframes) - 1)
+    for _ in range(count - len(keyframes)):
+        keyframes.add()
+    
+    if count:
+        keyframes.foreach_set("frame", np.ascontiguousarray(frames, dtype=np.int32))
+        keyframes.foreach_set("is_marked", np.ascontiguousarray(marks, dtype=bool))
+
+def set_marked_frames(keyframes, frames, add_missing=True, clear_others=True):
+    """
+    Mark the given frames in a btc_keyframes collection.
+    
+    Args:
+        keyframes: scene.btc_keyframes collection
+        frames: Iterable of frame numbers to mark
+        add_missing: Add frames that are not in the list yet (kept sorted)
+        clear_others: Unmark frames that are not in `frames`
+    
+    Returns:
+        Number of marked frames in the collection
+    """
+    frames = np.unique(np.fromiter(frames, dtype=np.int32))
+    existing, marks = get_keyframe_arrays(keyframes)
+    
+    if add_missing:
+        missing = np.setdiff1d(frames, existing, assume_unique=True)
+        if missing.size:
+            existing = np.concatenate((existing, missing))
+            marks = np.concatenate((marks, np.zeros(missing.size, dtype=bool)))
+            order = np.argsort(existing, kind="stable")
+            existing = existing[order]
+            marks = marks[order]
+    
+    new_marks = np.isin(existing, frames)
+    if not clear_others:
+        new_marks |= marks
+    
+    set_keyframe_arrays(keyframes, existing, new_marks)
+    return int(np.count_nonzero(new_marks))
+
+def unmark_frames(keyframes, frames):
+    """
+    Unmark the given frames in a btc_keyframes collection (one foreach_set).
+    
+    Returns:
+        Number of frames that were marked before
+    """
+    existing, marks = get_keyframe_arrays(keyframes)
+    cleared = marks & np.isin(existing, np.asarray(frames, dtype=np.int32))
+    if cleared.any():
+        keyframes.foreach_set("is_marked", marks & ~cleared)
+    return int(np.count_nonzero(cleared))
+
+def set_all_marks(keyframes, mark=True):
+    """
+    Mark or unmark every item of a btc_keyframes collection (one foreach_set).
+    
+    Returns:
+        Number of items that changed
+    """
+    _, marks = get_keyframe_arrays(keyframes)
+    changed = int(np.count_nonzero(marks != mark))
+    if changed:
+        keyframes.foreach_set("is_marked", np.full(len(marks), mark, dtype=bool))
+    return changed
+
+def action_key_frames(action):
+    """Return the sorted unique integer frames of all keyframes of an action."""
+    frames = np.empty(0, dtype=np.int32)
+    for _, _, co, _ in CurveStream(action.fcurves).chunks():
+        frames = np.union1d(frames, np.rint(co[:, 0]).astype(np.int32))
+    return frames
+
+def selected_key_frames(action):
+    """
+    Return the sorted unique integer frames of the keys selected in the
+    Dope Sheet / Graph Editor, read chunk by chunk with foreach_get.
+    """
+    frames = np.empty(0, dtype=np.int32)
+    stream = CurveStream(action.fcurves)
+    selected = np.empty(stream.chunk_keys, dtype=bool)
+    for first, last, co, bounds in stream.chunks():
+        for i, fcurve in enumerate(stream.fcurves[first:last]):
+            if bounds[i + 1] > bounds[i]:
+                fcurve.keyframe_points.foreach_get("select_control_point", selected[bounds[i]:bounds[i + 1]])
+        picked = co[selected[:len(co)], 0]
+        frames = np.union1d(frames, np.rint(picked).astype(np.int32))
+    return frames
+
+def bone_key_frames(action):
+    """
+    Index the keyed frames of an action by bone.
+    
+    The fcurves are grouped by the bone of their data path. Every key becomes
+    one int64 (bone id in the high bits, frame in the low bits), so the
+    unique (bone, frame) pairs of a chunk come out of a single np.unique.
+    
+    Returns:
+        {bone name: sorted unique int32 frames}
+    """
+    bone_ids = {}
+    fcurves = []
+    curve_bones = []
+    for fcurve in action.fcurves:
+        parts = bone_path_parts(fcurve.data_path)
+        if parts is not None:
+            fcurves.append(fcurve)
+            curve_bones.append(bone_ids.setdefault(parts[0], len(bone_ids)))
+    curve_bones = np.asarray(curve_bones, dtype=np.int64)
+    
+    pairs = np.empty(0, dtype=np.int64)
+    for first, last, co, bounds in CurveStream(fcurves).chunks():
+        bones = np.repeat(curve_bones[first:last], np.diff(bounds))
+        frames = np.rint(co[:, 0]).astype(np.int64) + (1 << 31)
+        pairs = np.union1d(pairs, (bones << 32) | frames)
+    
+    bones = pairs >> 32
+    frames = ((pairs & 0xFFFFFFFF) - (1 << 31)).astype(np.int32)
+    # pairs đã sắp xếp theo bone: cắt mảng frame tại chỗ bone thay đổi
+    starts = np.flatnonzero(np.diff(bones, prepend=-1))
+    ends = np.append(starts[1:], len(pairs))
+    names = list(bone_ids)
+    return {names[bones[start]]: frames[start:end] for start, end in zip(starts, ends)}
+
+def cached_bone_key_frames(action):
+    """
+    bone_key_frames() of an action, rebuilt only when the number of keys of
+    one of its fcurves changed. Used by the UI, which redraws often.
+    """
+    signature = tuple(len(fcurve.keyframe_points) for fcurve in action.fcurves)
+    cached = _bone_index_cache.get(action.name)
+    if cached is None or cached[0] != signature:
+        cached = (signature, bone_key_frames(action))
+        _bone_index_cache[action.name] = cached
+    return cached[1]
+
+def clear_bone_index_cache():
+    _bone_index_cache.clear()
+
+def get_bone_marks(scene):
+    """Per-bone marked frames of a scene as {bone name: sorted int32 frames}."""
+    marks = scene.get(BONE_MARKS_PROP) or {}
+    return {bone: np.unique(np.asarray(frames, dtype=np.int32)) for bone, frames in marks.items() if len(frames)}
+
+def set_bone_marks(scene, marks):
+    """Store the per-bone marked frames of a scene, bones without frames are dropped."""
+    scene[BONE_MARKS_PROP] = {
+        bone: np.unique(np.asarray(frames, dtype=np.int32)).tolist()
+        for bone, frames in marks.items() if len(frames)
+    }
+
+def mark_bone_frames(scene, bone_names, frames, mark=True):
+    """
+    Mark (or unmark) frames on some bones only.
+    
+    Returns:
+        Number of (bone, frame) marks added or removed
+    """
+    frames = np.unique(np.asarray(frames, dtype=np.int32))
+    marks = get_bone_marks(scene)
+    changed = 0
+    for bone in bone_names:
+        old = marks.get(bone, np.empty(0, dtype=np.int32))
+        new = np.union1d(old, frames) if mark else np.setdiff1d(old, frames)
+        changed += abs(len(new) - len(old))
+        marks[bone] = new
+    set_bone_marks(scene, marks)
+    return changed
+
+def bone_kept_frames(marked_frames, bone_marks, bone_name):
+    """Frames kept on a bone: the global marks plus the marks of that bone."""
+    own = bone_marks.get(bone_name)
+    if own is None:
+        return np.asarray(marked_frames, dtype=np.int32)
+    return np.union1d(np.asarray(marked_frames, dtype=np.int32), own)
+
+def keyframes_metadata(frames, bone_marks=None):
+    """
+    Keyframe metadata written for Cascadeur: {"12": {}, ...} with the global
+    marked frames, plus "bones": {bone: [frames]} with the per-bone marks.
+    Readers that only look at the frame keys skip "bones".
+    """
+    metadata = {str(frame): {} for frame in frames}
+    if bone_marks:
+        metadata["bones"] = {bone: np.asarray(marked).tolist() for bone, marked in sorted(bone_marks.items())}
+    return metadata
+
+def _smooth(matrix, window):
+    """Centered moving average over the rows of a matrix (edges use a shorter window)."""
+    if window <= 1 or len(matrix) < 3:
+        return matrix
+    half = window // 2
+    padded = np.concatenate((np.repeat(matrix[:1], half, axis=0), matrix, np.repeat(matrix[-1:], half, axis=0)))
+    cumsum = np.cumsum(padded, axis=0, dtype=np.float64)
+    cumsum = np.concatenate((np.zeros((1, matrix.shape[1])), cumsum))
+    size = 2 * half + 1
+    return ((cumsum[size:] - cumsum[:-size]) / size).astype(np.float32)
+
+def _local_extrema(values, maxima=True):
+    """Boolean mask of the strict local maxima (or minima) of a 1D array, plateaus count once."""
+    mask = np.zeros(values.size, dtype=bool)
+    if values.size < 3:
+        return mask
+    signal = values if maxima else -values
+    left = signal[1:-1] > signal[:-2]
+    right = signal[1:-1] >= signal[2:]
+    mask[1:-1] = left & right
+    return mask
+
+def key_pose_scores(matrix, smoothing=2):
+    """
+    Score how likely every frame of an animation is a key pose.
+
+    Three features are computed on the channels normalized to their range:
+    - velocity minima: the pose holds or turns around
+    - acceleration peaks: the motion starts, stops or is hit
+    - direction changes: part of the channels that reverse their velocity
+
+    Each feature is only counted at its own local extrema and scaled to
+    0..1, the score of a frame is the largest of them.
+
+    Args:
+        matrix: (frames, channels) values, see anim_utils.action_channel_matrix
+        smoothing: Moving average window in frames against mocap noise
+
+    Returns:
+        (frames,) float32 scores in 0..1
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    count = len(matrix)
+    scores = np.zeros(count, dtype=np.float32)
+    if count < 3 or not matrix.shape[1]:
+        return scores
+
+    # Chuẩn hóa từng channel theo biên độ, bỏ channel không đổi
+    span = np.ptp(matrix, axis=0)
+    moving = span > 1e-6
+    if not moving.any():
+        return scores
+    values = _smooth(matrix[:, moving] / span[moving], smoothing)
+
+    velocity = np.gradient(values, axis=0)
+    acceleration = np.gradient(velocity, axis=0)
+    speed = np.linalg.norm(velocity, axis=1)
+    accel = np.linalg.norm(acceleration, axis=1)
+
+    max_speed = speed.max()
+    if max_speed > 0:
+        minima = _local_extrema(speed, maxima=False)
+        scores[minima] = 1.0 - speed[minima] / max_speed
+
+    max_accel = accel.max()
+    if max_accel > 0:
+        peaks = _local_extrema(accel)
+        scores[peaks] = np.maximum(scores[peaks], accel[peaks] / max_accel)
+
+    # Channel đổi hướng giữa frame trước và frame sau
+    reversing = np.zeros(count, dtype=np.float32)
+    reversing[1:-1] = np.count_nonzero(velocity[:-2] * velocity[2:] < 0, axis=1) / values.shape[1]
+    max_reversing = reversing.max()
+    if max_reversing > 0:
+        changes = _local_extrema(reversing)
+        scores[changes] = np.maximum(scores[changes], reversing[changes] / max_reversing)
+    return scores
+
+def pick_key_poses(scores, count=0, threshold=0.0, min_spacing=1, include_ends=True):
+    """
+    Choose key pose frames from their scores.
+
+    Frames are taken by decreasing score, a frame closer than `min_spacing`
+    to an already chosen one is skipped.
+
+    Args:
+        scores: (frames,) scores from key_pose_scores
+        count: Keep at most this many frames (0 = no limit)
+        threshold: Keep only frames with a score above this value
+        min_spacing: Minimum distance between two chosen frames
+        include_ends: Always keep the first and last frame
+
+    Returns:
+        Sorted indices of the chosen frames
+    """
+    total = len(scores)
+    taken = np.zeros(total, dtype=bool)
+    chosen = []
+    if include_ends and total:
+        chosen = sorted({0, total - 1})
+
+    spacing = max(1, int(min_spacing))
+    for index in chosen:
+        taken[max(0, index - spacing + 1):index + spacing] = True
+
+    order = np.argsort(-scores, kind="stable")
+    order = order[scores[order] > threshold]
+    for index in order.tolist():
+        if count and len(chosen) >= count:
+            break
+        if taken[index]:
+            continue
+        chosen.append(index)
+        taken[max(0, index - spacing + 1):index + spacing] = True
+    return np.array(sorted(chosen), dtype=np.int64)
+
+# Giá trị enum Keyframe.interpolation của Blender được hỗ trợ khi tính lại đường cong
+INTERP_CONSTANT = 0
+INTERP_LINEAR = 1
+INTERP_BEZIER = 2
+
+def evaluate_keys(co, handle_left, handle_right, interpolation, frames):
+    """
+    Evaluate a curve the way Blender evaluates an fcurve, vectorized.
+
+    Supports CONSTANT, LINEAR and BEZIER segments. Bezier handles are
+    clamped to the segment like BKE_fcurve_correct_bezpart and the curve
+    parameter of each frame is found by bisection.
+
+    Args:
+        co, handle_left, handle_right: (N, 2) keys and handles sorted by frame
+        interpolation: (N,) Keyframe.interpolation enum values
+        frames: Frames to evaluate, inside [first key, last key]
+
+    Returns:
+        (len(frames),) float64 values
+    """
+    co = np.asarray(co, dtype=np.float64)
+    frames = np.asarray(frames, dtype=np.float64)
+    count = len(co)
+    if count == 1:
+        return np.full(frames.shape, co[0, 1])
+
+    # Segment của mỗi frame; frame của key cuối thuộc segment cuối
+    start = np.clip(np.searchsorted(co[:, 0], frames, side='right') - 1, 0, count - 2)
+    end = start + 1
+    x0, y0 = co[start, 0], co[start, 1]
+    x3, y3 = co[end, 0], co[end, 1]
+    span = x3 - x0
+    values = y0.copy()
+
+    mode = np.asarray(interpolation)[start]
+    linear = mode == INTERP_LINEAR
+    t = np.divide(frames - x0, span, out=np.zeros(frames.shape), where=span != 0)
+    values[linear] += t[linear] * (y3[linear] - y0[linear])
+
+    bezier = np.flatnonzero(mode == INTERP_BEZIER)
+    if bezier.size:
+        s, e = start[bezier], end[bezier]
+        p0 = co[s]
+        p3 = co[e]
+        h1 = p0 - np.asarray(handle_right, dtype=np.float64)[s]
+        h2 = p3 - np.asarray(handle_left, dtype=np.float64)[e]
+        # Handle dài hơn segment được thu ngắn theo tỉ lệ như Blender
+        length = np.abs(h1[:, 0]) + np.abs(h2[:, 0])
+        fac = np.divide(span[bezier], length, out=np.ones(bezier.size), where=length > span[bezier])[:, None]
+        p1 = p0 - fac * h1
+        p2 = p3 - fac * h2
+
+        def cubic(axis, u):
+            v = 1.0 - u
+            return (v * v * v * p0[:, axis] + 3.0 * v * v * u * p1[:, axis]
+                    + 3.0 * v * u * u * p2[:, axis] + u * u * u * p3[:, axis])
+
+        low = np.zeros(bezier.size)
+        high = np.ones(bezier.size)
+        target = frames[bezier]
+        for _ in range(40):
+            mid = 0.5 * (low + high)
+            below = cubic(0, mid) < target
+            low = np.where(below, mid, low)
+            high = np.where(below, high, mid)
+        values[bezier] = cubic(1, 0.5 * (low + high))
+    return values
+
+def decimate_keys(co, handle_left, handle_right, interpolation, tolerance, keep=None):
+    """
+    Choose the keys of a curve to keep so that the curve rebuilt from the
+    kept keys, with their own interpolation and handles, stays within
+    `tolerance` of the original curve at every frame.
+
+    Ramer-Douglas-Peucker against the evaluated curve: the original curve
+    is sampled once per frame (and at every key), then each pass evaluates
+    the rebuilt curve, and every segment between two kept keys whose error
+    is above the tolerance gets back the removed key nearest to its worst
+    frame. A segment between two consecutive original keys is the original
+    curve, so every pass makes progress.
+
+    Args:
+        co, handle_left, handle_right: (N, 2) keys and handles sorted by frame
+        interpolation: (N,) Keyframe.interpolation enum values (CONSTANT,
+            LINEAR or BEZIER)
+        tolerance: Largest allowed value error
+        keep: Optional (N,) bool mask of keys that are always kept
+
+    Returns:
+        (N,) bool mask of the kept keys
+    """
+    co = np.asarray(co, dtype=np.float64)
+    count = len(co)
+    mask = np.zeros(count, dtype=bool) if keep is None else np.array(keep, dtype=bool)
+    if count <= 2:
+        mask[:] = True
+        return mask
+    mask[0] = mask[-1] = True
+
+    key_frames = co[:, 0]
+    frames = np.union1d(np.arange(np.ceil(key_frames[0]), np.floor(key_frames[-1]) + 1.0), key_frames)
+    original = evaluate_keys(co, handle_left, handle_right, interpolation, frames)
+    handle_left = np.asarray(handle_left, dtype=np.float64)
+    handle_right = np.asarray(handle_right, dtype=np.float64)
+    interpolation = np.asarray(interpolation)
+
+    while True:
+        kept = np.flatnonzero(mask)
+        rebuilt = evaluate_keys(co[kept], handle_left[kept], handle_right[kept], interpolation[kept], frames)
+        over = np.abs(rebuilt - original) - tolerance
+        bad = np.flatnonzero(over > 0)
+        if not bad.size:
+            return mask
+
+        # Frame sai số lớn nhất của mỗi segment cần chia
+        segment = np.clip(np.searchsorted(key_frames[kept], frames[bad], side='right') - 1, 0, kept.size - 2)
+        first = np.flatnonzero(np.diff(segment, prepend=-1))
+        worst = np.maximum.reduceat(over[bad], first)
+        counts = np.diff(np.append(first, bad.size))
+        candidates = np.flatnonzero(over[bad] == np.repeat(worst, counts))
+        _, unique = np.unique(segment[candidates], return_index=True)
+        worst_frames = frames[bad[candidates[unique]]]
+        split = segment[candidates[unique]]
+
+        # Key đã bỏ gần frame đó nhất, nằm trong segment
+        index = np.clip(np.searchsorted(key_frames, worst_frames), 1, count - 1)
+        nearer = worst_frames - key_frames[index - 1] < key_frames[index] - worst_frames
+        index = np.where(nearer, index - 1, index)
+        index = np.clip(index, kept[split] + 1, kept[split + 1] - 1)
+        if mask[index].all():
+            return mask
+        mask[index] = True
@@ -0,0 +1,131 @@
+# Live link: gửi pose hiện tại của armature sang Cascadeur qua UDP khi
+# frame hoặc pose thay đổi (tối đa LIVE_LINK_RATE lần mỗi giây).
+import time
+import socket
+import bpy
+import numpy as np
+from bpy.app.handlers import persistent
+
+from . import preferences
+from ..csc_files.externals import live_link_protocol
+
+LIVE_LINK_HOST = "127.0.0.1"
+LIVE_LINK_RATE = 60.0
+
+
+class LiveLinkSender:
+    """Sample the pose of an armature and send it to the live link port."""
+
+    def __init__(self, armature_name, port, host=LIVE_LINK_HOST, rate=LIVE_LINK_RATE):
+        self.armature_name = armature_name
+        self.address = (host, port)
+        self.interval = 1.0 / rate
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+        self.encoder = None
+        self.buffer = np.empty(0, dtype=np.float32)
+        self.last_send = 0.0
+        self._flush_pending = False
+        # Thống kê
+        self.packets = 0
+        self.bytes = 0
+        self.errors = 0
+
+    def request(self):
+        """Send the pose now, or once the rate limit allows it."""
+        wait = self.last_send + self.interval - time.perf_counter()
+        if wait <= 0:
+            self.send()
+        elif not self._flush_pending:
+            # Gửi pose cuối cùng sau khi hết thời gian chờ
+            self._flush_pending = True
+            bpy.app.timers.register(self._flush, first_interval=wait)
+
+    def _flush(self):
+        self._flush_pending = False
+        if _sender is self:
+            self.send()
+        return None
+
+    def send(self):
+        armature = bpy.data.objects.get(self.armature_name)
+        if armature is None or armature.type != 'ARMATURE':
+            return
+        bones = armature.pose.bones
+        count = len(bones)
+        if self.encoder is None or len(self.encoder.bone_names) != count:
+            try:
+                self.encoder = live_link_protocol.PoseEncoder(bones.keys())
+            except ValueError as e:
+                # Rig đã thay đổi trong lúc stream và không còn gửi được
+                print(f"Live link stopped: {e}")
+                if _sender is self:
+                    stop_live_link()
+                return
+            self.buffer = np.empty(count * 16, dtype=np.float32)
+
+        bones.foreach_get("matrix_basis", self.buffer)
+        scene = bpy.context.scene
+        packet = self.encoder.encode(self.buffer, scene.frame_current + scene.frame_subframe)
+        self.last_send = time.perf_counter()
+        if packet is None:
+            return
+        try:
+            self.socket.sendto(packet, self.address)
+            self.packets += 1
+            self.bytes += len(packet)
+        except OSError:
+            # Không có bên nhận (ICMP port unreachable) hoặc buffer đầy
+            self.errors += 1
+
+    def close(self):
+        self.socket.close()
+
+
+_sender = None
+
+@persistent
+def _on_frame_change(scene, *args):
+    if _sender is not None:
+        _sender.request()
+
+@persistent
+def _on_depsgraph_update(scene, depsgraph):
+    if _sender is not None and depsgraph.id_type_updated('OBJECT'):
+        _sender.request()
+
+def live_link_port(context):
+    prefs = preferences.get_preferences(context)
+    return prefs.socket_port if prefs else preferences.get_port_number()
+
+def start_live_link(armature, port):
+    """
+    Start streaming the pose of an armature.
+
+    Raises:
+        ValueError: The rig does not fit in one live link packet
+        OSError: The socket could not be created
+    """
+    global _sender
+    stop_live_link()
+    live_link_protocol.check_pose_size(armature.pose.bones.keys())
+    _sender = LiveLinkSender(armature.name, port)
+    bpy.app.handlers.frame_change_post.append(_on_frame_change)
+    bpy.app.handlers.depsgraph_update_post.append(_on_depsgraph_update)
+    _sender.send()
+    return _sender
+
+def stop_live_link():
+    """Stop streaming, returns the sender that was running (or None)."""
+    global _sender
+    for handlers, handler in ((bpy.app.handlers.frame_change_post, _on_frame_change),
+                              (bpy.app.handlers.depsgraph_update_post, _on_depsgraph_update)):
+        if handler in handlers:
+            handlers.remove(handler)
+    sender, _sender = _sender, None
+    if sender is not None:
+        sender.close()
+    return sender
+
+def get_live_link():
+    return _sender
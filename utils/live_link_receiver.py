@@ -0,0 +1,99 @@
+# Bên nhận thử của live link: đo throughput, độ trễ và số gói mất.
+#   python live_link_receiver.py [--port 48152] [--seconds 10]
+#   python live_link_receiver.py --synthetic 120    (tự gửi pose giả, không cần Blender)
+#
+# Chạy bằng Python thường (cần numpy), không cần Blender.
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+import numpy as np
+
+# Giao thức nằm cùng các file được cài vào Cascadeur
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "csc_files", "externals"))
+from live_link_protocol import PoseDecoder, PoseEncoder, MAX_PACKET_SIZE
+
+DEFAULT_PORT = 48152
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Measure the throughput and latency of the B2C live link")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="UDP port to listen on")
+    parser.add_argument("--seconds", type=float, default=0, help="Stop after this many seconds (0 = Ctrl+C)")
+    parser.add_argument("--synthetic", type=int, default=0, metavar="BONES",
+                        help="Also send a random pose of this many bones at --rate")
+    parser.add_argument("--rate", type=float, default=60.0, help="Frames per second of the synthetic sender")
+    parser.add_argument("--moving", type=float, default=0.2, help="Part of the bones moving each synthetic frame")
+    return parser.parse_args(argv)
+
+def synthetic_sender(port, bone_count, rate, moving, stop):
+    """Send a random walk pose, a part of the bones changes every frame."""
+    encoder = PoseEncoder([f"bone_{i:03d}" for i in range(bone_count)])
+    matrices = np.tile(np.eye(4, dtype=np.float32).ravel(), (bone_count, 1))
+    rng = np.random.default_rng(0)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    frame = 0
+    while not stop.is_set():
+        moved = rng.random(bone_count) < moving
+        matrices[moved, 12:15] += rng.normal(0, 0.01, (int(moved.sum()), 3)).astype(np.float32)
+        packet = encoder.encode(matrices, float(frame))
+        if packet is not None:
+            sock.sendto(packet, ("127.0.0.1", port))
+        frame += 1
+        time.sleep(1.0 / rate)
+    sock.close()
+
+def main():
+    args = parse_args(sys.argv[1:])
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", args.port))
+    sock.settimeout(0.1)
+    print(f"Listening on 127.0.0.1:{args.port}")
+
+    stop = threading.Event()
+    if args.synthetic:
+        threading.Thread(target=synthetic_sender, daemon=True,
+                         args=(args.port, args.synthetic, args.rate, args.moving, stop)).start()
+
+    decoder = PoseDecoder()
+    buffer = bytearray(MAX_PACKET_SIZE)
+    latencies = []
+    start = report = time.perf_counter()
+    packets = size = 0
+    try:
+        while not args.seconds or time.perf_counter() - start < args.seconds:
+            try:
+                length = sock.recv_into(buffer)
+            except socket.timeout:
+                length = 0
+            if length and decoder.decode(memoryview(buffer)[:length]):
+                latencies.append(time.time() - decoder.sent_time)
+                packets += 1
+                size += length
+
+            now = time.perf_counter()
+            if now - report >= 1.0:
+                elapsed = now - report
+                if latencies:
+                    values = np.array(latencies) * 1000.0
+                    latency = f"latency avg {values.mean():.2f} ms, max {values.max():.2f} ms"
+                else:
+                    latency = "no packets"
+                print(f"{packets / elapsed:6.1f} packets/s, {size / elapsed / 1024:8.1f} KB/s, "
+                      f"{len(decoder.bone_names)} bones, frame {decoder.frame:.1f}, {latency}, "
+                      f"lost {decoder.lost}, stale {decoder.stale}, invalid {decoder.invalid}", flush=True)
+                latencies.clear()
+                packets = size = 0
+                report = now
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        sock.close()
+
+    print(f"Total: {decoder.packets} packets, {decoder.bytes / 1024:.1f} KB, "
+          f"lost {decoder.lost}, stale {decoder.stale}, invalid {decoder.invalid}")
+
+if __name__ == "__main__":
+    main()
@@ -53,7 +53,7 @@ class BTCAddonPreferences(AddonPreferences):
     # Port cho socket communication (fallback)
     socket_port: IntProperty(
         name="Socket Port",
-        description="Port for socket communication (fallback method)",
+        description="Port for socket communication (fallback method) and the live link",
         default=48152,
         min=1024,
         max=65535